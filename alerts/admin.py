@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Alert
+from .models import Alert, AlertGenerationRun
 
 
 @admin.register(Alert)
@@ -8,3 +8,11 @@ class AlertAdmin(admin.ModelAdmin):
     list_filter = ['alert_type', 'severity', 'is_read', 'is_active', 'created_at']
     search_fields = ['title', 'message']
     date_hierarchy = 'created_at'
+
+
+@admin.register(AlertGenerationRun)
+class AlertGenerationRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'organization', 'status', 'candidates', 'created', 'duplicates',
+                    'duration_seconds', 'started_at']
+    list_filter = ['status', 'started_at']
+    readonly_fields = ['checks', 'stats', 'error', 'created_at', 'started_at', 'completed_at']
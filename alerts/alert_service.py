@@ -1,7 +1,10 @@
+import hashlib
 from datetime import datetime, timedelta
+from django.conf import settings
 from django.utils import timezone
 from .models import Alert
 from weather.weather_service import WeatherService
+from weather.bulk import fetch_parcel_forecasts
 from market_analysis.market_service import MarketAnalysisService
 
 
@@ -11,51 +14,78 @@ class AlertService:
     def __init__(self, organization):
         self.organization = organization
     
-    def check_weather_alerts(self, lat=-17.78, lon=-63.18):
-        """Verifica condiciones climáticas adversas"""
+    def check_weather_alerts(self, lat=None, lon=None):
+        """
+        Verifica condiciones climáticas adversas en los próximos 3 días.
+        Sin coordenadas revisa todas las parcelas de la organización (una
+        consulta por celda de la grilla, en paralelo; ver weather/bulk.py).
+        """
         alerts = []
         
         try:
-            weather_service = WeatherService()
-            forecast = weather_service.get_forecast(lat, lon)
-            
-            if not forecast or 'list' not in forecast:
-                return alerts
+            if lat is not None and lon is not None:
+                forecasts = {(lat, lon): WeatherService().get_forecast(lat, lon)}
+                parcels_by_cell = {}
+            else:
+                from parcels.models import Parcel
+                parcel_cells, forecasts = fetch_parcel_forecasts(
+                    Parcel.objects.filter(organization=self.organization)
+                )
+                parcels_by_cell = {}
+                for parcel_id, cell in parcel_cells.items():
+                    parcels_by_cell.setdefault(cell, []).append(parcel_id)
             
-            # Revisar próximos 3 días
-            for day in forecast['list'][:3]:
-                weather_main = day['weather'][0]['main'].lower()
-                temp = day['main']['temp']
+            # Una alerta por tipo con las parcelas afectadas
+            affected = {'rain': [], 'frost': [], 'heat': []}
+            extremes = {'rain': 0, 'frost': None, 'heat': None}
+            for cell, forecast in forecasts.items():
+                parcels = parcels_by_cell.get(cell, [])
+                days = (forecast or [])[:3]
                 
-                # Alerta por lluvia fuerte
-                if 'rain' in weather_main or 'thunderstorm' in weather_main:
-                    alerts.append({
-                        'type': 'WEATHER',
-                        'severity': 'HIGH',
-                        'title': 'Lluvia Fuerte Próxima',
-                        'message': f'Se pronostica lluvia fuerte. Considere posponer labores de campo.',
-                        'data': {'weather': weather_main, 'temp': temp}
-                    })
+                rain = max((day['rain_probability'] for day in days), default=0)
+                if rain > 70:
+                    affected['rain'].extend(parcels)
+                    extremes['rain'] = max(extremes['rain'], rain)
                 
-                # Alerta por helada
-                if temp < 5:
-                    alerts.append({
-                        'type': 'WEATHER',
-                        'severity': 'CRITICAL',
-                        'title': 'Riesgo de Helada',
-                        'message': f'Temperatura muy baja ({temp}°C). Proteja cultivos sensibles.',
-                        'data': {'temp': temp}
-                    })
+                temp_min = min((day['temp_min'] for day in days), default=None)
+                if temp_min is not None and temp_min < 5:
+                    affected['frost'].extend(parcels)
+                    extremes['frost'] = temp_min if extremes['frost'] is None else min(extremes['frost'], temp_min)
                 
-                # Alerta por calor extremo
-                if temp > 35:
-                    alerts.append({
-                        'type': 'WEATHER',
-                        'severity': 'MEDIUM',
-                        'title': 'Calor Extremo',
-                        'message': f'Temperatura alta ({temp}°C). Asegure riego adecuado.',
-                        'data': {'temp': temp}
-                    })
+                temp_max = max((day['temp_max'] for day in days), default=None)
+                if temp_max is not None and temp_max > 35:
+                    affected['heat'].extend(parcels)
+                    extremes['heat'] = temp_max if extremes['heat'] is None else max(extremes['heat'], temp_max)
+            
+            # Alerta por lluvia fuerte
+            if extremes['rain']:
+                alerts.append({
+                    'type': 'WEATHER',
+                    'severity': 'HIGH',
+                    'title': 'Lluvia Fuerte Próxima',
+                    'message': f'Se pronostica lluvia fuerte ({extremes["rain"]}%). Considere posponer labores de campo.',
+                    'data': {'rain_probability': extremes['rain'], 'parcels': sorted(affected['rain'])}
+                })
+            
+            # Alerta por helada
+            if extremes['frost'] is not None:
+                alerts.append({
+                    'type': 'WEATHER',
+                    'severity': 'CRITICAL',
+                    'title': 'Riesgo de Helada',
+                    'message': f'Temperatura muy baja ({extremes["frost"]}°C). Proteja cultivos sensibles.',
+                    'data': {'temp': extremes['frost'], 'parcels': sorted(affected['frost'])}
+                })
+            
+            # Alerta por calor extremo
+            if extremes['heat'] is not None:
+                alerts.append({
+                    'type': 'WEATHER',
+                    'severity': 'MEDIUM',
+                    'title': 'Calor Extremo',
+                    'message': f'Temperatura alta ({extremes["heat"]}°C). Asegure riego adecuado.',
+                    'data': {'temp': extremes['heat'], 'parcels': sorted(affected['heat'])}
+                })
         
         except Exception as e:
             print(f"Error checking weather alerts: {e}")
@@ -120,37 +150,70 @@ class AlertService:
         
         return alerts
     
-    def generate_all_alerts(self):
-        """Genera todas las alertas y las guarda en BD"""
-        all_alerts = []
-        
-        # Recopilar alertas
-        all_alerts.extend(self.check_weather_alerts())
-        all_alerts.extend(self.check_price_alerts())
-        all_alerts.extend(self.check_harvest_alerts())
-        
-        # Guardar en BD (evitar duplicados)
-        created_alerts = []
-        for alert_data in all_alerts:
-            # Verificar si ya existe una alerta similar activa
-            existing = Alert.objects.filter(
+    # Verificaciones disponibles: nombre -> método
+    CHECKS = {
+        'weather': 'check_weather_alerts',
+        'price': 'check_price_alerts',
+        'harvest': 'check_harvest_alerts',
+    }
+    
+    @staticmethod
+    def dedup_key(alert_type, title, when=None):
+        """
+        Clave de deduplicación: tipo + título + ventana de
+        ALERT_DEDUP_WINDOW segundos. La misma alerta dentro de la ventana
+        tiene la misma clave y la restricción única de Alert la descarta.
+        """
+        when = when or timezone.now()
+        bucket = int(when.timestamp()) // settings.ALERT_DEDUP_WINDOW
+        digest = hashlib.sha1(f'{alert_type}|{title}'.encode('utf-8')).hexdigest()
+        return f'{digest}:{bucket}'
+    
+    def collect_alerts(self, checks=None):
+        """{verificación: alertas candidatas} de las verificaciones pedidas (todas por defecto)"""
+        return {
+            check: getattr(self, self.CHECKS[check])()
+            for check in (checks or self.CHECKS)
+        }
+    
+    def save_alerts(self, candidates):
+        """
+        Guarda las alertas candidatas con un solo bulk_create; las que ya
+        existen en la ventana actual se descartan por su dedup_key.
+        Retorna la lista de alertas creadas.
+        """
+        now = timezone.now()
+        alerts = {}
+        for alert_data in candidates:
+            key = self.dedup_key(alert_data['type'], alert_data['title'], now)
+            alerts.setdefault(key, Alert(
                 organization=self.organization,
                 alert_type=alert_data['type'],
+                severity=alert_data['severity'],
                 title=alert_data['title'],
-                is_active=True,
-                created_at__gte=timezone.now() - timedelta(hours=24)
-            ).exists()
-            
-            if not existing:
-                alert = Alert.objects.create(
-                    organization=self.organization,
-                    alert_type=alert_data['type'],
-                    severity=alert_data['severity'],
-                    title=alert_data['title'],
-                    message=alert_data['message'],
-                    data=alert_data.get('data', {}),
-                    expires_at=timezone.now() + timedelta(days=7)
-                )
-                created_alerts.append(alert)
+                message=alert_data['message'],
+                data=alert_data.get('data', {}),
+                dedup_key=key,
+                expires_at=now + timedelta(days=7)
+            ))
+        if not alerts:
+            return []
         
-        return created_alerts
+        manager = Alert.objects.all_organizations()
+        existing = set(
+            manager.filter(organization=self.organization, dedup_key__in=list(alerts))
+            .values_list('dedup_key', flat=True)
+        )
+        manager.bulk_create(
+            [alert for key, alert in alerts.items() if key not in existing],
+            ignore_conflicts=True
+        )
+        new_keys = [key for key in alerts if key not in existing]
+        return list(manager.filter(organization=self.organization, dedup_key__in=new_keys))
+    
+    def generate_all_alerts(self):
+        """Genera todas las alertas y las guarda en BD (evitando duplicados)"""
+        all_alerts = []
+        for candidates in self.collect_alerts().values():
+            all_alerts.extend(candidates)
+        return self.save_alerts(all_alerts)
@@ -0,0 +1,242 @@
+"""
+Generación programada de alertas.
+
+El comando run_alert_scheduler ejecuta las verificaciones de AlertService
+para cada organización activa con un pool de workers. Cada verificación
+tiene su propio intervalo (ALERT_WEATHER_INTERVAL, ALERT_PRICE_INTERVAL,
+ALERT_HARVEST_INTERVAL, con sufijos s/m/h/d como '15m' o '1d'); en cada
+ciclo se corren las que vencieron para cada organización.
+
+Cada ejecución queda registrada en AlertGenerationRun con sus estadísticas.
+La tabla también funciona como cola: el endpoint generate crea una
+ejecución PENDING que el scheduler toma en su próximo ciclo. Las alertas se
+deduplican con Alert.dedup_key (tipo + título + ventana de tiempo), así dos
+schedulers en paralelo no duplican alertas.
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from tenants.middleware import set_current_organization
+from tenants.models import Organization
+from .alert_service import AlertService
+from .models import AlertGenerationRun
+
+
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_interval(value):
+    """Segundos de un intervalo: 90, '90', '15m', '6h', '1d'"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*(\d+)\s*([smhd]?)\s*', str(value).lower())
+    if not match:
+        raise ValueError(f"Intervalo inválido: {value!r}")
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2) or 's']
+
+
+def check_intervals():
+    """{verificación: segundos entre ejecuciones}"""
+    return {
+        'weather': parse_interval(settings.ALERT_WEATHER_INTERVAL),
+        'price': parse_interval(settings.ALERT_PRICE_INTERVAL),
+        'harvest': parse_interval(settings.ALERT_HARVEST_INTERVAL),
+    }
+
+
+def request_generation(organization, user=None):
+    """
+    Pide una generación completa para la organización. Si ya hay una
+    pendiente se reutiliza. Retorna (run, reutilizada).
+    """
+    pending = AlertGenerationRun.objects.all_organizations().filter(
+        organization=organization, status=AlertGenerationRun.PENDING
+    ).order_by('id').first()
+    if pending:
+        return pending, True
+    return AlertGenerationRun.objects.create(
+        organization=organization,
+        status=AlertGenerationRun.PENDING,
+        checks=list(AlertService.CHECKS),
+        requested_by=user if user and user.is_authenticated else None,
+    ), False
+
+
+def claim_pending_runs(limit=50):
+    """Toma las ejecuciones pedidas desde la API (o abandonadas)"""
+    runs = AlertGenerationRun.objects.all_organizations()
+    stale_before = timezone.now() - timedelta(seconds=settings.ALERT_RUN_TIMEOUT)
+    candidates = runs.filter(
+        Q(status=AlertGenerationRun.PENDING) |
+        Q(status=AlertGenerationRun.RUNNING, started_at__lt=stale_before)
+    ).order_by('id').values_list('id', 'status')[:limit]
+
+    claimed = []
+    for run_id, status in candidates:
+        # UPDATE condicional: solo un scheduler gana cada ejecución
+        if runs.filter(id=run_id, status=status).update(
+            status=AlertGenerationRun.RUNNING, started_at=timezone.now()
+        ):
+            claimed.append(runs.select_related('organization').get(id=run_id))
+    return claimed
+
+
+def run_generation(run):
+    """Ejecuta las verificaciones de una ejecución ya tomada y guarda sus estadísticas"""
+    started = time.perf_counter()
+    set_current_organization(run.organization)
+    try:
+        service = AlertService(run.organization)
+        stats = {}
+        candidates = []
+        for check in run.checks or list(AlertService.CHECKS):
+            check_started = time.perf_counter()
+            alerts = service.collect_alerts([check])[check]
+            stats[check] = {
+                'candidates': len(alerts),
+                'seconds': round(time.perf_counter() - check_started, 3),
+            }
+            candidates.extend(alerts)
+
+        created = service.save_alerts(candidates)
+        for alert in created:
+            check = alert.alert_type.lower()
+            if check in stats:
+                stats[check]['created'] = stats[check].get('created', 0) + 1
+
+        run.candidates = len(candidates)
+        run.created = len(created)
+        run.duplicates = len(candidates) - len(created)
+        run.stats = stats
+        run.status = AlertGenerationRun.COMPLETED
+        run.error = ''
+    except Exception as e:
+        print(f"Error en la generación de alertas {run.id}: {e}")
+        run.error = str(e)
+        run.status = AlertGenerationRun.FAILED
+    finally:
+        set_current_organization(None)
+        connection.close()
+
+    run.completed_at = timezone.now()
+    run.duration_seconds = round(time.perf_counter() - started, 3)
+    run.save(update_fields=[
+        'candidates', 'created', 'duplicates', 'stats', 'status', 'error',
+        'completed_at', 'duration_seconds'
+    ])
+    return run
+
+
+class AlertScheduler:
+    """Ciclo que reparte las verificaciones vencidas entre un pool de workers"""
+
+    def __init__(self, workers=None, tick=None, organizations=None, intervals=None):
+        self.workers = settings.ALERT_SCHEDULER_WORKERS if workers is None else workers
+        self.tick = settings.ALERT_SCHEDULER_TICK if tick is None else tick
+        self.organizations = organizations
+        self.intervals = intervals or check_intervals()
+        # {(organization_id, verificación): última ejecución}
+        self.last_run = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.completed = 0
+        self.failed = 0
+
+    def _organizations(self):
+        if self.organizations is not None:
+            return list(self.organizations)
+        return list(Organization.objects.filter(is_active=True).order_by('id'))
+
+    def load_last_runs(self):
+        """Retoma el calendario desde las ejecuciones registradas"""
+        since = timezone.now() - timedelta(seconds=max(self.intervals.values()))
+        runs = AlertGenerationRun.objects.all_organizations().filter(
+            status=AlertGenerationRun.COMPLETED, started_at__gte=since
+        ).order_by('started_at').values_list('organization_id', 'checks', 'started_at')
+        for organization_id, checks, started_at in runs:
+            for check in checks or []:
+                self.last_run[(organization_id, check)] = started_at
+
+    def due_checks(self, organization_id, now=None):
+        now = now or timezone.now()
+        return [
+            check for check, interval in self.intervals.items()
+            if (organization_id, check) not in self.last_run
+            or now - self.last_run[(organization_id, check)] >= timedelta(seconds=interval)
+        ]
+
+    def schedule(self, now=None):
+        """Ejecuciones (ya tomadas) para este ciclo: pedidas desde la API y vencidas"""
+        now = now or timezone.now()
+        runs = claim_pending_runs()
+        requested = {run.organization_id for run in runs}
+        for organization in self._organizations():
+            if organization.id in requested or organization.id in self._in_flight:
+                continue
+            checks = self.due_checks(organization.id, now)
+            if checks:
+                runs.append(AlertGenerationRun.objects.create(
+                    organization=organization,
+                    status=AlertGenerationRun.RUNNING,
+                    checks=checks,
+                    started_at=now,
+                ))
+        for run in runs:
+            for check in run.checks:
+                self.last_run[(run.organization_id, check)] = now
+        return runs
+
+    def _execute(self, run):
+        try:
+            run = run_generation(run)
+            with self._lock:
+                if run.status == AlertGenerationRun.COMPLETED:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            return run
+        finally:
+            with self._lock:
+                self._in_flight.discard(run.organization_id)
+
+    def run_once(self, executor=None):
+        """Un ciclo: programa y espera las ejecuciones. Retorna las ejecuciones."""
+        runs = self.schedule()
+        with self._lock:
+            self._in_flight.update(run.organization_id for run in runs)
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix='alerts') as pool:
+                return list(pool.map(self._execute, runs))
+        return [executor.submit(self._execute, run) for run in runs]
+
+    def run_forever(self):
+        self.load_last_runs()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix='alerts') as pool:
+            while not self._stop.is_set():
+                try:
+                    # Las organizaciones aún en proceso se saltean hasta el próximo ciclo
+                    self.run_once(executor=pool)
+                except Exception as e:
+                    print(f"Error en el scheduler de alertas: {e}")
+                connection.close()
+                self._stop.wait(self.tick)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'in_flight': len(self._in_flight),
+            'completed': self.completed,
+            'failed': self.failed,
+        }
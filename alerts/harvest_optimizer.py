@@ -1,5 +1,19 @@
+"""
+Cálculo del momento óptimo de cosecha.
+
+calculate_all_parcels evalúa todas las parcelas en lote: las fechas de
+siembra salen de una sola consulta con función de ventana, las tendencias de
+mercado se calculan una vez por ejecución y el clima una vez por celda de la
+grilla (weather/bulk.py); los scores se combinan como arrays de NumPy.
+"""
 from datetime import datetime, timedelta, date
+
+import numpy as np
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
 from weather.weather_service import WeatherService
+from weather.bulk import BulkWeatherFetcher
 from market_analysis.market_service import MarketAnalysisService
 
 
@@ -17,88 +31,131 @@ class HarvestOptimizer:
         'ARVEJA': 90,
     }
     
+    # Pesos para cada factor
+    WEIGHTS = {
+        'maturation': 0.40,  # 40% - Lo más importante
+        'weather': 0.25,     # 25%
+        'market': 0.20,      # 20%
+        'logistics': 0.15    # 15%
+    }
+    
+    # Recomendación según el score general: (mínimo, recomendación, mensaje, urgencia)
+    RECOMMENDATIONS = [
+        (80, 'COSECHAR_AHORA', 'Momento óptimo para cosechar. Todas las condiciones son favorables.', 'HIGH'),
+        (65, 'COSECHAR_PRONTO', 'Condiciones buenas. Planifique cosecha en los próximos 7 días.', 'MEDIUM'),
+        (50, 'MONITOREAR', 'Condiciones aceptables. Monitoree clima y precios.', 'LOW'),
+        (float('-inf'), 'ESPERAR', 'Condiciones no óptimas. Espere mejores condiciones.', 'LOW'),
+    ]
+    
     def __init__(self, organization):
         self.organization = organization
         self.weather_service = WeatherService()
         self.market_service = MarketAnalysisService(organization)
     
-    def get_planting_date(self, parcel):
-        """Obtiene la fecha de siembra de la parcela desde farm_activities"""
-        from farm_activities.models import FarmActivity, ActivityType
+    def get_planting_dates(self, parcels):
+        """
+        {parcel_id: fecha de siembra} desde la actividad SOWING más reciente
+        de cada parcela (1 consulta con ROW_NUMBER por parcela). Sin
+        actividad de siembra se usa la fecha de creación de la parcela.
+        """
+        from farm_activities.models import FarmActivity
         
-        # Buscar el tipo de actividad de siembra
+        parcels = list(parcels)
+        dates = {}
         try:
-            sowing_type = ActivityType.objects.filter(
-                organization=self.organization,
-                name='SOWING'
-            ).first()
+            latest = FarmActivity.objects.filter(
+                parcel_id__in=[parcel.id for parcel in parcels],
+                activity_type__organization=self.organization,
+                activity_type__name='SOWING',
+            ).annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F('parcel_id')],
+                    order_by=[F('actual_date').desc(), F('scheduled_date').desc(), F('id').desc()],
+                )
+            ).filter(position=1).values_list('parcel_id', 'actual_date', 'scheduled_date')
             
-            if sowing_type:
-                # Buscar la actividad de siembra más reciente para esta parcela
-                planting_activity = FarmActivity.objects.filter(
-                    parcel=parcel,
-                    activity_type=sowing_type
-                ).order_by('-actual_date').first()
-                
-                if planting_activity:
-                    # Usar actual_date si existe, sino scheduled_date
-                    return planting_activity.actual_date or planting_activity.scheduled_date
+            for parcel_id, actual_date, scheduled_date in latest:
+                # Usar actual_date si existe, sino scheduled_date
+                dates[parcel_id] = actual_date or scheduled_date
         except Exception as e:
-            print(f"Error buscando fecha de siembra: {e}")
+            print(f"Error buscando fechas de siembra: {e}")
         
         # Si no hay actividad de siembra, usar fecha de creación de la parcela como aproximación
-        return parcel.created_at.date() if hasattr(parcel.created_at, 'date') else parcel.created_at
+        for parcel in parcels:
+            if not dates.get(parcel.id):
+                created_at = parcel.created_at
+                dates[parcel.id] = created_at.date() if hasattr(created_at, 'date') else created_at
+        return dates
+    
+    def get_planting_date(self, parcel):
+        """Obtiene la fecha de siembra de la parcela desde farm_activities"""
+        return self.get_planting_dates([parcel]).get(parcel.id)
     
-    def calculate_maturation_score(self, parcel):
+    def expected_days(self, crop_name):
+        return self.MATURATION_DAYS.get(crop_name.upper(), 120)
+    
+    @staticmethod
+    def maturation_scores(days_since_planting, expected_days):
+        """Scores de maduración (0-100) para arrays de días desde siembra y días esperados"""
+        days = np.asarray(days_since_planting, dtype=np.float64)
+        expected = np.asarray(expected_days, dtype=np.float64)
+        score = np.select(
+            [days < expected * 0.8, days <= expected * 1.1],
+            [
+                # Muy temprano
+                (days / (expected * 0.8)) * 50,
+                # Ventana óptima
+                80 + ((days - expected * 0.8) / (expected * 0.3)) * 20,
+            ],
+            # Pasado de maduración
+            np.maximum(0, 100 - (days - expected * 1.1) * 2),
+        )
+        return np.clip(score, 0, 100)
+    
+    def calculate_maturation_score(self, parcel, planting_date=None):
         """Calcula score de maduración (0-100)"""
         if not parcel.current_crop:
             return 0
         
-        planting_date = self.get_planting_date(parcel)
+        planting_date = planting_date or self.get_planting_date(parcel)
         if not planting_date:
             return 0
         
-        crop_name = parcel.current_crop.name.upper()
-        expected_days = self.MATURATION_DAYS.get(crop_name, 120)
-        
         days_since_planting = (date.today() - planting_date).days
-        
-        # Score basado en proximidad a días esperados
-        if days_since_planting < expected_days * 0.8:
-            # Muy temprano
-            score = (days_since_planting / (expected_days * 0.8)) * 50
-        elif days_since_planting <= expected_days * 1.1:
-            # Ventana óptima
-            score = 80 + ((days_since_planting - expected_days * 0.8) / (expected_days * 0.3)) * 20
-        else:
-            # Pasado de maduración
-            score = max(0, 100 - (days_since_planting - expected_days * 1.1) * 2)
-        
-        return min(100, max(0, score))
+        return float(self.maturation_scores(
+            [days_since_planting], [self.expected_days(parcel.current_crop.name)]
+        )[0])
     
-    def calculate_weather_score(self, lat=-17.78, lon=-63.18):
-        """Calcula score de condiciones climáticas (0-100)"""
+    def calculate_weather_score(self, lat=None, lon=None, forecast=None):
+        """
+        Calcula score de condiciones climáticas (0-100) a partir del
+        pronóstico diario (`forecast`, o el de lat/lon).
+        """
         try:
-            forecast = self.weather_service.get_forecast(lat, lon)
+            if forecast is None:
+                forecast = self.weather_service.get_forecast(
+                    self.weather_service.DEFAULT_LAT if lat is None else lat,
+                    self.weather_service.DEFAULT_LON if lon is None else lon,
+                )
             
-            if not forecast or 'list' not in forecast:
+            if not forecast:
                 return 50  # Score neutral si no hay datos
             
             score = 100
             
             # Revisar próximos 7 días
-            for day in forecast['list'][:7]:
-                weather_main = day['weather'][0]['main'].lower()
+            for day in forecast[:7]:
+                description = day.get('description', '').lower()
                 
                 # Penalizar lluvia
-                if 'rain' in weather_main:
-                    score -= 15
-                elif 'thunderstorm' in weather_main:
+                if 'tormenta' in description:
                     score -= 25
+                elif day.get('rain_probability', 0) > 60 or 'lluvia' in description:
+                    score -= 15
                 
                 # Penalizar temperaturas extremas
-                temp = day['main']['temp']
-                if temp < 5 or temp > 35:
+                if day['temp_min'] < 5 or day['temp_max'] > 35:
                     score -= 10
             
             return max(0, min(100, score))
@@ -107,10 +164,22 @@ class HarvestOptimizer:
             print(f"Error calculating weather score: {e}")
             return 50
     
-    def calculate_market_score(self, crop_name):
-        """Calcula score de condiciones de mercado (0-100)"""
+    def _market_trends(self):
+        """Tendencias de mercado; sin ellas los scores de mercado quedan neutrales (50)"""
+        try:
+            return self.market_service.get_market_trends()
+        except Exception as e:
+            print(f"Error getting market trends: {e}")
+            return []
+    
+    def calculate_market_score(self, crop_name, trends=None):
+        """
+        Calcula score de condiciones de mercado (0-100). `trends` evita
+        recalcular las tendencias cuando se evalúan varias parcelas.
+        """
         try:
-            trends = self.market_service.get_market_trends()
+            if trends is None:
+                trends = self.market_service.get_market_trends()
             
             # Buscar el cultivo en las tendencias
             for trend in trends:
@@ -154,112 +223,136 @@ class HarvestOptimizer:
         
         return min(100, max(0, score))
     
-    def calculate_optimal_harvest(self, parcel):
-        """Calcula el momento óptimo de cosecha para una parcela"""
-        
-        if not parcel.current_crop:
-            return {
-                'parcel_id': parcel.id,
-                'parcel_code': parcel.code,
-                'status': 'NO_DATA',
-                'message': 'Parcela sin cultivo activo',
-                'overall_score': 0
-            }
+    def calculate_optimal_harvest(self, parcel, forecast=None):
+        """
+        Calcula el momento óptimo de cosecha para una parcela. `forecast` es
+        el pronóstico de su celda si ya se consultó.
+        """
+        if forecast is None and parcel.current_crop:
+            forecast = self.weather_service.get_forecast(
+                parcel.latitude if parcel.latitude is not None else self.weather_service.DEFAULT_LAT,
+                parcel.longitude if parcel.longitude is not None else self.weather_service.DEFAULT_LON,
+            )
+        return self._score_parcels(
+            [parcel],
+            self.get_planting_dates([parcel]) if parcel.current_crop else {},
+            {parcel.id: self.calculate_weather_score(forecast=forecast) if parcel.current_crop else 50},
+        )[0]
+    
+    def _score_parcels(self, parcels, planting_dates, weather_scores, trends=None):
+        """
+        Resultados para `parcels` con las fechas de siembra y scores de clima
+        ya calculados ({parcel_id: valor}). Los scores se combinan como arrays.
+        """
+        results = [None] * len(parcels)
+        scored = []
+        for index, parcel in enumerate(parcels):
+            if not parcel.current_crop:
+                results[index] = {
+                    'parcel_id': parcel.id,
+                    'parcel_code': parcel.code,
+                    'status': 'NO_DATA',
+                    'message': 'Parcela sin cultivo activo',
+                    'overall_score': 0
+                }
+            elif not planting_dates.get(parcel.id):
+                results[index] = {
+                    'parcel_id': parcel.id,
+                    'parcel_code': parcel.code,
+                    'status': 'NO_DATA',
+                    'message': 'No se encontró fecha de siembra',
+                    'overall_score': 0
+                }
+            else:
+                scored.append(index)
+        if not scored:
+            return results
         
-        planting_date = self.get_planting_date(parcel)
-        if not planting_date:
-            return {
-                'parcel_id': parcel.id,
-                'parcel_code': parcel.code,
-                'status': 'NO_DATA',
-                'message': 'No se encontró fecha de siembra',
-                'overall_score': 0
-            }
+        if trends is None:
+            trends = self._market_trends()
         
-        # Calcular scores individuales
-        maturation_score = self.calculate_maturation_score(parcel)
-        weather_score = self.calculate_weather_score()
-        market_score = self.calculate_market_score(parcel.current_crop.name)
-        logistics_score = self.calculate_logistics_score(parcel)
+        today = date.today()
+        crops = [parcels[index].current_crop.name for index in scored]
+        market_by_crop = {crop: self.calculate_market_score(crop, trends) for crop in set(crops)}
         
-        # Pesos para cada factor
-        weights = {
-            'maturation': 0.40,  # 40% - Lo más importante
-            'weather': 0.25,     # 25%
-            'market': 0.20,      # 20%
-            'logistics': 0.15    # 15%
+        days_since_planting = np.array(
+            [(today - planting_dates[parcels[index].id]).days for index in scored], dtype=np.int64
+        )
+        expected_days = np.array([self.expected_days(crop) for crop in crops], dtype=np.int64)
+        scores = {
+            'maturation': self.maturation_scores(days_since_planting, expected_days),
+            'weather': np.array([weather_scores.get(parcels[index].id, 50) for index in scored], dtype=np.float64),
+            'market': np.array([market_by_crop[crop] for crop in crops], dtype=np.float64),
+            'logistics': np.array(
+                [self.calculate_logistics_score(parcels[index]) for index in scored], dtype=np.float64
+            ),
         }
         
         # Score general ponderado
-        overall_score = (
-            maturation_score * weights['maturation'] +
-            weather_score * weights['weather'] +
-            market_score * weights['market'] +
-            logistics_score * weights['logistics']
-        )
+        overall = sum(scores[name] * weight for name, weight in self.WEIGHTS.items())
         
-        # Determinar recomendación
-        if overall_score >= 80:
-            recommendation = 'COSECHAR_AHORA'
-            message = 'Momento óptimo para cosechar. Todas las condiciones son favorables.'
-            urgency = 'HIGH'
-        elif overall_score >= 65:
-            recommendation = 'COSECHAR_PRONTO'
-            message = 'Condiciones buenas. Planifique cosecha en los próximos 7 días.'
-            urgency = 'MEDIUM'
-        elif overall_score >= 50:
-            recommendation = 'MONITOREAR'
-            message = 'Condiciones aceptables. Monitoree clima y precios.'
-            urgency = 'LOW'
-        else:
-            recommendation = 'ESPERAR'
-            message = 'Condiciones no óptimas. Espere mejores condiciones.'
-            urgency = 'LOW'
+        # Determinar recomendación (primer umbral alcanzado)
+        thresholds = np.array([row[0] for row in self.RECOMMENDATIONS])
+        levels = np.argmax(overall[:, None] >= thresholds[None, :], axis=1)
         
         # Calcular fecha estimada óptima
-        days_since_planting = (date.today() - planting_date).days
-        crop_name = parcel.current_crop.name.upper()
-        expected_days = self.MATURATION_DAYS.get(crop_name, 120)
+        days_to_optimal = np.maximum(expected_days - days_since_planting, 0)
         
-        if days_since_planting < expected_days:
-            days_to_optimal = expected_days - days_since_planting
-            optimal_date = date.today() + timedelta(days=days_to_optimal)
-        else:
-            optimal_date = date.today()
-        
-        return {
-            'parcel_id': parcel.id,
-            'parcel_code': parcel.code,
-            'crop_name': parcel.current_crop.name,
-            'planting_date': planting_date.isoformat(),
-            'days_since_planting': days_since_planting,
-            'scores': {
-                'maturation': round(maturation_score, 1),
-                'weather': round(weather_score, 1),
-                'market': round(market_score, 1),
-                'logistics': round(logistics_score, 1),
-                'overall': round(overall_score, 1)
-            },
-            'recommendation': recommendation,
-            'urgency': urgency,
-            'message': message,
-            'optimal_date': optimal_date.isoformat(),
-            'status': 'OK'
-        }
+        for position, index in enumerate(scored):
+            parcel = parcels[index]
+            _, recommendation, message, urgency = self.RECOMMENDATIONS[levels[position]]
+            results[index] = {
+                'parcel_id': parcel.id,
+                'parcel_code': parcel.code,
+                'crop_name': parcel.current_crop.name,
+                'planting_date': planting_dates[parcel.id].isoformat(),
+                'days_since_planting': int(days_since_planting[position]),
+                'scores': {
+                    'maturation': round(float(scores['maturation'][position]), 1),
+                    'weather': round(float(scores['weather'][position]), 1),
+                    'market': round(float(scores['market'][position]), 1),
+                    'logistics': round(float(scores['logistics'][position]), 1),
+                    'overall': round(float(overall[position]), 1)
+                },
+                'recommendation': recommendation,
+                'urgency': urgency,
+                'message': message,
+                'optimal_date': (today + timedelta(days=int(days_to_optimal[position]))).isoformat(),
+                'status': 'OK'
+            }
+        return results
     
     def calculate_all_parcels(self):
-        """Calcula momento óptimo para todas las parcelas con cultivos activos"""
+        """
+        Calcula momento óptimo para todas las parcelas con cultivos activos.
+        Consultas constantes: parcelas, fechas de siembra, tendencias de
+        mercado y el clima de cada celda de la grilla.
+        """
         from parcels.models import Parcel
         
-        parcels = Parcel.objects.filter(
-            organization=self.organization,
-            current_crop__isnull=False
+        parcels = list(
+            Parcel.objects.filter(
+                organization=self.organization,
+                current_crop__isnull=False
+            ).select_related('current_crop')
         )
+        if not parcels:
+            return []
         
-        results = []
-        for parcel in parcels:
-            result = self.calculate_optimal_harvest(parcel)
-            results.append(result)
+        planting_dates = self.get_planting_dates(parcels)
+        
+        # Un pronóstico (y un score de clima) por celda de la grilla, consultadas en paralelo
+        parcel_cells, forecasts = BulkWeatherFetcher(self.weather_service).fetch_for_parcels(parcels)
+        weather_by_cell = {
+            cell: self.calculate_weather_score(forecast=forecast) for cell, forecast in forecasts.items()
+        }
+        weather_scores = {
+            parcel_id: weather_by_cell.get(cell, 50) for parcel_id, cell in parcel_cells.items()
+        }
+        
+        results = self._score_parcels(
+            parcels, planting_dates, weather_scores, self._market_trends()
+        )
         
         # Ordenar por score general (mayor a menor)
         results.sort(key=lambda x: x.get('scores', {}).get('overall', 0), reverse=True)
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from alerts.engine import AlertScheduler, check_intervals, parse_interval
+from tenants.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera alertas automáticas (clima, precios, cosecha) para cada '
+        'organización según los intervalos ALERT_*_INTERVAL, con un pool de '
+        'workers. También procesa las generaciones pedidas desde la API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Organizaciones procesadas en paralelo (default: ALERT_SCHEDULER_WORKERS)'
+        )
+        parser.add_argument(
+            '--tick', type=float, default=None,
+            help='Segundos entre ciclos (default: ALERT_SCHEDULER_TICK)'
+        )
+        parser.add_argument(
+            '--organization',
+            help='Subdominio de la organización (default: todas las activas)'
+        )
+        parser.add_argument(
+            '--weather', help='Intervalo de la verificación de clima (p. ej. 30m)'
+        )
+        parser.add_argument(
+            '--price', help='Intervalo de la verificación de precios (p. ej. 6h)'
+        )
+        parser.add_argument(
+            '--harvest', help='Intervalo de la verificación de cosecha (p. ej. 1d)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Ejecutar todas las verificaciones una vez y terminar'
+        )
+
+    def handle(self, *args, **options):
+        organizations = None
+        if options['organization']:
+            try:
+                organizations = [Organization.objects.get(subdomain=options['organization'])]
+            except Organization.DoesNotExist:
+                raise CommandError(f"Organización '{options['organization']}' no encontrada")
+
+        intervals = check_intervals()
+        try:
+            for check in intervals:
+                if options[check]:
+                    intervals[check] = parse_interval(options[check])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        scheduler = AlertScheduler(
+            workers=options['workers'], tick=options['tick'],
+            organizations=organizations, intervals=intervals
+        )
+
+        if options['once']:
+            runs = scheduler.run_once()
+            for run in runs:
+                self.stdout.write(
+                    f'{run.organization}: {run.created} creadas, {run.duplicates} duplicadas '
+                    f'({run.duration_seconds}s) {run.status}'
+                )
+            self.stdout.write(self.style.SUCCESS(f'{len(runs)} organizaciones procesadas'))
+            return
+
+        schedule = ', '.join(f'{check} cada {seconds}s' for check, seconds in intervals.items())
+        self.stdout.write(f'Scheduler de alertas con {scheduler.workers} workers: {schedule} (Ctrl+C para detener)')
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo scheduler...')
+            scheduler.stop()
+        self.stdout.write(self.style.SUCCESS(f'Scheduler detenido: {scheduler.stats()}'))
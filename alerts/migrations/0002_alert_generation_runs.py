@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tenants', '0001_initial'),
+        ('alerts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertGenerationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('RUNNING', 'En proceso'), ('COMPLETED', 'Completada'), ('FAILED', 'Fallida')], default='PENDING', max_length=20)),
+                ('checks', models.JSONField(blank=True, default=list)),
+                ('candidates', models.IntegerField(default=0, verbose_name='Alertas candidatas')),
+                ('created', models.IntegerField(default=0, verbose_name='Alertas creadas')),
+                ('duplicates', models.IntegerField(default=0, verbose_name='Alertas duplicadas')),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'alert_generation_runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='dedup_key',
+            field=models.CharField(blank=True, editable=False, max_length=80, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(fields=('organization', 'dedup_key'), name='alerts_unique_dedup_key'),
+        ),
+        migrations.AddField(
+            model_name='alertgenerationrun',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización'),
+        ),
+        migrations.AddField(
+            model_name='alertgenerationrun',
+            name='requested_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alert_generation_runs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='alertgenerationrun',
+            index=models.Index(fields=['status', 'id'], name='alert_gener_status_6a60ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertgenerationrun',
+            index=models.Index(fields=['organization', 'started_at'], name='alert_gener_organiz_43b467_idx'),
+        ),
+    ]
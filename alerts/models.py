@@ -36,6 +36,10 @@ class Alert(TenantModel):
     # Destinatarios (si es None, es para toda la organización)
     target_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='alerts')
     
+    # Clave de deduplicación de las alertas automáticas: tipo + título +
+    # ventana de tiempo (alerts/engine.py). Nula en alertas manuales.
+    dedup_key = models.CharField(max_length=80, null=True, blank=True, editable=False)
+    
     # Metadatos
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True)
@@ -47,6 +51,60 @@ class Alert(TenantModel):
             models.Index(fields=['alert_type', 'severity']),
             models.Index(fields=['is_active', 'is_read']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['organization', 'dedup_key'],
+                name='alerts_unique_dedup_key',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.get_alert_type_display()} - {self.title}"
+
+
+class AlertGenerationRun(TenantModel):
+    """
+    Ejecución de la generación automática de alertas de una organización:
+    pedida desde la API (PENDING) o programada por run_alert_scheduler.
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+    
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (RUNNING, 'En proceso'),
+        (COMPLETED, 'Completada'),
+        (FAILED, 'Fallida'),
+    ]
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    # Verificaciones ejecutadas (weather, price, harvest)
+    checks = models.JSONField(default=list, blank=True)
+    
+    # Estadísticas
+    candidates = models.IntegerField(default=0, verbose_name='Alertas candidatas')
+    created = models.IntegerField(default=0, verbose_name='Alertas creadas')
+    duplicates = models.IntegerField(default=0, verbose_name='Alertas duplicadas')
+    # {verificación: {'candidates', 'created', 'seconds'}}
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='alert_generation_runs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'alert_generation_runs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['organization', 'started_at']),
+        ]
+    
+    def __str__(self):
+        return f"Generación de alertas {self.id} - {self.get_status_display()}"
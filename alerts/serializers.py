@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Alert
+from .models import Alert, AlertGenerationRun
 
 
 class AlertSerializer(serializers.ModelSerializer):
@@ -11,3 +11,13 @@ class AlertSerializer(serializers.ModelSerializer):
         fields = ['id', 'alert_type', 'alert_type_display', 'severity', 'severity_display',
                   'title', 'message', 'data', 'is_read', 'is_active', 'created_at', 'expires_at']
         read_only_fields = ['created_at']
+
+
+class AlertGenerationRunSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = AlertGenerationRun
+        fields = ['id', 'status', 'status_display', 'checks', 'candidates', 'created', 'duplicates',
+                  'stats', 'error', 'created_at', 'started_at', 'completed_at', 'duration_seconds']
+        read_only_fields = fields
@@ -2,9 +2,9 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Alert
-from .serializers import AlertSerializer
-from .alert_service import AlertService
+from .models import Alert, AlertGenerationRun
+from .serializers import AlertSerializer, AlertGenerationRunSerializer
+from .engine import request_generation
 from .harvest_optimizer import HarvestOptimizer
 
 
@@ -31,7 +31,11 @@ class AlertViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def generate(self, request):
-        """Genera nuevas alertas automáticamente"""
+        """
+        Pide una generación de alertas. La ejecuta el scheduler
+        (run_alert_scheduler) en su próximo ciclo; responde 202 con la
+        ejecución, que se consulta en generation_runs.
+        """
         try:
             user = request.user
             organization = None
@@ -48,16 +52,14 @@ class AlertViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            service = AlertService(organization)
-            alerts = service.generate_all_alerts()
-            
-            serializer = self.get_serializer(alerts, many=True)
+            run, reused = request_generation(organization, user)
             
             return Response({
                 'success': True,
-                'message': f'{len(alerts)} alertas generadas',
-                'alerts': serializer.data
-            })
+                'message': 'Generación de alertas en cola',
+                'reused': reused,
+                'run': AlertGenerationRunSerializer(run).data
+            }, status=status.HTTP_202_ACCEPTED)
         
         except Exception as e:
             return Response(
@@ -65,6 +67,25 @@ class AlertViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def generation_runs(self, request):
+        """Últimas generaciones de alertas de la organización con sus estadísticas"""
+        user = request.user
+        if hasattr(user, 'partner') and user.partner:
+            organization = user.partner.organization
+        elif user.is_staff or user.is_superuser:
+            from tenants.models import Organization
+            organization = Organization.objects.first()
+        else:
+            organization = None
+        
+        if not organization:
+            return Response([])
+        runs = AlertGenerationRun.objects.all_organizations().filter(
+            organization=organization
+        ).order_by('-id')[:20]
+        return Response(AlertGenerationRunSerializer(runs, many=True).data)
+    
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Marca una alerta como leída"""
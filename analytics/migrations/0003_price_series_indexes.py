@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_demandtrend_organization_pricetrend_organization'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='demandtrend',
+            index=models.Index(fields=['organization', 'product_name', 'date'], name='demand_tren_organiz_78b429_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricetrend',
+            index=models.Index(fields=['organization', 'product_name', 'date'], name='price_trend_organiz_aedff6_idx'),
+        ),
+    ]
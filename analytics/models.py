@@ -32,6 +32,10 @@ class PriceTrend(TenantModel):
         verbose_name_plural = 'Tendencias de Precios'
         ordering = ['-date']
         unique_together = ['product_name', 'date']
+        indexes = [
+            # Series por producto (market_analysis/timeseries.py)
+            models.Index(fields=['organization', 'product_name', 'date']),
+        ]
 
     def __str__(self):
         return f"{self.product_name} - {self.date} - {self.average_price}"
@@ -66,6 +70,10 @@ class DemandTrend(TenantModel):
         verbose_name_plural = 'Tendencias de Demanda'
         ordering = ['-date']
         unique_together = ['product_name', 'date']
+        indexes = [
+            # Series por producto (market_analysis/timeseries.py)
+            models.Index(fields=['organization', 'product_name', 'date']),
+        ]
 
     def __str__(self):
         return f"{self.product_name} - {self.date} - {self.demand_level}"
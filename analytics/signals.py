@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from market_analysis.timeseries import DEMAND, TREND, price_series
+from .models import PriceTrend, DemandTrend
+
+
+@receiver(post_save, sender=PriceTrend)
+@receiver(post_delete, sender=PriceTrend)
+def invalidate_price_series(sender, instance, **kwargs):
+    """Descarta las estadísticas cacheadas del producto"""
+    price_series.invalidate(instance.organization_id, TREND, instance.product_name)
+
+
+@receiver(post_save, sender=DemandTrend)
+@receiver(post_delete, sender=DemandTrend)
+def invalidate_demand_series(sender, instance, **kwargs):
+    """Descarta las estadísticas cacheadas del producto"""
+    price_series.invalidate(instance.organization_id, DEMAND, instance.product_name)
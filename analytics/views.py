@@ -1,47 +1,89 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Avg
+from django.db.models import Avg, Count, Q
+from market_analysis.timeseries import DEMAND, TREND, price_series
+from tenants.middleware import get_current_organization
 from .models import PriceTrend, DemandTrend
 from .serializers import PriceTrendSerializer, DemandTrendSerializer
 
 
+def _series_statistics(request, source, product):
+    """Respuesta de las estadísticas móviles de un producto (?windows=7,30&days=365)"""
+    organization = get_current_organization()
+    if not organization:
+        return Response({'error': 'Organización no especificada'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        data = price_series.statistics(
+            organization, source, product,
+            windows=request.query_params.get('windows'),
+            days=request.query_params.get('days'),
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data)
+
+
 class PriceTrendViewSet(viewsets.ModelViewSet):
     queryset = PriceTrend.objects.all()
     serializer_class = PriceTrendSerializer
     permission_classes = [IsAuthenticated]
-    
+
+    def get_queryset(self):
+        # El manager filtra por la organización del request (no la del import)
+        return PriceTrend.objects.all()
+
     @action(detail=False, methods=['get'])
     def by_product(self, request):
         """Tendencias de precio por producto"""
         product_name = request.query_params.get('product_name')
         if not product_name:
             return Response({'error': 'product_name es requerido'}, status=400)
-        
-        trends = self.queryset.filter(product_name=product_name).order_by('-date')[:30]
-        serializer = self.get_serializer(trends, many=True)
-        return Response(serializer.data)
+
+        trends = self.get_queryset().filter(product_name=product_name).order_by('-date')[:30]
+        return Response(self.get_serializer(trends, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        """Media móvil, volatilidad y variación del precio de un producto"""
+        product_name = request.query_params.get('product_name')
+        if not product_name:
+            return Response({'error': 'product_name es requerido'}, status=400)
+        return _series_statistics(request, TREND, product_name)
 
 
 class DemandTrendViewSet(viewsets.ModelViewSet):
     queryset = DemandTrend.objects.all()
     serializer_class = DemandTrendSerializer
     permission_classes = [IsAuthenticated]
-    
+
+    def get_queryset(self):
+        # El manager filtra por la organización del request (no la del import)
+        return DemandTrend.objects.all()
+
     @action(detail=False, methods=['get'])
     def market_analysis(self, request):
         """Análisis de mercado"""
         product_name = request.query_params.get('product_name')
-        
+        trends = self.get_queryset()
         if product_name:
-            trends = self.queryset.filter(product_name=product_name)
-        else:
-            trends = self.queryset
-        
-        analysis = {
-            'avg_demand_index': trends.aggregate(Avg('demand_index'))['demand_index__avg'] or 0,
-            'high_demand_count': trends.filter(demand_level='HIGH').count(),
+            trends = trends.filter(product_name=product_name)
+        totals = trends.aggregate(
+            avg_demand_index=Avg('demand_index'),
+            high_demand_count=Count('id', filter=Q(demand_level='HIGH')),
+        )
+        return Response({
+            'avg_demand_index': totals['avg_demand_index'] or 0,
+            'high_demand_count': totals['high_demand_count'],
             'trends': self.get_serializer(trends[:10], many=True).data
-        }
-        return Response(analysis)
+        })
+
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        """Media móvil, volatilidad y variación del índice de demanda de un producto"""
+        product_name = request.query_params.get('product_name')
+        if not product_name:
+            return Response({'error': 'product_name es requerido'}, status=400)
+        return _series_statistics(request, DEMAND, product_name)
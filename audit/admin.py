@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuditLog
+from .models import AuditLog, AuditDailySummary
 
 
 @admin.register(AuditLog)
@@ -18,3 +18,15 @@ class AuditLogAdmin(admin.ModelAdmin):
     
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(AuditDailySummary)
+class AuditDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'organization', 'action', 'model_name', 'user', 'count']
+    list_filter = ['action', 'model_name', 'date']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
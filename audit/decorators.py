@@ -4,6 +4,7 @@ Decoradores para logging automático de auditoría
 
 from functools import wraps
 from .models import AuditLog
+from .utils import log_audit
 
 
 def get_client_ip(request):
@@ -63,8 +64,8 @@ def audit_log(action, model_name='', get_object_id=None, get_description=None):
                         description = f"Acción {action} en {model_name}"
                     
                     # Crear log de auditoría
-                    AuditLog.objects.create(
-                        user=request.user if request.user.is_authenticated else None,
+                    log_audit(
+                        user=request.user,
                         action=action,
                         model_name=model_name,
                         object_id=object_id,
@@ -99,8 +100,8 @@ def audit_login(func):
             
             if 200 <= response.status_code < 300:
                 # Login exitoso
-                AuditLog.objects.create(
-                    user=request.user if request.user.is_authenticated else None,
+                log_audit(
+                    user=request.user,
                     action=AuditLog.LOGIN,
                     description=f"Usuario {username} inició sesión exitosamente",
                     ip_address=get_client_ip(request),
@@ -108,7 +109,7 @@ def audit_login(func):
                 )
             else:
                 # Login fallido
-                AuditLog.objects.create(
+                log_audit(
                     user=None,
                     action=AuditLog.LOGIN_FAILED,
                     description=f"Intento fallido de inicio de sesión para usuario: {username}",
@@ -141,7 +142,7 @@ def audit_logout(func):
         
         try:
             if 200 <= response.status_code < 300:
-                AuditLog.objects.create(
+                log_audit(
                     user=user,
                     action=AuditLog.LOGOUT,
                     description=f"Usuario {username} cerró sesión",
@@ -0,0 +1,127 @@
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from audit.models import AuditLog, AuditLogArchive, AuditDailySummary
+from audit.rollups import rebuild_daily_summary
+
+
+def months_ago(months):
+    """Inicio (aware) del mes que está `months` meses antes del actual"""
+    today = timezone.localdate()
+    total = today.year * 12 + (today.month - 1) - months
+    start = date(total // 12, total % 12 + 1, 1)
+    return timezone.make_aware(datetime.combine(start, datetime.min.time()))
+
+
+class Command(BaseCommand):
+    help = (
+        'Mantenimiento de audit_logs: mueve por lotes los registros fuera de la '
+        'ventana de retención a audit_logs_archive (particionado por organización '
+        'y mes), purga el archivo vencido y reconstruye los resúmenes diarios'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Registros por lote (default: 5000)'
+        )
+        parser.add_argument(
+            '--retention-months', type=int,
+            default=getattr(settings, 'AUDIT_RETENTION_MONTHS', 12),
+            help='Meses que permanecen en audit_logs antes de archivarse'
+        )
+        parser.add_argument(
+            '--archive-retention-months', type=int,
+            default=getattr(settings, 'AUDIT_ARCHIVE_RETENTION_MONTHS', None),
+            help='Meses que permanecen en el archivo antes de eliminarse (default: sin límite)'
+        )
+        parser.add_argument(
+            '--rebuild-summary', action='store_true',
+            help='Recalcular audit_daily_summary desde cero (para filas existentes)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo mostrar cuántos registros se procesarían'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        if options['rebuild_summary']:
+            self.rebuild_summary(chunk_size, dry_run)
+
+        self.archive(months_ago(options['retention_months']), chunk_size, dry_run)
+
+        if options['archive_retention_months'] is not None:
+            self.purge_archive(months_ago(options['archive_retention_months']), chunk_size, dry_run)
+
+        self.stdout.write(self.style.SUCCESS('Mantenimiento de auditoría completado'))
+
+    def rebuild_summary(self, chunk_size, dry_run):
+        if dry_run:
+            total = AuditLog.objects.all_organizations().count()
+            total += AuditLogArchive.objects.all_organizations().count()
+            self.stdout.write(f'Se recalcularían resúmenes para {total} registros')
+            return
+
+        AuditDailySummary.objects.all_organizations().delete()
+        processed = rebuild_daily_summary(AuditLog.objects.all_organizations(), chunk_size)
+        processed += rebuild_daily_summary(AuditLogArchive.objects.all_organizations(), chunk_size)
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes diarios recalculados ({processed} registros)'))
+
+    def archive(self, cutoff, chunk_size, dry_run):
+        queryset = AuditLog.objects.all_organizations().filter(timestamp__lt=cutoff)
+        if dry_run:
+            self.stdout.write(f'Se archivarían {queryset.count()} registros anteriores a {cutoff:%Y-%m-%d}')
+            return
+
+        archived = 0
+        while True:
+            batch = list(queryset.order_by('id')[:chunk_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                AuditLogArchive.objects.bulk_create([
+                    AuditLogArchive(
+                        organization_id=log.organization_id,
+                        original_id=log.id,
+                        month=timezone.localdate(log.timestamp).replace(day=1),
+                        user_id=log.user_id,
+                        action=log.action,
+                        model_name=log.model_name,
+                        object_id=log.object_id,
+                        description=log.description,
+                        ip_address=log.ip_address,
+                        user_agent=log.user_agent,
+                        timestamp=log.timestamp,
+                    )
+                    for log in batch
+                ])
+                AuditLog.objects.all_organizations().filter(
+                    id__in=[log.id for log in batch]
+                ).delete()
+            archived += len(batch)
+            self.stdout.write(f'  {archived} registros archivados...')
+
+        self.stdout.write(self.style.SUCCESS(f'{archived} registros movidos a audit_logs_archive'))
+
+    def purge_archive(self, cutoff, chunk_size, dry_run):
+        queryset = AuditLogArchive.objects.all_organizations().filter(month__lt=cutoff.date())
+        if dry_run:
+            self.stdout.write(f'Se eliminarían {queryset.count()} registros archivados')
+            return
+
+        purged = 0
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            AuditLogArchive.objects.all_organizations().filter(id__in=ids).delete()
+            purged += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f'{purged} registros archivados eliminados'))
@@ -0,0 +1,17 @@
+from django.utils.deprecation import MiddlewareMixin
+from .unit_of_work import audit_unit_of_work
+
+
+class AuditUnitOfWorkMiddleware(MiddlewareMixin):
+    """
+    Abre una unidad de trabajo de auditoría por request y la confirma al final,
+    fusionando los eventos duplicados de AuditMixin y de las señales post_save.
+    """
+    
+    def process_request(self, request):
+        audit_unit_of_work.begin()
+        return None
+    
+    def process_response(self, request, response):
+        audit_unit_of_work.commit()
+        return response
@@ -0,0 +1,107 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('audit', '0004_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('action', models.CharField(choices=[('LOGIN', 'Inicio de sesión'), ('LOGOUT', 'Cierre de sesión'), ('LOGIN_FAILED', 'Intento fallido de inicio de sesión'), ('CREATE', 'Creación'), ('UPDATE', 'Actualización'), ('DELETE', 'Eliminación')], max_length=20, verbose_name='Acción')),
+                ('model_name', models.CharField(blank=True, max_length=100, verbose_name='Modelo')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Cantidad')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Auditoría',
+                'verbose_name_plural': 'Resúmenes Diarios de Auditoría',
+                'db_table': 'audit_daily_summary',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(verbose_name='ID original')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('action', models.CharField(choices=[('LOGIN', 'Inicio de sesión'), ('LOGOUT', 'Cierre de sesión'), ('LOGIN_FAILED', 'Intento fallido de inicio de sesión'), ('CREATE', 'Creación'), ('UPDATE', 'Actualización'), ('DELETE', 'Eliminación')], max_length=20, verbose_name='Acción')),
+                ('model_name', models.CharField(blank=True, max_length=100, verbose_name='Modelo')),
+                ('object_id', models.IntegerField(blank=True, null=True, verbose_name='ID del objeto')),
+                ('description', models.TextField(verbose_name='Descripción')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='Dirección IP')),
+                ('user_agent', models.TextField(blank=True, verbose_name='User Agent')),
+                ('timestamp', models.DateTimeField(verbose_name='Fecha y hora')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivo')),
+            ],
+            options={
+                'verbose_name': 'Registro de Auditoría Archivado',
+                'verbose_name_plural': 'Registros de Auditoría Archivados',
+                'db_table': 'audit_logs_archive',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['organization', 'timestamp'], name='audit_logs_organiz_9c8c67_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['organization', 'action', 'timestamp'], name='audit_logs_organiz_0cc0ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['organization', 'model_name', 'timestamp'], name='audit_logs_organiz_d604fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp'], name='audit_logs_timesta_423be6_idx'),
+        ),
+        migrations.AddField(
+            model_name='auditlogarchive',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización'),
+        ),
+        migrations.AddField(
+            model_name='auditlogarchive',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_audit_logs', to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AddField(
+            model_name='auditdailysummary',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización'),
+        ),
+        migrations.AddField(
+            model_name='auditdailysummary',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='audit_daily_summaries', to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlogarchive',
+            index=models.Index(fields=['organization', 'month'], name='audit_logs__organiz_dba1f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlogarchive',
+            index=models.Index(fields=['organization', 'timestamp'], name='audit_logs__organiz_6d2bb7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditdailysummary',
+            index=models.Index(fields=['organization', 'date'], name='audit_daily_organiz_c019a9_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='auditdailysummary',
+            unique_together={('organization', 'date', 'action', 'model_name', 'user')},
+        ),
+    ]
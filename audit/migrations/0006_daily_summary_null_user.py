@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_system_rows(apps, schema_editor):
+    """Une las filas sin usuario repetidas para poder crear la restricción"""
+    AuditDailySummary = apps.get_model('audit', 'AuditDailySummary')
+    rows = AuditDailySummary.objects.filter(user__isnull=True)
+    duplicates = (
+        rows.values('organization_id', 'date', 'action', 'model_name')
+        .annotate(rows=Count('id'), first=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1).order_by()
+    )
+    for group in duplicates:
+        same = rows.filter(
+            organization_id=group['organization_id'], date=group['date'],
+            action=group['action'], model_name=group['model_name'],
+        )
+        same.filter(id=group['first']).update(count=group['total'])
+        same.exclude(id=group['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_audit_partitioning_and_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='auditdailysummary',
+            unique_together=set(),
+        ),
+        migrations.RunPython(merge_duplicate_system_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='auditdailysummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('organization', 'date', 'action', 'model_name', 'user'), name='audit_daily_summary_unique_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='auditdailysummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('organization', 'date', 'action', 'model_name'), name='audit_daily_summary_unique_system'),
+        ),
+    ]
@@ -3,6 +3,7 @@ Mixins para agregar auditoría automática a ViewSets
 """
 
 from .models import AuditLog
+from .utils import log_audit
 
 
 def get_client_ip(request):
@@ -60,16 +61,17 @@ class AuditMixin:
         """Crear registro de auditoría"""
         try:
             if description is None and obj:
-                obj_desc = self.get_object_description(obj)
                 action_text = {
                     AuditLog.CREATE: 'Creó',
                     AuditLog.UPDATE: 'Actualizó',
                     AuditLog.DELETE: 'Eliminó',
                 }.get(action, 'Modificó')
-                description = f"{action_text} {self.get_audit_model_name()}: {obj_desc}"
+                # Descripción diferida: si la señal post_save del modelo ya registró
+                # el mismo evento en este request, esta no llega a construirse
+                description = lambda: f"{action_text} {self.get_audit_model_name()}: {self.get_object_description(obj)}"
             
-            AuditLog.objects.create(
-                user=self.request.user if self.request.user.is_authenticated else None,
+            log_audit(
+                user=self.request.user,
                 action=action,
                 model_name=self.get_audit_model_name(),
                 object_id=obj.id if obj and hasattr(obj, 'id') else None,
@@ -104,8 +106,8 @@ class AuditMixin:
         
         # Crear log después de eliminar
         try:
-            AuditLog.objects.create(
-                user=self.request.user if self.request.user.is_authenticated else None,
+            log_audit(
+                user=self.request.user,
                 action=AuditLog.DELETE,
                 model_name=self.get_audit_model_name(),
                 object_id=obj_id,
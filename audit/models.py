@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import User
 from tenants.managers import TenantModel
 
@@ -29,7 +30,9 @@ class AuditLog(TenantModel):
     description = models.TextField(verbose_name='Descripción')
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='Dirección IP')
     user_agent = models.TextField(blank=True, verbose_name='User Agent')
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name='Fecha y hora')
+    # default en lugar de auto_now_add: el escritor asíncrono fija la hora del evento,
+    # no la del bulk_create
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, verbose_name='Fecha y hora')
 
     class Meta:
         db_table = 'audit_logs'
@@ -40,8 +43,86 @@ class AuditLog(TenantModel):
             models.Index(fields=['user', 'timestamp']),
             models.Index(fields=['action', 'timestamp']),
             models.Index(fields=['model_name', 'object_id']),
+            # Listados por tenant y rango de fechas (AuditLogViewSet)
+            models.Index(fields=['organization', 'timestamp']),
+            models.Index(fields=['organization', 'action', 'timestamp']),
+            models.Index(fields=['organization', 'model_name', 'timestamp']),
+            # Listado global ordenado por fecha (developer_access)
+            models.Index(fields=['timestamp']),
         ]
 
     def __str__(self):
         user_str = self.user.username if self.user else 'Sistema'
         return f"{user_str} - {self.get_action_display()} - {self.timestamp}"
+
+
+class AuditLogArchive(TenantModel):
+    """
+    Registros de auditoría fuera de la ventana de retención de audit_logs.
+    Particionado lógico por (organización, mes); solo se escribe desde el
+    comando maintain_audit_logs.
+    """
+    original_id = models.BigIntegerField(verbose_name='ID original')
+    month = models.DateField(verbose_name='Mes')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='archived_audit_logs', verbose_name='Usuario')
+    action = models.CharField(max_length=20, choices=AuditLog.ACTION_CHOICES, verbose_name='Acción')
+    model_name = models.CharField(max_length=100, blank=True, verbose_name='Modelo')
+    object_id = models.IntegerField(null=True, blank=True, verbose_name='ID del objeto')
+    description = models.TextField(verbose_name='Descripción')
+    ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='Dirección IP')
+    user_agent = models.TextField(blank=True, verbose_name='User Agent')
+    timestamp = models.DateTimeField(verbose_name='Fecha y hora')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivo')
+
+    class Meta:
+        db_table = 'audit_logs_archive'
+        verbose_name = 'Registro de Auditoría Archivado'
+        verbose_name_plural = 'Registros de Auditoría Archivados'
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['organization', 'month']),
+            models.Index(fields=['organization', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} - {self.timestamp} (archivado)"
+
+
+class AuditDailySummary(TenantModel):
+    """
+    Conteos diarios precalculados de auditoría por acción, modelo y usuario.
+    Se actualiza en cada vaciado del escritor de auditoría; para dashboards.
+    """
+    date = models.DateField(verbose_name='Fecha')
+    action = models.CharField(max_length=20, choices=AuditLog.ACTION_CHOICES, verbose_name='Acción')
+    model_name = models.CharField(max_length=100, blank=True, verbose_name='Modelo')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='audit_daily_summaries', verbose_name='Usuario')
+    count = models.PositiveIntegerField(default=0, verbose_name='Cantidad')
+
+    class Meta:
+        db_table = 'audit_daily_summary'
+        verbose_name = 'Resumen Diario de Auditoría'
+        verbose_name_plural = 'Resúmenes Diarios de Auditoría'
+        ordering = ['-date']
+        # user es nulo en eventos de sistema/anónimos y NULL no se repite en
+        # un índice único: esas filas necesitan su propia restricción
+        constraints = [
+            models.UniqueConstraint(
+                fields=['organization', 'date', 'action', 'model_name', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='audit_daily_summary_unique_user',
+            ),
+            models.UniqueConstraint(
+                fields=['organization', 'date', 'action', 'model_name'],
+                condition=models.Q(user__isnull=True),
+                name='audit_daily_summary_unique_system',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['organization', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.action} {self.model_name}: {self.count}"
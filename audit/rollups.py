@@ -0,0 +1,101 @@
+"""
+Resúmenes diarios de auditoría (AuditDailySummary).
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def summary_key(record):
+    """Clave de agrupación (org, fecha local, acción, modelo, usuario) de un registro"""
+    return (
+        record.organization_id,
+        timezone.localdate(record.timestamp),
+        record.action,
+        record.model_name or '',
+        record.user_id,
+    )
+
+
+def apply_counts(counts):
+    """
+    Suma los conteos {clave: n} a AuditDailySummary con un UPDATE ... + n por
+    clave y crea las filas que todavía no existen.
+    """
+    from .models import AuditDailySummary
+
+    for (organization_id, date, action, model_name, user_id), n in counts.items():
+        filters = {
+            'organization_id': organization_id,
+            'date': date,
+            'action': action,
+            'model_name': model_name,
+            'user_id': user_id,
+        }
+        manager = AuditDailySummary.objects.all_organizations()
+        if manager.filter(**filters).update(count=F('count') + n):
+            continue
+        try:
+            with transaction.atomic():
+                AuditDailySummary(count=n, **filters).save()
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            manager.filter(**filters).update(count=F('count') + n)
+
+
+def fold_user_summaries(user_id):
+    """
+    Pasa los conteos de un usuario a las filas de sistema (user=NULL) y borra
+    sus filas propias. Al borrar el usuario, SET_NULL chocaría con la
+    restricción única de las filas de sistema que ya existen.
+    """
+    from .models import AuditDailySummary
+
+    with transaction.atomic():
+        rows = AuditDailySummary.objects.all_organizations().select_for_update().filter(user_id=user_id)
+        counts = Counter()
+        for row in rows:
+            counts[(row.organization_id, row.date, row.action, row.model_name, None)] += row.count
+        rows.delete()
+        apply_counts(counts)
+
+
+def increment_daily_summary(records):
+    """Actualiza los resúmenes con los registros recién escritos"""
+    apply_counts(Counter(summary_key(record) for record in records))
+
+
+def rebuild_daily_summary(queryset, chunk_size=10000):
+    """
+    Recalcula los resúmenes a partir de un queryset de AuditLog o
+    AuditLogArchive, recorriéndolo por rangos de id.
+    Retorna la cantidad de registros procesados.
+    """
+    processed = 0
+    last_id = 0
+    tz = timezone.get_current_timezone()
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        rows = (
+            queryset.filter(id__gte=ids[0], id__lte=ids[-1])
+            .annotate(date=TruncDate('timestamp', tzinfo=tz))
+            .values('organization_id', 'date', 'action', 'model_name', 'user_id')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        apply_counts(Counter({
+            (row['organization_id'], row['date'], row['action'],
+             row['model_name'] or '', row['user_id']): row['n']
+            for row in rows
+        }))
+        processed += len(ids)
+        last_id = ids[-1]
+    return processed
@@ -0,0 +1,10 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from users.models import User
+from .rollups import fold_user_summaries
+
+
+@receiver(pre_delete, sender=User)
+def fold_deleted_user_summaries(sender, instance, **kwargs):
+    """Sumar los resúmenes diarios del usuario a los de sistema antes de borrarlo"""
+    fold_user_summaries(instance.pk)
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from tenants.models import Organization
+from users.models import User
+from .middleware import AuditUnitOfWorkMiddleware
+from .models import AuditDailySummary, AuditLog
+from .utils import log_audit
+from .writer import AuditWriter, audit_writer
+
+
+class AuditUnitOfWorkTransactionTests(TransactionTestCase):
+    """Los eventos registrados dentro de una transacción siguen su resultado"""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(
+            name='Auditoría', slug='auditoria', subdomain='auditoria',
+            email='auditoria@example.com',
+        )
+        # Escritura síncrona: el registro existe al terminar el request
+        self._async = audit_writer.enabled
+        audit_writer.enabled = False
+        self.addCleanup(setattr, audit_writer, 'enabled', self._async)
+
+    def _log(self, object_id):
+        log_audit(action='CREATE', model_name='Order', object_id=object_id,
+                  description='Pedido creado', organization=self.organization)
+
+    def _run(self, view):
+        middleware = AuditUnitOfWorkMiddleware(convert_exception_to_response(view))
+        return middleware(RequestFactory().post('/'))
+
+    def test_view_error_after_log_audit_writes_nothing(self):
+        def view(request):
+            with transaction.atomic():
+                self._log(1)
+                raise ValueError('falla a mitad del lote')
+
+        with self.assertLogs('django.request', 'ERROR'):
+            response = self._run(view)
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(AuditLog.objects.all_organizations().exists())
+
+    def test_rolled_back_savepoint_discards_only_its_events(self):
+        def view(request):
+            with transaction.atomic():
+                self._log(1)
+                try:
+                    with transaction.atomic():
+                        self._log(2)
+                        raise ValueError('stock insuficiente')
+                except ValueError:
+                    pass
+            return HttpResponse()
+
+        self._run(view)
+        self.assertEqual(
+            list(AuditLog.objects.all_organizations().values_list('object_id', flat=True)), [1]
+        )
+
+    def test_committed_events_are_coalesced(self):
+        def view(request):
+            with transaction.atomic():
+                self._log(1)
+                self._log(1)
+            return HttpResponse()
+
+        self._run(view)
+        self.assertEqual(AuditLog.objects.all_organizations().count(), 1)
+
+
+class AuditDailySummaryUserDeletionTests(TestCase):
+    """Borrar un usuario conserva sus conteos en las filas de sistema"""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(
+            name='Resumen', slug='resumen', subdomain='resumen',
+            email='resumen@example.com',
+        )
+        self.user = User.objects.create_user(
+            username='operador', email='operador@example.com', password='x',
+        )
+        self.key = {
+            'organization': self.organization, 'date': timezone.localdate(),
+            'action': 'CREATE', 'model_name': 'Order',
+        }
+        AuditDailySummary.objects.all_organizations().create(count=3, **self.key)
+        AuditDailySummary.objects.all_organizations().create(user=self.user, count=2, **self.key)
+        AuditDailySummary.objects.all_organizations().create(
+            user=self.user, count=4, **{**self.key, 'action': 'UPDATE'},
+        )
+
+    def test_delete_user_folds_counts_into_system_rows(self):
+        self.user.delete()
+
+        rows = AuditDailySummary.objects.all_organizations()
+        self.assertFalse(rows.filter(user__isnull=False).exists())
+        self.assertEqual(
+            dict(rows.values_list('action', 'count')), {'CREATE': 5, 'UPDATE': 4}
+        )
+
+
+class AuditWriterErrorTests(TransactionTestCase):
+    """Solo los errores de conexión se vuelcan; los registros inválidos se apartan"""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(
+            name='Escritor', slug='escritor', subdomain='escritor',
+            email='escritor@example.com',
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.writer = AuditWriter()
+        self.writer.spill_path = os.path.join(directory.name, 'audit_spill.jsonl')
+        self.writer.rejected_path = f'{self.writer.spill_path}.rejected'
+
+    def _record(self, object_id, organization_id=None):
+        return AuditLog(
+            organization_id=organization_id or self.organization.id, action='CREATE',
+            model_name='Order', object_id=object_id, description='Pedido creado',
+            timestamp=timezone.now(),
+        )
+
+    def _rejected(self):
+        with open(self.writer.rejected_path, encoding='utf-8') as f:
+            return [json.loads(json.loads(line)['line'])['object_id'] for line in f]
+
+    def test_invalid_record_does_not_drop_its_batch(self):
+        written = self.writer._write([self._record(1), self._record(2, organization_id=999999), self._record(3)])
+
+        self.assertEqual(written, 2)
+        self.assertEqual(
+            sorted(AuditLog.objects.all_organizations().values_list('object_id', flat=True)), [1, 3]
+        )
+        self.assertFalse(os.path.exists(self.writer.spill_path))
+        self.assertEqual(self._rejected(), [2])
+
+    def test_corrupt_spill_line_does_not_lose_the_file(self):
+        with open(self.writer.spill_path, 'w', encoding='utf-8') as f:
+            f.write(self.writer._spill_line(self._record(1)) + '\n')
+            f.write('{"organization_id": \n')
+            f.write(self.writer._spill_line(self._record(2)) + '\n')
+
+        self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(
+            sorted(AuditLog.objects.all_organizations().values_list('object_id', flat=True)), [1, 2]
+        )
+        self.assertFalse(os.path.exists(self.writer._replay_path()))
+        self.assertEqual(self.writer.rejected, 1)
@@ -0,0 +1,116 @@
+"""
+Unidad de trabajo de auditoría por request.
+
+Durante un request, los eventos de log_audit se acumulan en lugar de
+escribirse de inmediato. Al terminar el request se fusionan los eventos
+con la misma clave (model_name, object_id, action) en un único registro.
+Así, una creación vía API que pasa por AuditMixin y por la señal
+post_save del modelo produce una sola fila en audit_logs.
+
+Regla de fusión: para cada campo gana el primer valor no vacío en orden
+de llegada. La señal llega primero (dentro de serializer.save()) y aporta
+la descripción; el mixin completa usuario, IP y user agent.
+
+Un evento registrado dentro de transaction.atomic() se incorpora al buffer
+recién cuando la transacción confirma (transaction.on_commit); si la
+transacción o el savepoint se revierten, el evento se descarta, igual que
+los cambios que describe.
+"""
+import threading
+from collections import OrderedDict
+
+from django.db import connection, transaction
+
+
+EVENT_FIELDS = [
+    'organization', 'user', 'action', 'model_name', 'object_id',
+    'description', 'ip_address', 'user_agent',
+]
+
+_state = threading.local()
+
+
+def _is_empty(value):
+    return value is None or value == ''
+
+
+class AuditUnitOfWork:
+    """Buffer de eventos de auditoría del request actual (thread-local)"""
+
+    def __init__(self):
+        self.coalesced = 0
+
+    @property
+    def active(self):
+        return getattr(_state, 'events', None) is not None
+
+    def begin(self):
+        _state.events = OrderedDict()
+
+    def discard(self):
+        _state.events = None
+
+    def add(self, event):
+        """
+        Agrega un evento al buffer. Retorna False si no hay unidad de trabajo
+        activa (fuera de un request), en cuyo caso el llamador debe escribirlo.
+        """
+        if not self.active:
+            return False
+
+        if connection.in_atomic_block:
+            event = dict(event)
+            transaction.on_commit(lambda: self._merge_committed(event))
+            return True
+        self._merge(event)
+        return True
+
+    def _merge_committed(self, event):
+        # La transacción confirmó después de cerrar la unidad de trabajo
+        if not self.active:
+            from .utils import build_audit_log
+            from .writer import audit_writer
+            try:
+                audit_writer.submit(build_audit_log(**event))
+            except Exception as e:
+                print(f"Error logging audit: {e}")
+            return
+        self._merge(event)
+
+    def _merge(self, event):
+        events = _state.events
+
+        # Sin object_id no hay forma segura de identificar duplicados
+        if event.get('object_id') is None:
+            events[('__single__', len(events))] = dict(event)
+            return
+
+        key = (event.get('model_name'), event.get('object_id'), event.get('action'))
+        merged = events.get(key)
+        if merged is None:
+            events[key] = dict(event)
+            return
+
+        for field in EVENT_FIELDS:
+            if _is_empty(merged.get(field)) and not _is_empty(event.get(field)):
+                merged[field] = event[field]
+        self.coalesced += 1
+
+    def commit(self):
+        """Escribe los eventos fusionados y cierra la unidad de trabajo"""
+        from .utils import build_audit_log
+        from .writer import audit_writer
+
+        events = getattr(_state, 'events', None)
+        _state.events = None
+        if not events:
+            return
+
+        for event in events.values():
+            try:
+                audit_writer.submit(build_audit_log(**event))
+            except Exception as e:
+                print(f"Error logging audit: {e}")
+
+
+audit_unit_of_work = AuditUnitOfWork()
@@ -1,19 +1,57 @@
 from .models import AuditLog
+from .writer import audit_writer
+from .unit_of_work import audit_unit_of_work
+
+
+def build_audit_log(user=None, action='', model_name='', object_id=None, description='',
+                    ip_address=None, user_agent='', organization=None):
+    """
+    Construye un AuditLog sin guardar, con la organización del request actual.
+    description puede ser un callable para construirla solo si se usa.
+    """
+    if organization is None:
+        from tenants.middleware import get_current_organization
+        organization = get_current_organization()
+    if callable(description):
+        description = description()
+
+    return AuditLog(
+        organization_id=organization.pk if organization else None,
+        user_id=user.pk if user is not None and user.is_authenticated else None,
+        action=action,
+        model_name=model_name,
+        object_id=object_id,
+        description=description,
+        ip_address=ip_address,
+        user_agent=user_agent
+    )
 
 
 def log_audit(user=None, action='', model_name='', object_id=None, description='', 
-              ip_address=None, user_agent=''):
-    """Función auxiliar para registrar eventos en la auditoría"""
+              ip_address=None, user_agent='', organization=None):
+    """
+    Función auxiliar para registrar eventos en la auditoría.
+    Dentro de un request el evento se fusiona con los demás eventos del mismo
+    (modelo, objeto, acción) (ver audit/unit_of_work.py); el registro se
+    escribe en segundo plano (ver audit/writer.py). Dentro de una transacción
+    el evento solo se registra si la transacción confirma.
+    """
     try:
-        AuditLog.objects.create(
-            user=user,
-            action=action,
-            model_name=model_name,
-            object_id=object_id,
-            description=description,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
+        if organization is None:
+            from tenants.middleware import get_current_organization
+            organization = get_current_organization()
+        event = {
+            'user': user,
+            'action': action,
+            'model_name': model_name,
+            'object_id': object_id,
+            'description': description,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'organization': organization,
+        }
+        if not audit_unit_of_work.add(event):
+            audit_writer.submit(build_audit_log(**event))
     except Exception as e:
         # Log error but don't break the application
         print(f"Error logging audit: {e}")
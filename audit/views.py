@@ -3,8 +3,8 @@ from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import AuditLog
+from django.db.models import Q, Sum
+from .models import AuditLog, AuditDailySummary
 from .serializers import AuditLogSerializer
 from users.permissions import IsAdmin
 
@@ -14,6 +14,7 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AuditLog.objects.select_related('user')
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    keyset_pagination = True  # ?pagination=cursor
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -49,6 +50,51 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Conteos por acción, modelo y usuario desde los resúmenes diarios
+        precalculados (no recorre audit_logs).
+        
+        Query params: date_from, date_to (YYYY-MM-DD), action, model_name, user
+        """
+        queryset = AuditDailySummary.objects.all()
+        
+        date_from = request.query_params.get('date_from', None)
+        date_to = request.query_params.get('date_to', None)
+        action = request.query_params.get('action', None)
+        model_name = request.query_params.get('model_name', None)
+        user = request.query_params.get('user', None)
+        
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        if action:
+            queryset = queryset.filter(action=action)
+        if model_name:
+            queryset = queryset.filter(model_name=model_name)
+        if user:
+            queryset = queryset.filter(user_id=user)
+        
+        by_day = queryset.values('date').annotate(total=Sum('count')).order_by('date')
+        by_action = queryset.values('action').annotate(total=Sum('count')).order_by('-total')
+        by_model = queryset.values('model_name').annotate(total=Sum('count')).order_by('-total')
+        by_user = queryset.values('user_id', 'user__username').annotate(
+            total=Sum('count')
+        ).order_by('-total')[:20]
+        
+        return Response({
+            'total': queryset.aggregate(total=Sum('count'))['total'] or 0,
+            'by_day': [{'date': row['date'], 'total': row['total']} for row in by_day],
+            'by_action': list(by_action),
+            'by_model': list(by_model),
+            'top_users': [
+                {'user': row['user_id'], 'username': row['user__username'], 'total': row['total']}
+                for row in by_user
+            ]
+        })
+    
     @action(detail=False, methods=['get'], url_path='developer-access', 
             permission_classes=[])
     def developer_access(self, request):
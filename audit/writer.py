@@ -0,0 +1,299 @@
+"""
+Escritor asíncrono de auditoría.
+
+Los registros se encolan en memoria y un thread en segundo plano los
+inserta con bulk_create en lotes (AUDIT_BATCH_SIZE) cada
+AUDIT_FLUSH_INTERVAL segundos. Al terminar el proceso se vacía la cola.
+Si la base de datos no está disponible (OperationalError/InterfaceError),
+los registros se vuelcan a un archivo local (AUDIT_SPILL_PATH, formato JSON
+lines) y se reintentan en el siguiente vaciado exitoso. El archivo es
+compartido por todos los procesos: las escrituras y la toma del archivo para
+reintentarlo se hacen con un flock sobre AUDIT_SPILL_PATH.lock, y quien lo
+toma lo renombra a un archivo propio del proceso antes de leerlo; si la
+lectura falla, ese archivo se reintenta en el siguiente vaciado.
+
+Cualquier otro error (datos inválidos, FK inexistente) no se corrige
+reintentando: el lote se escribe registro por registro y los que fallan, al
+igual que las líneas ilegibles del volcado, se apartan en
+AUDIT_SPILL_PATH.rejected con el error para revisarlos a mano.
+
+Con AUDIT_ASYNC = False los registros se guardan de forma síncrona.
+En ambos modos se actualizan los resúmenes diarios (audit/rollups.py).
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+# Campos que se persisten en el archivo de volcado
+SPILL_FIELDS = [
+    'organization_id', 'user_id', 'action', 'model_name', 'object_id',
+    'description', 'ip_address', 'user_agent',
+]
+
+
+class AuditWriter:
+    """Cola de auditoría con vaciado por lotes en un thread de fondo"""
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'AUDIT_ASYNC', True)
+        self.batch_size = getattr(settings, 'AUDIT_BATCH_SIZE', 200)
+        self.flush_interval = getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0)
+        self.spill_path = str(getattr(
+            settings, 'AUDIT_SPILL_PATH',
+            os.path.join(settings.BASE_DIR, 'audit_spill.jsonl')
+        ))
+        self._queue = queue.Queue(maxsize=getattr(settings, 'AUDIT_QUEUE_MAX_SIZE', 10000))
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.rejected_path = f'{self.spill_path}.rejected'
+        self.written = 0
+        self.spilled = 0
+        self.rejected = 0
+
+    # ------------------------------------------------------------------
+    # Encolado
+    # ------------------------------------------------------------------
+
+    def submit(self, record):
+        """
+        Encola un AuditLog sin guardar. El registro se encola al confirmar
+        la transacción actual (inmediatamente en modo autocommit).
+        """
+        if not record.organization_id:
+            raise ValueError(
+                'No se puede guardar AuditLog sin una organización. '
+                'Asegúrate de que el middleware TenantMiddleware esté configurado.'
+            )
+        if record.timestamp is None:
+            record.timestamp = timezone.now()
+
+        if not self.enabled:
+            record.save()
+            self._update_summary([record])
+            return
+
+        transaction.on_commit(lambda: self._put(record))
+
+    def _put(self, record):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Cola saturada: escribir directamente para no perder el registro
+            self._write([record])
+
+    def _ensure_started(self):
+        # Tras un fork (gunicorn) el thread del padre no existe en el hijo
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='audit-writer', daemon=True
+            )
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Vaciado
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error en el escritor de auditoría: {e}")
+        connection.close()
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Vacía la cola completa en lotes. Retorna la cantidad escrita."""
+        written = 0
+        with self._flush_lock:
+            connection.close_if_unusable_or_obsolete()
+            if os.path.exists(self.spill_path) or os.path.exists(self._replay_path()):
+                written += self._replay_spill()
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                written += self._write(batch)
+        return written
+
+    def _write(self, records):
+        from .models import AuditLog
+        try:
+            AuditLog.objects.bulk_create(records, batch_size=self.batch_size)
+        except (OperationalError, InterfaceError) as e:
+            print(f"Error al escribir auditoría, volcando a {self.spill_path}: {e}")
+            self._spill(records)
+            return 0
+        except Exception as e:
+            # Un registro inválido no debe arrastrar al resto del lote
+            print(f"Error al escribir lote de auditoría, se reintenta por registro: {e}")
+            return self._write_each(records)
+        self.written += len(records)
+        self._update_summary(records)
+        return len(records)
+
+    def _write_each(self, records):
+        written = []
+        for index, record in enumerate(records):
+            try:
+                with transaction.atomic():
+                    record.save(force_insert=True)
+            except (OperationalError, InterfaceError) as e:
+                print(f"Error al escribir auditoría, volcando a {self.spill_path}: {e}")
+                self._spill(records[index:])
+                break
+            except Exception as e:
+                self._reject([self._spill_line(record)], e)
+            else:
+                written.append(record)
+        self.written += len(written)
+        self._update_summary(written)
+        return len(written)
+
+    def _update_summary(self, records):
+        from .rollups import increment_daily_summary
+        try:
+            increment_daily_summary(records)
+        except Exception as e:
+            print(f"Error al actualizar resumen diario de auditoría: {e}")
+
+    # ------------------------------------------------------------------
+    # Volcado a archivo local
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _spill_lock(self):
+        """Bloqueo exclusivo entre procesos (y threads) sobre el archivo de volcado"""
+        if fcntl is None:
+            yield
+            return
+        with open(f'{self.spill_path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _spill_line(record):
+        data = {field: getattr(record, field) for field in SPILL_FIELDS}
+        data['timestamp'] = record.timestamp.isoformat()
+        return json.dumps(data)
+
+    def _spill(self, records):
+        lines = [self._spill_line(record) + '\n' for record in records]
+        try:
+            with self._spill_lock(), open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+            self.spilled += len(records)
+        except OSError as e:
+            print(f"Error al volcar auditoría a archivo: {e}")
+
+    def _reject(self, lines, error):
+        """Aparta registros que no se pueden escribir ni reintentar"""
+        print(f"Registro de auditoría descartado, guardado en {self.rejected_path}: {error}")
+        entries = [json.dumps({'line': line, 'error': str(error)}) + '\n' for line in lines]
+        try:
+            with self._spill_lock(), open(self.rejected_path, 'a', encoding='utf-8') as f:
+                f.writelines(entries)
+            self.rejected += len(lines)
+        except OSError as e:
+            print(f"Error al guardar auditoría descartada: {e}")
+
+    def _replay_path(self):
+        # Archivo propio del proceso: otro proceso no puede tomarlo ni escribirlo
+        return f'{self.spill_path}.{os.getpid()}.replay'
+
+    def _replay_spill(self):
+        from .models import AuditLog
+        replay_path = self._replay_path()
+        try:
+            # Un archivo que quedó de un intento fallido se lee antes de tomar otro
+            if not os.path.exists(replay_path):
+                with self._spill_lock():
+                    if not os.path.exists(self.spill_path):
+                        return 0
+                    os.replace(self.spill_path, replay_path)
+            with open(replay_path, encoding='utf-8') as f:
+                lines = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            print(f"Error al leer volcado de auditoría: {e}")
+            return 0
+
+        records = []
+        for line in lines:
+            try:
+                data = json.loads(line)
+                data['timestamp'] = parse_datetime(data['timestamp'])
+                records.append(AuditLog(**data))
+            except (ValueError, TypeError, KeyError) as e:
+                self._reject([line], e)
+
+        # Si vuelve a fallar, _write los agrega de nuevo al archivo de volcado
+        written = 0
+        for start in range(0, len(records), self.batch_size):
+            written += self._write(records[start:start + self.batch_size])
+        os.remove(replay_path)
+        return written
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def shutdown(self):
+        """Detiene el thread y vacía lo pendiente (registrado con atexit)"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error al vaciar auditoría al finalizar: {e}")
+
+    def stats(self):
+        return {
+            'async': self.enabled,
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'spilled': self.spilled,
+            'rejected': self.rejected,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+        }
+
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.shutdown)
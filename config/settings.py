@@ -95,6 +95,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'tenants.middleware.TenantMiddleware',  # Multi-tenancy middleware
+    'audit.middleware.AuditUnitOfWorkMiddleware',  # Fusiona eventos de auditoría por request
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -143,7 +144,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # Requerir autenticación por defecto
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Paginación por página; ?pagination=cursor activa la paginación keyset (core/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.DefaultPagination',
     'PAGE_SIZE': 1000,  # Aumentado para mostrar todos los datos
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -242,3 +244,119 @@ AUTH_USER_MODEL = 'users.User'
 
 # OpenWeatherMap API Configuration
 OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY', None)
+
+# Caché de resolución de tenants (tenants/cache.py)
+# TENANT_CACHE_ALIAS: alias de CACHES para el nivel compartido entre workers (opcional;
+# debe ser un backend compartido, no LocMemCache). Sin él una organización
+# desactivada o renombrada se sigue resolviendo en otros workers hasta TENANT_CACHE_TTL
+TENANT_CACHE_TTL = int(os.getenv('TENANT_CACHE_TTL', '60'))
+TENANT_CACHE_NEGATIVE_TTL = int(os.getenv('TENANT_CACHE_NEGATIVE_TTL', '30'))
+TENANT_CACHE_SHARED_TTL = int(os.getenv('TENANT_CACHE_SHARED_TTL', '300'))
+TENANT_CACHE_MAX_SIZE = int(os.getenv('TENANT_CACHE_MAX_SIZE', '1024'))
+TENANT_CACHE_ALIAS = os.getenv('TENANT_CACHE_ALIAS', None)
+# Decisión de acceso (usuario, organización) del middleware. Con TENANT_CACHE_ALIAS
+# (Redis, Memcached) se lee de la caché compartida y las revocaciones son inmediatas
+# en todos los workers; sin ella cada worker cachea por TENANT_MEMBERSHIP_CACHE_TTL
+# segundos, que es la demora máxima de una revocación en los demás workers
+TENANT_MEMBERSHIP_CACHE_TTL = int(os.getenv('TENANT_MEMBERSHIP_CACHE_TTL', '10'))
+TENANT_MEMBERSHIP_CACHE_MAX_SIZE = int(os.getenv('TENANT_MEMBERSHIP_CACHE_MAX_SIZE', '10000'))
+
+# Escritor asíncrono de auditoría (audit/writer.py)
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'True').lower() == 'true'
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '2.0'))
+AUDIT_QUEUE_MAX_SIZE = int(os.getenv('AUDIT_QUEUE_MAX_SIZE', '10000'))
+AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH', os.path.join(BASE_DIR, 'audit_spill.jsonl'))
+# Retención de audit_logs (comando maintain_audit_logs)
+AUDIT_RETENTION_MONTHS = int(os.getenv('AUDIT_RETENTION_MONTHS', '12'))
+AUDIT_ARCHIVE_RETENTION_MONTHS = (
+    int(os.getenv('AUDIT_ARCHIVE_RETENTION_MONTHS'))
+    if os.getenv('AUDIT_ARCHIVE_RETENTION_MONTHS') else None
+)
+
+# Generación de reportes en segundo plano (reports/jobs.py)
+# Threads dentro de cada proceso web. Por defecto 0: la generación corre en un
+# proceso aparte (python manage.py run_report_workers) y no compite por el GIL
+# con los requests. Con > 0 los reportes se generan sin ese proceso (desarrollo).
+REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', '0'))
+REPORT_JOB_POLL_INTERVAL = float(os.getenv('REPORT_JOB_POLL_INTERVAL', '2.0'))
+# Segundos tras los cuales un trabajo en curso se considera abandonado
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', '1800'))
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv('REPORT_JOB_MAX_ATTEMPTS', '3'))
+# Reutilizar el archivo de un reporte idéntico generado hace menos de N segundos
+REPORT_ARTIFACT_TTL = int(os.getenv('REPORT_ARTIFACT_TTL', '3600'))
+REPORT_STORAGE_DIR = os.getenv('REPORT_STORAGE_DIR', os.path.join(BASE_DIR, 'media', 'reports'))
+
+# Registro de modelos de predicción por organización (reports/ml_registry.py)
+ML_MODEL_DIR = os.getenv('ML_MODEL_DIR', os.path.join(BASE_DIR, 'reports', 'models'))
+# Estimadores cargados en memoria por proceso (LRU) y su expiración
+ML_MODEL_CACHE_SIZE = int(os.getenv('ML_MODEL_CACHE_SIZE', '8'))
+ML_MODEL_CACHE_TTL = int(os.getenv('ML_MODEL_CACHE_TTL', '3600'))
+# Segundos que se cachea cuál es la versión activa de cada organización
+ML_MODEL_ACTIVE_TTL = int(os.getenv('ML_MODEL_ACTIVE_TTL', '30'))
+# Versiones anteriores que se conservan en disco
+ML_MODEL_KEEP_VERSIONS = int(os.getenv('ML_MODEL_KEEP_VERSIONS', '3'))
+# Entrenamiento en segundo plano (reports/ml_training.py)
+# Threads dentro de cada proceso web; por defecto 0: el entrenamiento corre solo
+# en python manage.py run_report_workers --queue training
+ML_TRAINING_WORKERS = int(os.getenv('ML_TRAINING_WORKERS', '0'))
+# Procesos del ajuste del bosque en run_report_workers (-1 = todos los núcleos)
+ML_TRAINING_N_JOBS = int(os.getenv('ML_TRAINING_N_JOBS', '-1'))
+# Procesos del ajuste cuando entrena un thread del proceso web (ML_TRAINING_WORKERS > 0)
+ML_TRAINING_IN_PROCESS_N_JOBS = int(os.getenv('ML_TRAINING_IN_PROCESS_N_JOBS', '1'))
+# Árboles que se agregan en cada reentrenamiento incremental y máximo antes de reconstruir
+ML_INCREMENTAL_TREES = int(os.getenv('ML_INCREMENTAL_TREES', '20'))
+ML_MAX_TREES = int(os.getenv('ML_MAX_TREES', '400'))
+# Entrenamiento en curso por más de estos segundos se considera abandonado
+ML_TRAINING_TIMEOUT = int(os.getenv('ML_TRAINING_TIMEOUT', '3600'))
+
+# Caché del clima por celda de grilla (weather/cache.py)
+# Tamaño de la celda en grados (0.05° ≈ 5.5 km)
+WEATHER_GRID_SIZE = float(os.getenv('WEATHER_GRID_SIZE', '0.05'))
+# Vigencia del clima actual y del pronóstico (segundos)
+WEATHER_CURRENT_TTL = int(os.getenv('WEATHER_CURRENT_TTL', '600'))
+WEATHER_FORECAST_TTL = int(os.getenv('WEATHER_FORECAST_TTL', '10800'))
+# Datos vencidos se sirven (refrescando en segundo plano) hasta esta antigüedad
+WEATHER_STALE_TTL = int(os.getenv('WEATHER_STALE_TTL', '86400'))
+WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', '4096'))
+WEATHER_REFRESH_WORKERS = int(os.getenv('WEATHER_REFRESH_WORKERS', '2'))
+# Servicio externo de clima; se puede apuntar a un servidor local en pruebas
+WEATHER_API_URL = os.getenv('WEATHER_API_URL', 'https://api.openweathermap.org/data/2.5')
+WEATHER_HTTP_TIMEOUT = float(os.getenv('WEATHER_HTTP_TIMEOUT', '10'))
+# Consulta masiva por parcelas (weather/bulk.py): threads, llamadas por segundo y reintentos
+WEATHER_BULK_WORKERS = int(os.getenv('WEATHER_BULK_WORKERS', '8'))
+WEATHER_RATE_LIMIT = float(os.getenv('WEATHER_RATE_LIMIT', '10'))
+WEATHER_FETCH_RETRIES = int(os.getenv('WEATHER_FETCH_RETRIES', '3'))
+WEATHER_RETRY_BACKOFF = float(os.getenv('WEATHER_RETRY_BACKOFF', '0.5'))
+
+# Generación programada de alertas (alerts/engine.py, comando run_alert_scheduler)
+# Intervalos por verificación: segundos o con sufijo s/m/h/d
+ALERT_WEATHER_INTERVAL = os.getenv('ALERT_WEATHER_INTERVAL', '1h')
+ALERT_PRICE_INTERVAL = os.getenv('ALERT_PRICE_INTERVAL', '6h')
+ALERT_HARVEST_INTERVAL = os.getenv('ALERT_HARVEST_INTERVAL', '1d')
+ALERT_SCHEDULER_WORKERS = int(os.getenv('ALERT_SCHEDULER_WORKERS', '4'))
+ALERT_SCHEDULER_TICK = float(os.getenv('ALERT_SCHEDULER_TICK', '30'))
+# Una generación en curso por más de estos segundos se vuelve a tomar
+ALERT_RUN_TIMEOUT = int(os.getenv('ALERT_RUN_TIMEOUT', '1800'))
+# La misma alerta (tipo + título) se genera a lo sumo una vez por ventana
+ALERT_DEDUP_WINDOW = int(os.getenv('ALERT_DEDUP_WINDOW', '86400'))
+
+# Snapshot diario de tendencias de mercado (market_analysis/snapshots.py)
+# Días de historial de precios que forman el precio de referencia
+MARKET_REFERENCE_DAYS = int(os.getenv('MARKET_REFERENCE_DAYS', '30'))
+# Snapshots en memoria por proceso y segundos que se reutilizan sin consultar la BD
+MARKET_SNAPSHOT_CACHE_SIZE = int(os.getenv('MARKET_SNAPSHOT_CACHE_SIZE', '1024'))
+MARKET_SNAPSHOT_CACHE_TTL = int(os.getenv('MARKET_SNAPSHOT_CACHE_TTL', '300'))
+
+# Series de precios y estadísticas móviles (market_analysis/timeseries.py)
+# Ventanas por defecto (días) y ventana máxima aceptada
+PRICE_SERIES_WINDOWS = os.getenv('PRICE_SERIES_WINDOWS', '7,30,90')
+PRICE_SERIES_MAX_WINDOW = int(os.getenv('PRICE_SERIES_MAX_WINDOW', '365'))
+# Estadísticas calculadas en memoria por proceso; la versión de cada producto
+# vive en la caché de Django (compartida entre workers si CACHES lo es)
+PRICE_SERIES_CACHE_SIZE = int(os.getenv('PRICE_SERIES_CACHE_SIZE', '2048'))
+PRICE_SERIES_CACHE_TTL = int(os.getenv('PRICE_SERIES_CACHE_TTL', '300'))
+
+# Reserva de stock al confirmar pedidos (sales/stock.py)
+# Segundos máximos de espera por los bloqueos de productos (solo PostgreSQL; 0 = sin límite)
+SALES_STOCK_LOCK_TIMEOUT = float(os.getenv('SALES_STOCK_LOCK_TIMEOUT', '5'))
@@ -1,7 +1,257 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from collections import OrderedDict
 
+from django.core.cache import cache
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-class StandardResultsSetPagination(PageNumberPagination):
+
+class KeysetOrderingError(ValueError):
+    """El ordenamiento del queryset no se puede usar como cursor"""
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset): en lugar de OFFSET filtra por los valores
+    de ordenamiento de la última fila, así la página N cuesta lo mismo que la 1.
+
+    El ordenamiento se toma del queryset (order_by explícito u OrderingFilter),
+    o del atributo `ordering` del viewset, o del Meta.ordering del modelo, y se
+    completa con el pk como desempate estable. Ej: ['-date', '-created_at']
+    se convierte en ['-date', '-created_at', '-pk'].
+
+    Los campos de ordenamiento deben ser no nulos. Se aceptan nombres de
+    campo y F('campo').asc()/.desc(); cualquier otra expresión (p. ej.
+    Lower('name'), un orden aleatorio) no se puede convertir en cursor y
+    lanza KeysetOrderingError (OptionalKeysetPaginationMixin pasa entonces a
+    paginación por número de página).
+
+    Query params:
+        cursor: token opaco devuelto en next/previous
+        page_size: tamaño de página (máximo max_page_size)
+        count=true: incluir el total (cacheado count_cache_timeout segundos)
+    """
+    cursor_query_param = 'cursor'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    count_query_param = 'count'
+    count_cache_timeout = 60
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    @staticmethod
+    def _field_name(field):
+        """'campo' o '-campo' para un elemento de order_by; None si no es un campo"""
+        if isinstance(field, str):
+            return None if field == '?' else field
+        if isinstance(field, F):
+            return field.name
+        if isinstance(field, OrderBy) and isinstance(field.expression, F):
+            return f'-{field.expression.name}' if field.descending else field.expression.name
+        return None
+
+    def get_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by)
+        if not ordering:
+            ordering = list(getattr(view, 'ordering', None) or [])
+        if not ordering:
+            ordering = list(queryset.model._meta.ordering or [])
+        names = [self._field_name(field) for field in ordering]
+        if None in names:
+            raise KeysetOrderingError(
+                f'Ordenamiento no soportado por la paginación por cursor: {ordering!r}'
+            )
+        ordering = names
+
+        pk_names = {'pk', '-pk', 'id', '-id'}
+        if not any(field in pk_names for field in ordering):
+            descending = ordering[0].startswith('-') if ordering else True
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    # Codificación del cursor -------------------------------------------------
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': reverse}, default=str)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            return payload['v'], bool(payload.get('r'))
+        except (ValueError, KeyError, TypeError):
+            raise NotFound('Cursor inválido')
+
+    # Filtrado ------------------------------------------------------------------
+
+    @staticmethod
+    def _field_value(obj, field):
+        value = obj
+        for part in field.lstrip('-').split('__'):
+            value = getattr(value, part)
+        # Ordenamiento por FK: comparar por pk
+        return getattr(value, 'pk', value)
+
+    @staticmethod
+    def _after(ordering, values):
+        """
+        Q para las filas posteriores a `values` según `ordering`:
+        (a > va) OR (a = va AND b > vb) OR ...
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _invert(ordering):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        values, reverse = self.decode_cursor(request)
+        self.has_cursor = values is not None
+        self.count_queryset = queryset
+
+        ordering = self._invert(self.ordering) if reverse else self.ordering
+        if values is not None:
+            if len(values) != len(ordering):
+                raise NotFound('Cursor inválido')
+            queryset = queryset.filter(self._after(ordering, values))
+
+        rows = list(queryset.order_by(*ordering)[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        # Hay página siguiente si avanzando quedaron filas, o si retrocedimos
+        self.has_next = has_more if not reverse else bool(rows)
+        self.has_previous = self.has_cursor if not reverse else has_more
+        return rows
+
+    # Respuesta ---------------------------------------------------------------
+
+    def _link(self, obj, reverse):
+        values = [self._field_value(obj, field) for field in self.ordering]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], True)
+
+    def get_count(self):
+        """Total cacheado por SQL del queryset (solo si se pide con ?count=true)"""
+        if self.request.query_params.get(self.count_query_param, '').lower() != 'true':
+            return None
+        queryset = getattr(self, 'count_queryset', None)
+        if queryset is None:
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        key = 'pagination:count:' + hashlib.md5(f'{sql}{params}'.encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.order_by().count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        count = self.get_count()
+        if count is not None:
+            payload['count'] = count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class OptionalKeysetPaginationMixin:
+    """
+    Usa KeysetPagination cuando el viewset lo habilita con
+    `keyset_pagination = True` y el cliente lo pide con ?pagination=cursor
+    (o envía un ?cursor=); en otro caso, paginación por número de página.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request, view):
+        if not getattr(view, 'keyset_pagination', False):
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request, view):
+            keyset = self.keyset_class()
+            keyset.max_page_size = getattr(self, 'max_page_size', None) or keyset.max_page_size
+            try:
+                page = keyset.paginate_queryset(queryset, request, view)
+            except KeysetOrderingError as e:
+                # El cursor paginaría con otro orden que el del queryset
+                print(f"Paginación por cursor no disponible, se usa por número de página: {e}")
+            else:
+                self.keyset = keyset
+                return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class DefaultPagination(OptionalKeysetPaginationMixin, PageNumberPagination):
+    """Paginación por defecto del proyecto (REST_FRAMEWORK.DEFAULT_PAGINATION_CLASS)"""
+    pass
+
+
+class StandardResultsSetPagination(OptionalKeysetPaginationMixin, PageNumberPagination):
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import InventoryItem, InventoryMovement, InventoryCategory, StockAlert
+from .models import (InventoryItem, InventoryMovement, InventoryCategory, StockAlert,
+                     InventoryBalanceSnapshot)
 
 
 @admin.register(InventoryCategory)
@@ -17,10 +18,24 @@ class InventoryItemAdmin(admin.ModelAdmin):
 
 @admin.register(InventoryMovement)
 class InventoryMovementAdmin(admin.ModelAdmin):
-    list_display = ['item', 'movement_type', 'quantity', 'date', 'created_by']
+    list_display = ['item', 'movement_type', 'quantity', 'stock_delta', 'date', 'created_by']
     list_filter = ['movement_type', 'date']
     search_fields = ['item__name', 'reference']
 
+    def has_change_permission(self, request, obj=None):
+        # Libro mayor de solo inserción
+        return obj is None
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(InventoryBalanceSnapshot)
+class InventoryBalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['item', 'date', 'balance', 'organization']
+    list_filter = ['date', 'organization']
+    search_fields = ['item__name', 'item__code']
+
 
 @admin.register(StockAlert)
 class StockAlertAdmin(admin.ModelAdmin):
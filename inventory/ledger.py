@@ -0,0 +1,237 @@
+"""
+Libro mayor de inventario.
+
+InventoryMovement es de solo inserción. Cada movimiento guarda la variación
+que aplicó al stock (stock_delta) y el stock del item se actualiza con
+UPDATE ... current_stock = current_stock + delta, sin leer y reescribir la
+fila completa, así los movimientos concurrentes no pierden actualizaciones:
+- entrada: +cantidad;
+- salida: -cantidad, solo si hay stock suficiente (UPDATE condicional);
+- ajuste: fija el stock en la cantidad indicada; la variación se calcula
+  con la fila del item bloqueada.
+
+InventoryBalanceSnapshot guarda el stock de cada item al cierre de un día
+(comando snapshot_inventory_balances, pensado para correr a diario). El
+stock en una fecha se reconstruye con el snapshot anterior más cercano y
+los movimientos posteriores; sin snapshot, desde el stock actual hacia
+atrás. Un movimiento con fecha anterior a un snapshot lo invalida.
+
+import_movements aplica miles de movimientos en una sola transacción: un
+bulk_create para los movimientos y un UPDATE por item.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import InventoryBalanceSnapshot, InventoryItem, InventoryMovement, StockAlert
+
+
+class InventoryLedgerError(ValueError):
+    """El movimiento no se puede aplicar"""
+
+
+class InsufficientStock(InventoryLedgerError):
+    pass
+
+
+def _items():
+    return InventoryItem.objects.all_organizations()
+
+
+def _signed_delta(movement_type, quantity, current=None):
+    """Variación de stock de un movimiento; `current` solo hace falta para ajustes"""
+    if movement_type == InventoryMovement.ENTRY:
+        return quantity
+    if movement_type == InventoryMovement.EXIT:
+        return -quantity
+    if movement_type == InventoryMovement.ADJUSTMENT:
+        return quantity - current
+    raise InventoryLedgerError(f'Tipo de movimiento inválido: {movement_type}')
+
+
+# ----------------------------------------------------------------------
+# Registro
+# ----------------------------------------------------------------------
+
+def apply_movement(movement):
+    """
+    Aplica el movimiento (aún sin guardar) al stock de su item y completa
+    movement.stock_delta. Debe llamarse dentro de una transacción.
+    """
+    quantity = Decimal(str(movement.quantity))
+    items = _items().filter(pk=movement.item_id)
+
+    if movement.movement_type == InventoryMovement.ADJUSTMENT:
+        current = items.select_for_update().values_list('current_stock', flat=True).get()
+        delta = _signed_delta(movement.movement_type, quantity, current)
+        items.update(current_stock=F('current_stock') + delta, updated_at=timezone.now())
+    else:
+        delta = _signed_delta(movement.movement_type, quantity)
+        if delta < 0:
+            items = items.filter(current_stock__gte=-delta)
+        if not items.update(current_stock=F('current_stock') + delta, updated_at=timezone.now()):
+            raise InsufficientStock('Stock insuficiente para registrar la salida')
+
+    movement.stock_delta = delta
+    return delta
+
+
+def invalidate_snapshots(first_dates):
+    """Borra los snapshots desde la fecha del primer movimiento de cada item"""
+    if not first_dates:
+        return
+    condition = Q()
+    for item_id, date in first_dates.items():
+        condition |= Q(item_id=item_id, date__gte=date)
+    InventoryBalanceSnapshot.objects.all_organizations().filter(condition).delete()
+
+
+def check_low_stock(item_ids):
+    """Crea alertas para los items bajo el mínimo que no tengan una abierta"""
+    low = list(
+        _items().filter(id__in=item_ids, current_stock__lte=F('minimum_stock'))
+        .values('id', 'organization_id', 'current_stock', 'minimum_stock')
+    )
+    if not low:
+        return []
+    alerted = set(
+        StockAlert.objects.all_organizations()
+        .filter(item_id__in=[item['id'] for item in low], is_resolved=False)
+        .values_list('item_id', flat=True)
+    )
+    return StockAlert.objects.bulk_create([
+        StockAlert(
+            organization_id=item['organization_id'],
+            item_id=item['id'],
+            current_stock=item['current_stock'],
+            minimum_stock=item['minimum_stock'],
+        )
+        for item in low if item['id'] not in alerted
+    ])
+
+
+def finish_movements(first_dates):
+    """Tareas posteriores a registrar movimientos: {item_id: fecha más antigua}"""
+    invalidate_snapshots(first_dates)
+    check_low_stock(list(first_dates))
+
+
+def import_movements(rows, user=None, organization=None):
+    """
+    Registra muchos movimientos en una sola transacción. `rows` son
+    diccionarios con item (id), movement_type, quantity, date y opcionalmente
+    reference, reason, unit_cost, total_cost; se aplican en orden.
+    Si un movimiento no se puede aplicar (item inexistente, stock
+    insuficiente) no se registra ninguno. Retorna los movimientos creados.
+    """
+    rows = list(rows)
+    item_ids = sorted({row['item'] for row in rows})
+    with transaction.atomic():
+        # Bloqueo en orden de id: dos importaciones no se bloquean mutuamente
+        items = _items().select_for_update().filter(id__in=item_ids).order_by('id')
+        if organization is not None:
+            items = items.filter(organization=organization)
+        stock = {
+            item['id']: item for item in items.values('id', 'organization_id', 'current_stock')
+        }
+        missing = [item_id for item_id in item_ids if item_id not in stock]
+        if missing:
+            raise InventoryLedgerError(f'Items inexistentes: {missing}')
+
+        balances = {item_id: item['current_stock'] for item_id, item in stock.items()}
+        deltas = defaultdict(Decimal)
+        first_dates = {}
+        movements = []
+        for index, row in enumerate(rows):
+            item_id = row['item']
+            quantity = Decimal(str(row['quantity']))
+            delta = _signed_delta(row['movement_type'], quantity, balances[item_id])
+            if balances[item_id] + delta < 0:
+                raise InsufficientStock(
+                    f'Fila {index + 1}: stock insuficiente para el item {item_id} '
+                    f'(stock {balances[item_id]}, salida {quantity})'
+                )
+            balances[item_id] += delta
+            deltas[item_id] += delta
+            first_dates[item_id] = min(first_dates.get(item_id, row['date']), row['date'])
+            movements.append(InventoryMovement(
+                organization_id=stock[item_id]['organization_id'],
+                item_id=item_id,
+                movement_type=row['movement_type'],
+                quantity=quantity,
+                stock_delta=delta,
+                date=row['date'],
+                reference=row.get('reference', ''),
+                reason=row.get('reason', ''),
+                unit_cost=row.get('unit_cost'),
+                total_cost=row.get('total_cost'),
+                created_by=user if user and user.is_authenticated else None,
+            ))
+
+        created = InventoryMovement.objects.bulk_create(movements, batch_size=1000)
+        now = timezone.now()
+        for item_id, delta in deltas.items():
+            if delta:
+                _items().filter(pk=item_id).update(
+                    current_stock=F('current_stock') + delta, updated_at=now
+                )
+        finish_movements(first_dates)
+    return created
+
+
+# ----------------------------------------------------------------------
+# Snapshots y reconstrucción
+# ----------------------------------------------------------------------
+
+def _delta_sum(movements):
+    return movements.aggregate(total=Sum('stock_delta'))['total'] or Decimal('0')
+
+
+def stock_at(item, day):
+    """Stock del item al cierre de `day`"""
+    movements = InventoryMovement.objects.all_organizations().filter(item_id=item.pk)
+    snapshot = (
+        InventoryBalanceSnapshot.objects.all_organizations()
+        .filter(item_id=item.pk, date__lte=day).order_by('-date').first()
+    )
+    if snapshot:
+        return snapshot.balance + _delta_sum(movements.filter(date__gt=snapshot.date, date__lte=day))
+    # Sin snapshot previo: desde el stock actual, deshaciendo los movimientos posteriores
+    current = _items().filter(pk=item.pk).values_list('current_stock', flat=True).get()
+    return current - _delta_sum(movements.filter(date__gt=day))
+
+
+def take_snapshots(day=None, organization_id=None):
+    """
+    Guarda el stock de cada item al cierre de `day` (hoy por defecto) con
+    dos consultas de lectura y un INSERT. Retorna la cantidad de snapshots.
+    """
+    day = day or timezone.localdate()
+    items = _items()
+    if organization_id:
+        items = items.filter(organization_id=organization_id)
+    # Movimientos con fecha posterior (p. ej. programados) no cuentan para el día
+    later = dict(
+        InventoryMovement.objects.all_organizations()
+        .filter(item__in=items, date__gt=day)
+        .values('item_id').annotate(total=Sum('stock_delta')).order_by()
+        .values_list('item_id', 'total')
+    )
+    snapshots = [
+        InventoryBalanceSnapshot(
+            organization_id=organization,
+            item_id=item_id,
+            date=day,
+            balance=current - (later.get(item_id) or 0),
+        )
+        for item_id, organization, current in items.values_list('id', 'organization_id', 'current_stock')
+    ]
+    with transaction.atomic():
+        InventoryBalanceSnapshot.objects.all_organizations().filter(
+            item__in=items, date=day
+        ).delete()
+        InventoryBalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Organization
+from inventory.ledger import take_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Guarda el stock de cada item de inventario al cierre del día '
+        '(InventoryBalanceSnapshot); correrlo a diario acota los movimientos '
+        'que hay que recorrer para reconstruir el stock en una fecha'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            help='Subdominio de la organización (default: todas)'
+        )
+        parser.add_argument(
+            '--date',
+            help='Fecha del snapshot AAAA-MM-DD (default: hoy)'
+        )
+
+    def handle(self, *args, **options):
+        organization_id = None
+        if options['organization']:
+            try:
+                organization_id = Organization.objects.get(subdomain=options['organization']).id
+            except Organization.DoesNotExist:
+                raise CommandError(f"Organización '{options['organization']}' no encontrada")
+
+        day = None
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Fecha inválida; use AAAA-MM-DD')
+
+        count = take_snapshots(day, organization_id)
+        self.stdout.write(self.style.SUCCESS(f'{count} snapshots de stock guardados'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_alter_inventorycategory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['organization', 'date', 'created_at', 'id'], name='inventory_m_organiz_a500ab_idx'),
+        ),
+    ]
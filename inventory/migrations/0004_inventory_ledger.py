@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F
+
+
+def backfill_stock_delta(apps, schema_editor):
+    """
+    Variación de los movimientos existentes. Entradas y salidas son exactas;
+    los ajustes fijaban el stock, así que su variación se reconstruye
+    recorriendo los movimientos del item desde stock cero.
+    """
+    InventoryMovement = apps.get_model('inventory', 'InventoryMovement')
+    movements = InventoryMovement.objects.filter(stock_delta__isnull=True)
+    movements.filter(movement_type='ENTRY').update(stock_delta=F('quantity'))
+    movements.filter(movement_type='EXIT').update(stock_delta=-F('quantity'))
+
+    item_ids = movements.filter(movement_type='ADJUSTMENT').values_list('item_id', flat=True).distinct()
+    for item_id in list(item_ids):
+        balance = 0
+        adjusted = []
+        for movement in InventoryMovement.objects.filter(item_id=item_id).order_by('date', 'created_at', 'id'):
+            if movement.movement_type == 'ADJUSTMENT':
+                movement.stock_delta = movement.quantity - balance
+                adjusted.append(movement)
+            balance += movement.stock_delta
+        InventoryMovement.objects.bulk_update(adjusted, ['stock_delta'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('inventory', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='stock_delta',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Variación de stock'),
+        ),
+        migrations.CreateModel(
+            name='InventoryBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Stock al cierre')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='inventory.inventoryitem', verbose_name='Item')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Stock',
+                'verbose_name_plural': 'Snapshots de Stock',
+                'db_table': 'inventory_balance_snapshots',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='inventorybalancesnapshot',
+            constraint=models.UniqueConstraint(fields=('item', 'date'), name='inventory_snapshots_unique_day'),
+        ),
+        migrations.RunPython(backfill_stock_delta, migrations.RunPython.noop),
+    ]
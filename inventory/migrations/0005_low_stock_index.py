@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_inventory_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(condition=models.Q(('current_stock__lte', models.F('minimum_stock'))), fields=['organization', 'name'], name='inventory_items_low_stock'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import User
 from tenants.managers import TenantModel
 
@@ -100,6 +100,22 @@ class InventoryItem(TenantModel):
         unique_together = [
             ['organization', 'code'],
         ]
+        indexes = [
+            # Índice parcial: solo los items con stock bajo (filtro low_stock)
+            models.Index(
+                fields=['organization', 'name'],
+                condition=models.Q(current_stock__lte=models.F('minimum_stock')),
+                name='inventory_items_low_stock',
+            ),
+        ]
+
+    # Filtros SQL equivalentes a is_low_stock / stock_status
+    LOW_STOCK = models.Q(current_stock__lte=models.F('minimum_stock'))
+    STOCK_STATUS_FILTERS = {
+        'OUT_OF_STOCK': models.Q(current_stock=0),
+        'LOW_STOCK': LOW_STOCK & ~models.Q(current_stock=0),
+        'NORMAL': ~LOW_STOCK & ~models.Q(current_stock=0),
+    }
 
     def __str__(self):
         return f"{self.code} - {self.name}"
@@ -120,7 +136,13 @@ class InventoryItem(TenantModel):
 
 
 class InventoryMovement(TenantModel):
-    """Movimientos de inventario (entradas y salidas)"""
+    """
+    Movimientos de inventario (entradas y salidas). Son un libro mayor de
+    solo inserción: cada movimiento guarda su variación de stock
+    (stock_delta) y el stock del item se actualiza con una expresión F()
+    atómica (ver inventory/ledger.py). Las correcciones se registran como
+    nuevos movimientos.
+    """
     ENTRY = 'ENTRY'
     EXIT = 'EXIT'
     ADJUSTMENT = 'ADJUSTMENT'
@@ -136,6 +158,9 @@ class InventoryMovement(TenantModel):
                             related_name='movements', verbose_name='Item')
     movement_type = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name='Tipo de movimiento')
     quantity = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Cantidad')
+    # Variación aplicada al stock: +entrada, -salida, ajuste = nuevo stock - stock anterior
+    stock_delta = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                      editable=False, verbose_name='Variación de stock')
     
     # Detalles
     date = models.DateField(verbose_name='Fecha')
@@ -161,26 +186,51 @@ class InventoryMovement(TenantModel):
         indexes = [
             models.Index(fields=['item', 'date']),
             models.Index(fields=['movement_type']),
+            # Paginación keyset por tenant (-date, -created_at, -id)
+            models.Index(fields=['organization', 'date', 'created_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.item.name} ({self.quantity})"
 
     def save(self, *args, **kwargs):
-        """Actualizar stock al guardar movimiento"""
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-        
-        if is_new:
-            # Actualizar stock del item
-            if self.movement_type == self.ENTRY:
-                self.item.current_stock += self.quantity
-            elif self.movement_type == self.EXIT:
-                self.item.current_stock -= self.quantity
-            elif self.movement_type == self.ADJUSTMENT:
-                self.item.current_stock = self.quantity
-            
-            self.item.save()
+        """Registrar el movimiento y actualizar el stock del item en una transacción"""
+        if self.pk is not None:
+            raise ValueError('Los movimientos de inventario no se modifican; registre un ajuste')
+        from .ledger import apply_movement, finish_movements
+        with transaction.atomic():
+            apply_movement(self)
+            super().save(*args, **kwargs)
+            finish_movements({self.item_id: self.date})
+        if self._meta.get_field('item').is_cached(self):
+            self.item.refresh_from_db(fields=['current_stock', 'updated_at'])
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Los movimientos de inventario no se eliminan; registre un ajuste')
+
+
+class InventoryBalanceSnapshot(TenantModel):
+    """
+    Stock de un item al cierre de un día. Con el snapshot más cercano y los
+    movimientos posteriores se reconstruye el stock en cualquier fecha.
+    """
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE,
+                             related_name='balance_snapshots', verbose_name='Item')
+    date = models.DateField(verbose_name='Fecha')
+    balance = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Stock al cierre')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
+
+    class Meta:
+        db_table = 'inventory_balance_snapshots'
+        verbose_name = 'Snapshot de Stock'
+        verbose_name_plural = 'Snapshots de Stock'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'date'], name='inventory_snapshots_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} - {self.date}: {self.balance}"
 
 
 class StockAlert(TenantModel):
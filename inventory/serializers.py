@@ -1,3 +1,4 @@
+from decimal import Decimal
 from rest_framework import serializers
 from .models import InventoryItem, InventoryMovement, InventoryCategory, StockAlert
 
@@ -35,6 +36,13 @@ class InventoryItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Este código ya está registrado.")
         return value
 
+    def update(self, instance, validated_data):
+        # Sin reescribir current_stock: lo actualizan los movimientos (inventory/ledger.py)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data) + ['updated_at'])
+        return instance
+
 
 class InventoryMovementSerializer(serializers.ModelSerializer):
     """Serializer para movimientos de inventario"""
@@ -44,9 +52,9 @@ class InventoryMovementSerializer(serializers.ModelSerializer):
     class Meta:
         model = InventoryMovement
         fields = ['id', 'item', 'item_name', 'movement_type', 'movement_type_display',
-                  'quantity', 'date', 'reference', 'reason', 'unit_cost', 'total_cost',
+                  'quantity', 'stock_delta', 'date', 'reference', 'reason', 'unit_cost', 'total_cost',
                   'created_at']
-        read_only_fields = ['created_at']
+        read_only_fields = ['created_at', 'stock_delta']
 
     def validate(self, data):
         """Validar que haya stock suficiente para salidas"""
@@ -60,6 +68,18 @@ class InventoryMovementSerializer(serializers.ModelSerializer):
         return data
 
 
+class MovementImportSerializer(serializers.Serializer):
+    """Movimiento de la importación masiva (los items se validan en una sola consulta)"""
+    item = serializers.IntegerField()
+    movement_type = serializers.ChoiceField(choices=InventoryMovement.TYPE_CHOICES)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    date = serializers.DateField()
+    reference = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    reason = serializers.CharField(required=False, allow_blank=True, default='')
+    unit_cost = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    total_cost = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+
+
 class StockAlertSerializer(serializers.ModelSerializer):
     """Serializer para alertas de stock"""
     item_name = serializers.CharField(source='item.name', read_only=True)
@@ -1,12 +1,17 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from datetime import datetime
 from django.db.models import Q, Sum
 from .models import InventoryItem, InventoryMovement, InventoryCategory, StockAlert
 from .serializers import (InventoryItemSerializer, InventoryMovementSerializer,
-                          InventoryCategorySerializer, StockAlertSerializer)
+                          InventoryCategorySerializer, StockAlertSerializer,
+                          MovementImportSerializer)
+from .ledger import InventoryLedgerError, import_movements, stock_at
 from users.permissions import IsAdminOrReadOnly
+from tenants.middleware import get_current_organization
 
 
 class InventoryCategoryViewSet(viewsets.ModelViewSet):
@@ -23,12 +28,14 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # El manager filtra por la organización del request (no la del import)
+        queryset = InventoryItem.objects.select_related('category').order_by('name', 'id')
         
         # Filtros
         category = self.request.query_params.get('category', None)
         search = self.request.query_params.get('search', None)
         low_stock = self.request.query_params.get('low_stock', None)
+        stock_status = self.request.query_params.get('status', None)
         is_active = self.request.query_params.get('is_active', None)
         
         if category:
@@ -41,8 +48,15 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
                 Q(species__icontains=search)
             )
         
+        # En SQL: la respuesta sigue siendo un queryset paginable
         if low_stock == 'true':
-            queryset = [item for item in queryset if item.is_low_stock]
+            queryset = queryset.filter(InventoryItem.LOW_STOCK)
+        
+        if stock_status:
+            condition = InventoryItem.STOCK_STATUS_FILTERS.get(stock_status.upper())
+            if condition is None:
+                raise ValidationError({'status': f'Estado inválido: {stock_status}'})
+            queryset = queryset.filter(condition)
         
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
@@ -55,21 +69,33 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def low_stock_items(self, request):
         """Items con stock bajo"""
-        items = [item for item in self.queryset if item.is_low_stock]
+        items = self.get_queryset().filter(InventoryItem.LOW_STOCK)
         serializer = self.get_serializer(items, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def stock_at(self, request, pk=None):
+        """Stock del item al cierre de una fecha (?date=AAAA-MM-DD)"""
+        item = self.get_object()
+        try:
+            day = datetime.strptime(request.query_params.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'date es requerido (AAAA-MM-DD)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'item': item.id, 'date': day, 'stock': stock_at(item, day)})
+    
     @action(detail=False, methods=['get'])
     def availability(self, request):
         """Consultar disponibilidad de insumos"""
         category = request.query_params.get('category')
-        queryset = self.queryset.filter(is_active=True)
+        queryset = InventoryItem.objects.filter(is_active=True).order_by('name', 'id')
         
         if category:
             queryset = queryset.filter(category__name=category)
         
         data = []
-        for item in queryset:
+        for item in queryset.only('id', 'code', 'name', 'current_stock',
+                                  'minimum_stock', 'unit_of_measure'):
             data.append({
                 'id': item.id,
                 'code': item.code,
@@ -83,10 +109,12 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
 
 
 class InventoryMovementViewSet(viewsets.ModelViewSet):
-    """ViewSet para movimientos de inventario"""
+    """ViewSet para movimientos de inventario (solo inserción, ver inventory/ledger.py)"""
     queryset = InventoryMovement.objects.select_related('item', 'created_by')
     serializer_class = InventoryMovementSerializer
     permission_classes = [IsAuthenticated]
+    keyset_pagination = True  # ?pagination=cursor
+    http_method_names = ['get', 'post', 'head', 'options']
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -112,7 +140,31 @@ class InventoryMovementViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        try:
+            serializer.save(created_by=self.request.user)
+        except InventoryLedgerError as e:
+            raise ValidationError({'quantity': str(e)})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """Registrar muchos movimientos en una transacción ({"movements": [...]} o la lista sola)"""
+        movements = request.data
+        if isinstance(movements, dict):
+            movements = movements.get('movements')
+        if not isinstance(movements, list):
+            return Response({'error': 'Se espera una lista de movimientos (movements)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = MovementImportSerializer(data=movements, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        organization = get_current_organization()
+        try:
+            created = import_movements(serializer.validated_data, user=request.user, organization=organization)
+        except InventoryLedgerError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'message': 'Movimientos registrados',
+            'count': len(created),
+        }, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['get'])
     def report(self, request):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MarketPrice, PriceAlert
+from .models import MarketPrice, PriceAlert, MarketSnapshot
 
 
 @admin.register(MarketPrice)
@@ -16,3 +16,11 @@ class PriceAlertAdmin(admin.ModelAdmin):
     list_filter = ['alert_type', 'is_active', 'created_at', 'organization']
     search_fields = ['product_type', 'message']
     date_hierarchy = 'created_at'
+
+
+@admin.register(MarketSnapshot)
+class MarketSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['date', 'computed_at', 'organization']
+    list_filter = ['date', 'organization']
+    readonly_fields = ['computed_at']
+    date_hierarchy = 'date'
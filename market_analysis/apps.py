@@ -5,3 +5,6 @@ class MarketAnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'market_analysis'
     verbose_name = 'Análisis de Mercado'
+
+    def ready(self):
+        import market_analysis.signals
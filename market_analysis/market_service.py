@@ -1,73 +1,32 @@
 from datetime import datetime, timedelta
 from django.db.models import Avg, Sum, Count
-from production.models import HarvestedProduct
 from .models import MarketPrice, PriceAlert
-import random
+from .snapshots import BASE_PRICES, market_snapshots
 
 
 class MarketAnalysisService:
     """Servicio para análisis de mercado basado en datos de producción"""
     
     # Precios base promedio en Bs por kg (Bolivia)
-    BASE_PRICES = {
-        'QUINUA': 15.50,
-        'PAPA': 3.20,
-        'MAIZ': 4.80,
-        'TRIGO': 3.50,
-        'CEBADA': 3.00,
-        'HABA': 5.50,
-        'ARVEJA': 6.00,
-    }
+    BASE_PRICES = BASE_PRICES
     
     def __init__(self, organization):
         self.organization = organization
+        self._trends = None
     
     def get_market_trends(self):
-        """Obtiene tendencias de mercado basadas en producción histórica"""
-        
-        # Obtener producción de los últimos 30 días
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_production = HarvestedProduct.objects.filter(
-            organization=self.organization,
-            harvest_date__gte=thirty_days_ago
-        ).values('product_name').annotate(
-            total_quantity=Sum('quantity')
-        )
-        
-        trends = []
-        for prod in recent_production:
-            product_name = prod['product_name'].upper()
-            # Intentar mapear el nombre del producto a un tipo conocido
-            crop_type = product_name
-            for key in self.BASE_PRICES.keys():
-                if key in product_name:
-                    crop_type = key
-                    break
-            
-            base_price = self.BASE_PRICES.get(crop_type, 5.0)
-            
-            # Simular variación de precio basada en producción
-            # Más producción = precio tiende a bajar
-            quantity = float(prod['total_quantity'] or 0)
-            price_variation = random.uniform(-15, 20)  # -15% a +20%
-            
-            current_price = base_price * (1 + price_variation / 100)
-            
-            trends.append({
-                'product': product_name,
-                'base_price': round(base_price, 2),
-                'current_price': round(current_price, 2),
-                'variation': round(price_variation, 1),
-                'total_production': round(quantity, 2),
-                'trend': 'up' if price_variation > 0 else 'down'
-            })
-        
-        return trends
+        """
+        Obtiene tendencias de mercado del snapshot del día (ver
+        market_analysis/snapshots.py); se calcula una vez por día.
+        """
+        if self._trends is None:
+            self._trends = market_snapshots.get(self.organization)
+        return self._trends
     
-    def get_price_alerts(self):
+    def get_price_alerts(self, trends=None):
         """Genera alertas de precio basadas en tendencias"""
         
-        trends = self.get_market_trends()
+        trends = self.get_market_trends() if trends is None else trends
         alerts = []
         
         for trend in trends:
@@ -104,10 +63,10 @@ class MarketAnalysisService:
         
         return alerts
     
-    def get_opportunities(self):
+    def get_opportunities(self, trends=None):
         """Detecta oportunidades comerciales"""
         
-        trends = self.get_market_trends()
+        trends = self.get_market_trends() if trends is None else trends
         opportunities = []
         
         for trend in trends:
@@ -167,8 +126,8 @@ class MarketAnalysisService:
         """Resumen completo del análisis de mercado"""
         
         trends = self.get_market_trends()
-        alerts = self.get_price_alerts()
-        opportunities = self.get_opportunities()
+        alerts = self.get_price_alerts(trends)
+        opportunities = self.get_opportunities(trends)
         demand = self.get_demand_analysis()
         
         return {
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('market_analysis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('trends', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Mercado',
+                'verbose_name_plural': 'Snapshots de Mercado',
+                'db_table': 'market_snapshots',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='marketsnapshot',
+            constraint=models.UniqueConstraint(fields=('organization', 'date'), name='market_snapshots_unique_day'),
+        ),
+    ]
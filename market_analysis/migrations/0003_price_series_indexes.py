@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_analysis', '0002_market_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='marketprice',
+            index=models.Index(fields=['organization', 'product_type', 'date'], name='market_anal_organiz_a0a676_idx'),
+        ),
+    ]
@@ -24,6 +24,10 @@ class MarketPrice(TenantModel):
         ordering = ['-date']
         verbose_name = 'Precio de Mercado'
         verbose_name_plural = 'Precios de Mercado'
+        indexes = [
+            # Series por producto (market_analysis/timeseries.py)
+            models.Index(fields=['organization', 'product_type', 'date']),
+        ]
     
     def __str__(self):
         return f"{self.product_type} - Bs. {self.price_per_kg} ({self.date})"
@@ -52,3 +56,32 @@ class PriceAlert(TenantModel):
     
     def __str__(self):
         return f"{self.product_type} - {self.alert_type}"
+
+
+class MarketSnapshot(TenantModel):
+    """
+    Tendencias de mercado de una organización calculadas una vez por día
+    (ver market_analysis/snapshots.py). Alertas, oportunidades y el resumen
+    leen el mismo snapshot.
+    """
+    
+    date = models.DateField()
+    # [{'product', 'crop_type', 'base_price', 'reference_price', 'current_price',
+    #   'variation', 'total_production', 'trend', 'price_source'}]
+    trends = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'market_snapshots'
+        ordering = ['-date']
+        verbose_name = 'Snapshot de Mercado'
+        verbose_name_plural = 'Snapshots de Mercado'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['organization', 'date'],
+                name='market_snapshots_unique_day',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Mercado {self.date} ({len(self.trends)} productos)"
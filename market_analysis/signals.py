@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import MarketPrice
+from .snapshots import market_snapshots
+from .timeseries import MARKET, price_series
+
+
+@receiver(post_save, sender=MarketPrice)
+@receiver(post_delete, sender=MarketPrice)
+def invalidate_market_price_caches(sender, instance, **kwargs):
+    """Un precio nuevo o borrado cambia las tendencias desde su fecha y la serie del producto"""
+    market_snapshots.invalidate(instance.organization_id, since=instance.date)
+    price_series.invalidate(instance.organization_id, MARKET, instance.product_type)
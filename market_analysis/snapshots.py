@@ -0,0 +1,213 @@
+"""
+Snapshot diario de tendencias de mercado por organización.
+
+Las tendencias se calculan una vez por (organización, día) a partir del
+historial de MarketPrice y de la producción de los últimos 30 días
+(ProductDailySummary), y se guardan en MarketSnapshot. Alertas,
+oportunidades y el resumen leen el mismo snapshot, así los números son
+reproducibles y coherentes entre sí.
+
+Cálculo por producto:
+- precio actual: el último MarketPrice del tipo de cultivo hasta el día;
+- precio de referencia: promedio de los precios de los
+  MARKET_REFERENCE_DAYS días anteriores al precio actual;
+- variación: (actual - referencia) / referencia en %.
+Sin precios registrados se usa el precio base (variación 0); sin historial
+previo, el precio base es la referencia.
+
+Dos niveles de caché: LRU en memoria por proceso
+(MARKET_SNAPSHOT_CACHE_TTL segundos) y la tabla market_snapshots. Registrar
+o borrar un precio (señales en market_analysis/signals.py) o una cosecha
+(production/summaries.py) invalida los snapshots de su organización desde
+esa fecha.
+"""
+import copy
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from production.models import ProductDailySummary
+from tenants.cache import LocalTTLCache
+from .models import MarketPrice, MarketSnapshot
+
+
+# Precios base promedio en Bs por kg (Bolivia)
+BASE_PRICES = {
+    'QUINUA': 15.50,
+    'PAPA': 3.20,
+    'MAIZ': 4.80,
+    'TRIGO': 3.50,
+    'CEBADA': 3.00,
+    'HABA': 5.50,
+    'ARVEJA': 6.00,
+}
+DEFAULT_PRICE = 5.0
+
+# Días de producción que se consideran en cada snapshot
+PRODUCTION_DAYS = 30
+
+
+def crop_type_for(product_name):
+    """Tipo de cultivo conocido contenido en el nombre del producto (o el nombre)"""
+    name = product_name.upper()
+    for key in BASE_PRICES:
+        if key in name:
+            return key
+    return name
+
+
+def _price_history(organization, day):
+    """
+    {tipo de cultivo: [(fecha, precio), ...]} ordenado por fecha: el último
+    precio hasta `day` y los de su ventana de referencia.
+    """
+    prices = MarketPrice.objects.all_organizations().filter(organization=organization, date__lte=day)
+    latest = dict(
+        prices.values('product_type').annotate(last=Max('date')).order_by()
+        .values_list('product_type', 'last')
+    )
+    if not latest:
+        return {}
+
+    reference_days = timedelta(days=settings.MARKET_REFERENCE_DAYS)
+    rows = prices.filter(
+        date__gte=min(latest.values()) - reference_days
+    ).order_by('product_type', 'date', 'id').values_list('product_type', 'date', 'price_per_kg')
+
+    history = defaultdict(list)
+    for product_type, date, price in rows:
+        if date >= latest[product_type] - reference_days:
+            history[product_type].append((date, float(price)))
+    return history
+
+
+def _price_stats(crop_type, history):
+    """(precio base, referencia, actual, fuente) de un tipo de cultivo"""
+    base_price = BASE_PRICES.get(crop_type, DEFAULT_PRICE)
+    prices = history.get(crop_type)
+    if not prices:
+        return base_price, base_price, base_price, 'BASE'
+
+    current_date, current_price = prices[-1]
+    previous = [price for date, price in prices if date < current_date]
+    reference = sum(previous) / len(previous) if previous else base_price
+    return base_price, reference, current_price, 'MARKET'
+
+
+def compute_trends(organization, day):
+    """Tendencias de mercado de la organización para el día dado"""
+    production = ProductDailySummary.objects.all_organizations().filter(
+        organization=organization,
+        date__gte=day - timedelta(days=PRODUCTION_DAYS),
+        date__lte=day,
+    ).values('product_name').annotate(
+        total_quantity=Sum('total_quantity')
+    ).order_by('product_name')
+    history = _price_history(organization, day)
+
+    trends = []
+    for prod in production:
+        product_name = prod['product_name'].upper()
+        crop_type = crop_type_for(product_name)
+        base_price, reference, current_price, source = _price_stats(crop_type, history)
+        variation = (current_price - reference) / reference * 100 if reference else 0.0
+
+        trends.append({
+            'product': product_name,
+            'crop_type': crop_type,
+            'base_price': round(base_price, 2),
+            'reference_price': round(reference, 2),
+            'current_price': round(current_price, 2),
+            'variation': round(variation, 1),
+            'total_production': round(float(prod['total_quantity'] or 0), 2),
+            'trend': 'up' if variation > 0 else 'down',
+            'price_source': source,
+        })
+    return trends
+
+
+class MarketSnapshotStore:
+    """Snapshots de mercado por (organización, día) con LRU en memoria"""
+
+    def __init__(self):
+        self._memory = LocalTTLCache(
+            max_size=getattr(settings, 'MARKET_SNAPSHOT_CACHE_SIZE', 1024),
+            ttl=getattr(settings, 'MARKET_SNAPSHOT_CACHE_TTL', 300),
+        )
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self.computed = 0
+
+    def _lock_for(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _load(self, organization_id, day):
+        return MarketSnapshot.objects.all_organizations().filter(
+            organization_id=organization_id, date=day
+        ).values_list('trends', flat=True).first()
+
+    def get(self, organization, day=None, refresh=False):
+        """
+        Tendencias de la organización para `day` (hoy por defecto). Retorna
+        una copia: los llamadores pueden modificarla.
+        """
+        day = day or timezone.localdate()
+        key = (organization.id, day)
+        if not refresh:
+            trends = self._memory.get(key)
+            if trends is not None:
+                return copy.deepcopy(trends)
+
+        # Una sola consulta por snapshot aunque lleguen varios requests a la vez
+        with self._lock_for(key):
+            trends = None if refresh else self._memory.get(key)
+            if trends is None and not refresh:
+                trends = self._load(organization.id, day)
+            if trends is None:
+                trends = self._compute(organization, day)
+            self._memory.set(key, trends)
+        return copy.deepcopy(trends)
+
+    def _compute(self, organization, day):
+        trends = compute_trends(organization, day)
+        self.computed += 1
+        snapshots = MarketSnapshot.objects.all_organizations()
+        try:
+            with transaction.atomic():
+                updated = snapshots.filter(organization=organization, date=day).update(
+                    trends=trends, computed_at=timezone.now()
+                )
+                if not updated:
+                    snapshots.create(organization=organization, date=day, trends=trends)
+        except IntegrityError:
+            # Otro proceso guardó el snapshot del día: se usa ese
+            return self._load(organization.id, day) or trends
+        return trends
+
+    def invalidate(self, organization_id, since=None):
+        """
+        Descarta los snapshots de la organización (desde la fecha `since`
+        inclusive, o todos); se recalculan en la próxima consulta.
+        """
+        snapshots = MarketSnapshot.objects.all_organizations().filter(organization_id=organization_id)
+        if since is None:
+            self._memory.delete_where(lambda key: key[0] == organization_id)
+        else:
+            snapshots = snapshots.filter(date__gte=since)
+            self._memory.delete_where(lambda key: key[0] == organization_id and key[1] >= since)
+        snapshots.delete()
+
+    def stats(self):
+        return {
+            'computed': self.computed,
+            'memory': self._memory.stats(),
+        }
+
+
+market_snapshots = MarketSnapshotStore()
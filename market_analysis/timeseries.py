@@ -0,0 +1,269 @@
+"""
+Series de tiempo de precios y estadísticas móviles.
+
+Fuentes (todas con índice (organización, producto, fecha)):
+- 'market': MarketPrice.price_per_kg por product_type (promedio del día si
+  hay varios registros);
+- 'trend': PriceTrend.average_price por product_name;
+- 'demand': DemandTrend.demand_index por product_name.
+
+La serie se lleva a días calendario (un día sin dato repite el último valor)
+y sobre ella se calculan con NumPy, para cada ventana de N días:
+- moving_average: promedio de los últimos N días;
+- volatility: desvío estándar de los retornos logarítmicos diarios de los
+  últimos N días, en %;
+- pct_change: variación porcentual contra el valor de N días antes.
+
+Las estadísticas se cachean por (organización, fuente, producto,
+parámetros, día, versión) en un LRU por proceso (PRICE_SERIES_CACHE_TTL).
+La versión de cada producto vive en la caché de Django: guardar o borrar una
+fila de la serie la cambia (señales de market_analysis y analytics) y todos
+los workers dejan de usar sus entradas anteriores. Con una caché por proceso
+(LocMemCache) la invalidación solo alcanza al worker que hizo el cambio y
+los demás ven datos nuevos al vencer el TTL; en producción conviene una
+caché compartida (Redis, Memcached). Las cargas masivas que no disparan
+señales (bulk_create, update) deben llamar a price_series.invalidate.
+"""
+import copy
+import uuid
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg
+from django.utils import timezone
+
+from analytics.models import DemandTrend, PriceTrend
+from tenants.cache import LocalTTLCache
+from .models import MarketPrice
+
+
+MARKET = 'market'
+TREND = 'trend'
+DEMAND = 'demand'
+
+# {fuente: (modelo, campo del producto, campo del valor)}
+SOURCES = {
+    MARKET: (MarketPrice, 'product_type', 'price_per_kg'),
+    TREND: (PriceTrend, 'product_name', 'average_price'),
+    DEMAND: (DemandTrend, 'product_name', 'demand_index'),
+}
+
+
+def parse_windows(value=None):
+    """Ventanas en días desde '7,30,90' (o una lista); ValueError si son inválidas"""
+    if value is None or value == '':
+        value = settings.PRICE_SERIES_WINDOWS
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    try:
+        windows = sorted({int(window) for window in value})
+    except (TypeError, ValueError):
+        raise ValueError(f"Ventanas inválidas: {value!r}")
+    if not windows or windows[0] < 2 or windows[-1] > settings.PRICE_SERIES_MAX_WINDOW:
+        raise ValueError(
+            f"Las ventanas deben estar entre 2 y {settings.PRICE_SERIES_MAX_WINDOW} días"
+        )
+    return windows
+
+
+# ----------------------------------------------------------------------
+# Cálculo
+# ----------------------------------------------------------------------
+
+def daily_series(rows):
+    """
+    (fechas, valores) por día calendario desde filas [(fecha, valor)]
+    ordenadas por fecha; los días sin dato repiten el último valor.
+    """
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=float)
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    values = np.array([float(row[1]) for row in rows], dtype=float)
+
+    calendar = np.arange(dates[0], dates[-1] + 1, dtype='datetime64[D]')
+    # Índice del último dato disponible para cada día del calendario
+    positions = np.searchsorted(dates, calendar, side='right') - 1
+    return calendar, values[positions]
+
+
+def moving_average(values, window):
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def volatility(values, window):
+    result = np.full(len(values), np.nan)
+    if len(values) > window:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(np.log(np.where(values > 0, values, np.nan)))
+        windows = np.lib.stride_tricks.sliding_window_view(returns, window)
+        result[window:] = np.std(windows, axis=-1, ddof=1) * 100
+    return result
+
+
+def pct_change(values, window):
+    result = np.full(len(values), np.nan)
+    if len(values) > window:
+        previous = values[:-window]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[window:] = np.where(previous != 0, (values[window:] / previous - 1) * 100, np.nan)
+    return result
+
+
+def rolling_stats(values, windows):
+    """{ventana: {'moving_average', 'volatility', 'pct_change'}} como arrays"""
+    return {
+        window: {
+            'moving_average': moving_average(values, window),
+            'volatility': volatility(values, window),
+            'pct_change': pct_change(values, window),
+        }
+        for window in windows
+    }
+
+
+def _to_list(array, places=4):
+    """Array a lista JSON (NaN -> None)"""
+    return [None if np.isnan(value) else round(float(value), places) for value in array]
+
+
+# ----------------------------------------------------------------------
+# Consulta con caché
+# ----------------------------------------------------------------------
+
+class PriceSeriesEngine:
+    """Series por producto y estadísticas móviles cacheadas por día"""
+
+    VERSION_PREFIX = 'price_series:version:'
+
+    def __init__(self):
+        self._memory = LocalTTLCache(
+            max_size=getattr(settings, 'PRICE_SERIES_CACHE_SIZE', 2048),
+            ttl=getattr(settings, 'PRICE_SERIES_CACHE_TTL', 300),
+        )
+        self.computed = 0
+
+    def _version_keys(self, organization_id, source, product):
+        return [
+            f'{self.VERSION_PREFIX}{organization_id}',
+            f'{self.VERSION_PREFIX}{organization_id}:{source}:{product}',
+        ]
+
+    def _version(self, organization_id, source, product):
+        """Versión vigente (organización, producto) según la caché de Django"""
+        keys = self._version_keys(organization_id, source, product)
+        try:
+            versions = cache.get_many(keys)
+        except Exception as e:
+            print(f"Error al leer versiones de series de precios: {e}")
+            return None
+        return tuple(versions.get(key) for key in keys)
+
+    def cached(self, organization_id, source, product, params, compute):
+        """
+        Resultado de `compute()` cacheado por (organización, fuente,
+        producto, parámetros, día, versión). Retorna una copia.
+        """
+        version = self._version(organization_id, source, product)
+        if version is None:
+            return compute()
+        key = (organization_id, source, product, params, timezone.localdate(), version)
+        result = self._memory.get(key)
+        if result is None:
+            result = compute()
+            self.computed += 1
+            self._memory.set(key, result)
+        return copy.deepcopy(result)
+
+    def rows(self, organization, source, product, start=None, end=None):
+        """[(fecha, valor)] de la serie ordenada por fecha (valor promedio por día)"""
+        model, product_field, value_field = SOURCES[source]
+        queryset = model.objects.all_organizations().filter(
+            organization=organization, **{product_field: product}
+        )
+        if start:
+            queryset = queryset.filter(date__gte=start)
+        if end:
+            queryset = queryset.filter(date__lte=end)
+        return list(
+            queryset.values('date').annotate(value=Avg(value_field))
+            .order_by('date').values_list('date', 'value')
+        )
+
+    def statistics(self, organization, source, product, windows=None, days=None):
+        """
+        Serie diaria de los últimos `days` días (toda la historia si es
+        None) con sus estadísticas móviles por ventana.
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Fuente inválida: {source!r}")
+        windows = parse_windows(windows)
+        days = int(days) if days else None
+        return self.cached(
+            organization.id, source, product, ('statistics', tuple(windows), days),
+            lambda: self._compute(organization, source, product, windows, days),
+        )
+
+    def _compute(self, organization, source, product, windows, days):
+        end = timezone.localdate()
+        start = None
+        if days:
+            # Historia previa para que las ventanas estén completas desde el inicio
+            start = end - timedelta(days=days - 1 + windows[-1])
+        dates, values = daily_series(self.rows(organization, source, product, start, end))
+        stats = rolling_stats(values, windows)
+
+        keep = slice(None)
+        if days and len(dates):
+            keep = slice(int(np.searchsorted(dates, np.datetime64(end - timedelta(days=days - 1)))), None)
+
+        result = {
+            'product': product,
+            'source': source,
+            'dates': [str(day) for day in dates[keep]],
+            'values': _to_list(values[keep]),
+            'windows': {},
+        }
+        for window, series in stats.items():
+            result['windows'][str(window)] = {
+                name: _to_list(array[keep]) for name, array in series.items()
+            }
+            result['windows'][str(window)]['last'] = {
+                name: _to_list(array[-1:])[0] if len(array) else None
+                for name, array in series.items()
+            }
+        return result
+
+    def invalidate(self, organization_id, source=None, product=None):
+        """
+        Descarta los resultados de la organización (de una fuente y un
+        producto, o todos) en todos los workers que comparten la caché.
+        """
+        keys = self._version_keys(organization_id, source, product)
+        key = keys[1] if source is not None and product is not None else keys[0]
+        try:
+            cache.set(key, uuid.uuid4().hex, None)
+        except Exception as e:
+            print(f"Error al invalidar series de precios: {e}")
+
+        def matches(key):
+            return (
+                key[0] == organization_id
+                and (source is None or key[1] == source)
+                and (product is None or key[2] == product)
+            )
+        self._memory.delete_where(matches)
+
+    def stats(self):
+        return {
+            'computed': self.computed,
+            'memory': self._memory.stats(),
+        }
+
+
+price_series = PriceSeriesEngine()
@@ -6,6 +6,7 @@ from rest_framework.permissions import IsAuthenticated
 from .models import MarketPrice, PriceAlert
 from .serializers import MarketPriceSerializer, PriceAlertSerializer
 from .market_service import MarketAnalysisService
+from .timeseries import MARKET, price_series
 
 
 class MarketAnalysisViewSet(viewsets.ViewSet):
@@ -173,6 +174,30 @@ class MarketPriceViewSet(viewsets.ModelViewSet):
         if organization:
             return MarketPrice.objects.filter(organization=organization)
         return MarketPrice.objects.none()
+    
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Serie diaria de precios de un producto con media móvil, volatilidad
+        y variación por ventana (?product_type=QUINUA&windows=7,30&days=365)
+        """
+        product_type = request.query_params.get('product_type')
+        if not product_type:
+            return Response({'error': 'product_type es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        organization = self.request.user.partner.organization if hasattr(self.request.user, 'partner') else None
+        if not organization:
+            return Response({'error': 'Organización no encontrada'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            data = price_series.statistics(
+                organization, MARKET, product_type.upper(),
+                windows=request.query_params.get('windows'),
+                days=request.query_params.get('days'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
 
 
 class PriceAlertViewSet(viewsets.ModelViewSet):
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import HarvestedProduct
+from .models import (
+    HarvestedProduct, ParcelCampaignSummary, PartnerCampaignSummary, ProductDailySummary
+)
 
 
 @admin.register(HarvestedProduct)
@@ -8,3 +10,27 @@ class HarvestedProductAdmin(admin.ModelAdmin):
     list_filter = ['harvest_date', 'campaign', 'quality_grade']
     search_fields = ['product_name', 'parcel__code', 'partner__first_name', 'partner__last_name']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(ParcelCampaignSummary)
+class ParcelCampaignSummaryAdmin(admin.ModelAdmin):
+    list_display = ['parcel', 'campaign', 'total_quantity', 'harvest_count', 'updated_at']
+    list_filter = ['campaign']
+    search_fields = ['parcel__code']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(PartnerCampaignSummary)
+class PartnerCampaignSummaryAdmin(admin.ModelAdmin):
+    list_display = ['partner', 'campaign', 'total_quantity', 'harvest_count', 'updated_at']
+    list_filter = ['campaign']
+    search_fields = ['partner__first_name', 'partner__last_name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ProductDailySummary)
+class ProductDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['product_name', 'date', 'total_quantity', 'harvest_count', 'updated_at']
+    list_filter = ['date']
+    search_fields = ['product_name']
+    readonly_fields = ['updated_at']
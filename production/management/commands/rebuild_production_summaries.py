@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Organization
+from production.summaries import check_summaries, rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde cero los resúmenes de producción (por parcela/campaña, '
+        'socio/campaña y producto/día) o, con --check, verifica que coincidan '
+        'con las cosechas registradas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            help='Subdominio de la organización (default: todas)'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo verificar consistencia; falla si hay diferencias'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Filas por inserción (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        organization_id = None
+        if options['organization']:
+            try:
+                organization_id = Organization.objects.get(subdomain=options['organization']).id
+            except Organization.DoesNotExist:
+                raise CommandError(f"Organización '{options['organization']}' no encontrada")
+
+        if options['check']:
+            self.verify(organization_id)
+            return
+
+        created = rebuild_summaries(organization_id, options['batch_size'])
+        for table, rows in created.items():
+            self.stdout.write(f'  {table}: {rows} filas')
+        self.stdout.write(self.style.SUCCESS('Resúmenes de producción recalculados'))
+
+    def verify(self, organization_id):
+        differences = check_summaries(organization_id)
+        for diff in differences[:50]:
+            self.stdout.write(
+                f"  {diff['table']} {diff['key']}: esperado {diff['expected']}, guardado {diff['stored']}"
+            )
+        if differences:
+            raise CommandError(
+                f'{len(differences)} diferencias en los resúmenes de producción. '
+                'Ejecute rebuild_production_summaries para corregirlas.'
+            )
+        self.stdout.write(self.style.SUCCESS('Resúmenes de producción consistentes'))
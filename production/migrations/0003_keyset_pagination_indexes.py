@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0002_harvestedproduct_organization'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='harvestedproduct',
+            index=models.Index(fields=['organization', 'harvest_date', 'id'], name='harvested_p_organiz_1a3d9e_idx'),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+SUMMARIES = [
+    ('ParcelCampaignSummary', ['parcel_id', 'campaign_id'], ['parcel_id', 'campaign_id']),
+    ('PartnerCampaignSummary', ['partner_id', 'campaign_id'], ['partner_id', 'campaign_id']),
+    ('ProductDailySummary', ['product_name', 'date'], ['product_name', 'harvest_date']),
+]
+
+
+def populate_summaries(apps, schema_editor):
+    HarvestedProduct = apps.get_model('production', 'HarvestedProduct')
+    for model_name, summary_fields, harvest_fields in SUMMARIES:
+        model = apps.get_model('production', model_name)
+        rows = (
+            HarvestedProduct.objects.values('organization_id', *harvest_fields)
+            .annotate(total=Sum('quantity'), n=Count('id'))
+            .order_by()
+        )
+        model.objects.bulk_create([
+            model(
+                organization_id=row['organization_id'],
+                total_quantity=row['total'],
+                harvest_count=row['n'],
+                **{summary: row[harvest] for summary, harvest in zip(summary_fields, harvest_fields)}
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parcels', '0003_alter_crop_options_alter_parcel_options_and_more'),
+        ('campaigns', '0002_alter_campaign_options_and_more'),
+        ('tenants', '0001_initial'),
+        ('partners', '0003_alter_community_options_alter_partner_options_and_more'),
+        ('production', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=200, verbose_name='Nombre del producto')),
+                ('date', models.DateField(verbose_name='Fecha de cosecha')),
+                ('total_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Cantidad total (kg)')),
+                ('harvest_count', models.PositiveIntegerField(default=0, verbose_name='Cosechas')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Producción',
+                'verbose_name_plural': 'Resúmenes Diarios de Producción',
+                'db_table': 'production_product_daily_summary',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['organization', 'date'], name='production__organiz_3cb412_idx')],
+                'unique_together': {('organization', 'product_name', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PartnerCampaignSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Cantidad total (kg)')),
+                ('harvest_count', models.PositiveIntegerField(default=0, verbose_name='Cosechas')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='partner_production_summaries', to='campaigns.campaign', verbose_name='Campaña')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización')),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_summaries', to='partners.partner', verbose_name='Socio')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Producción por Socio',
+                'verbose_name_plural': 'Resúmenes de Producción por Socio',
+                'db_table': 'production_partner_campaign_summary',
+                'indexes': [models.Index(fields=['organization', 'campaign'], name='production__organiz_d996a9_idx')],
+                'unique_together': {('organization', 'partner', 'campaign')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ParcelCampaignSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Cantidad total (kg)')),
+                ('harvest_count', models.PositiveIntegerField(default=0, verbose_name='Cosechas')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parcel_production_summaries', to='campaigns.campaign', verbose_name='Campaña')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización')),
+                ('parcel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_summaries', to='parcels.parcel', verbose_name='Parcela')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Producción por Parcela',
+                'verbose_name_plural': 'Resúmenes de Producción por Parcela',
+                'db_table': 'production_parcel_campaign_summary',
+                'indexes': [models.Index(fields=['organization', 'campaign'], name='production__organiz_007048_idx')],
+                'unique_together': {('organization', 'parcel', 'campaign')},
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
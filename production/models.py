@@ -49,6 +49,8 @@ class HarvestedProduct(TenantModel):
         ordering = ['-harvest_date']
         indexes = [
             models.Index(fields=['campaign', 'harvest_date']),
+            # Paginación keyset por tenant (-harvest_date, -id)
+            models.Index(fields=['organization', 'harvest_date', 'id']),
             models.Index(fields=['parcel']),
             models.Index(fields=['partner']),
         ]
@@ -62,3 +64,77 @@ class HarvestedProduct(TenantModel):
         if self.parcel.surface > 0:
             return self.quantity / self.parcel.surface
         return 0
+
+
+class ParcelCampaignSummary(TenantModel):
+    """
+    Producción acumulada por parcela y campaña. Se mantiene de forma
+    incremental desde las señales de HarvestedProduct (production/summaries.py).
+    """
+    parcel = models.ForeignKey(Parcel, on_delete=models.CASCADE,
+                               related_name='production_summaries', verbose_name='Parcela')
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE,
+                                 related_name='parcel_production_summaries', verbose_name='Campaña')
+    total_quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                         verbose_name='Cantidad total (kg)')
+    harvest_count = models.PositiveIntegerField(default=0, verbose_name='Cosechas')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')
+
+    class Meta:
+        db_table = 'production_parcel_campaign_summary'
+        verbose_name = 'Resumen de Producción por Parcela'
+        verbose_name_plural = 'Resúmenes de Producción por Parcela'
+        unique_together = [['organization', 'parcel', 'campaign']]
+        indexes = [
+            models.Index(fields=['organization', 'campaign']),
+        ]
+
+    def __str__(self):
+        return f"{self.parcel_id} / {self.campaign_id}: {self.total_quantity}kg"
+
+
+class PartnerCampaignSummary(TenantModel):
+    """Producción acumulada por socio y campaña (mantenida como ParcelCampaignSummary)"""
+    partner = models.ForeignKey(Partner, on_delete=models.CASCADE,
+                                related_name='production_summaries', verbose_name='Socio')
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE,
+                                 related_name='partner_production_summaries', verbose_name='Campaña')
+    total_quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                         verbose_name='Cantidad total (kg)')
+    harvest_count = models.PositiveIntegerField(default=0, verbose_name='Cosechas')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')
+
+    class Meta:
+        db_table = 'production_partner_campaign_summary'
+        verbose_name = 'Resumen de Producción por Socio'
+        verbose_name_plural = 'Resúmenes de Producción por Socio'
+        unique_together = [['organization', 'partner', 'campaign']]
+        indexes = [
+            models.Index(fields=['organization', 'campaign']),
+        ]
+
+    def __str__(self):
+        return f"{self.partner_id} / {self.campaign_id}: {self.total_quantity}kg"
+
+
+class ProductDailySummary(TenantModel):
+    """Producción acumulada por producto y día de cosecha"""
+    product_name = models.CharField(max_length=200, verbose_name='Nombre del producto')
+    date = models.DateField(verbose_name='Fecha de cosecha')
+    total_quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                         verbose_name='Cantidad total (kg)')
+    harvest_count = models.PositiveIntegerField(default=0, verbose_name='Cosechas')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')
+
+    class Meta:
+        db_table = 'production_product_daily_summary'
+        verbose_name = 'Resumen Diario de Producción'
+        verbose_name_plural = 'Resúmenes Diarios de Producción'
+        ordering = ['-date']
+        unique_together = [['organization', 'product_name', 'date']]
+        indexes = [
+            models.Index(fields=['organization', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.product_name}: {self.total_quantity}kg"
@@ -1,6 +1,33 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .models import HarvestedProduct
+from . import summaries
+
+
+@receiver(pre_save, sender=HarvestedProduct)
+def capture_previous_harvest(sender, instance, raw=False, **kwargs):
+    """Guardar los valores anteriores para actualizar los resúmenes por diferencia"""
+    instance._summary_previous = None
+    if instance.pk and not raw:
+        instance._summary_previous = summaries.stored_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=HarvestedProduct)
+def update_summaries_on_save(sender, instance, raw=False, **kwargs):
+    """Actualizar resúmenes de producción por parcela, socio y producto"""
+    if raw:
+        return
+    summaries.apply_change(
+        previous=getattr(instance, '_summary_previous', None),
+        current=summaries.harvest_snapshot(instance)
+    )
+    instance._summary_previous = None
+
+
+@receiver(post_delete, sender=HarvestedProduct)
+def update_summaries_on_delete(sender, instance, **kwargs):
+    """Descontar la cosecha eliminada de los resúmenes"""
+    summaries.apply_change(previous=summaries.harvest_snapshot(instance))
 
 
 @receiver(post_save, sender=HarvestedProduct)
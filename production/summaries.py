@@ -0,0 +1,214 @@
+"""
+Tablas resumen de producción.
+
+ParcelCampaignSummary, PartnerCampaignSummary y ProductDailySummary guardan
+la cantidad total y el número de cosechas por clave. Se actualizan de forma
+incremental desde las señales de HarvestedProduct (production/signals.py):
+cada guardado o eliminación aplica la diferencia entre el estado anterior y
+el nuevo con UPDATE ... + delta, sin volver a agregar las cosechas.
+Como ProductDailySummary alimenta las tendencias de mercado, cada cambio
+descarta también los snapshots de mercado de la organización desde la fecha
+de cosecha afectada (market_analysis/snapshots.py).
+
+Las operaciones que no disparan señales (bulk_create, QuerySet.update/delete)
+dejan los resúmenes desactualizados; para esos casos el comando
+rebuild_production_summaries los recalcula desde cero y check_summaries
+detecta diferencias.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import (
+    HarvestedProduct, ParcelCampaignSummary, PartnerCampaignSummary, ProductDailySummary
+)
+
+
+# {modelo resumen: {campo del resumen: campo de HarvestedProduct}}
+SUMMARIES = {
+    ParcelCampaignSummary: {'parcel_id': 'parcel_id', 'campaign_id': 'campaign_id'},
+    PartnerCampaignSummary: {'partner_id': 'partner_id', 'campaign_id': 'campaign_id'},
+    ProductDailySummary: {'product_name': 'product_name', 'date': 'harvest_date'},
+}
+
+SNAPSHOT_FIELDS = [
+    'organization_id', 'parcel_id', 'campaign_id', 'partner_id',
+    'product_name', 'harvest_date', 'quantity',
+]
+
+
+def harvest_snapshot(instance):
+    """Valores de una cosecha que afectan a los resúmenes"""
+    harvest_date = HarvestedProduct._meta.get_field('harvest_date').to_python(instance.harvest_date)
+    return {
+        'organization_id': instance.organization_id,
+        'parcel_id': instance.parcel_id,
+        'campaign_id': instance.campaign_id,
+        'partner_id': instance.partner_id,
+        'product_name': instance.product_name,
+        'harvest_date': harvest_date,
+        'quantity': Decimal(str(instance.quantity or 0)),
+    }
+
+
+def stored_snapshot(pk):
+    """Valores guardados actualmente en la base de datos (None si no existe)"""
+    return HarvestedProduct.objects.all_organizations().filter(pk=pk).values(*SNAPSHOT_FIELDS).first()
+
+
+def _deltas(snapshot, sign, deltas):
+    for model, fields in SUMMARIES.items():
+        key = (model, snapshot['organization_id']) + tuple(
+            snapshot[harvest_field] for harvest_field in fields.values()
+        )
+        deltas[key][0] += snapshot['quantity'] * sign
+        deltas[key][1] += sign
+
+
+def apply_change(previous=None, current=None):
+    """
+    Aplica a los resúmenes el paso de `previous` a `current` (snapshots de
+    harvest_snapshot/stored_snapshot; None para creación o eliminación).
+    Solo se tocan las filas cuya cantidad o conteo cambia.
+    """
+    apply_changes([(previous, current)])
+
+
+def apply_changes(changes):
+    """
+    Como apply_change para muchos pares (previous, current): las diferencias
+    se acumulan por fila de resumen y cada fila se actualiza una sola vez.
+    """
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for previous, current in changes:
+        if previous:
+            _deltas(previous, -1, deltas)
+        if current:
+            _deltas(current, 1, deltas)
+
+    changed_since = {}
+    for (model, organization_id, *values), (quantity, count) in deltas.items():
+        if quantity or count:
+            filters = dict(zip(SUMMARIES[model].keys(), values), organization_id=organization_id)
+            _apply_delta(model, filters, quantity, count)
+            if model is ProductDailySummary:
+                since = changed_since.get(organization_id)
+                changed_since[organization_id] = min(since, filters['date']) if since else filters['date']
+
+    if changed_since:
+        transaction.on_commit(lambda: _invalidate_market_snapshots(changed_since))
+
+
+def _invalidate_market_snapshots(changed_since):
+    """La producción de cada día entra en las tendencias de mercado desde ese día"""
+    from market_analysis.snapshots import market_snapshots
+    for organization_id, since in changed_since.items():
+        market_snapshots.invalidate(organization_id, since=since)
+
+
+def _apply_delta(model, filters, quantity, count):
+    manager = model.objects.all_organizations()
+    changes = {
+        'total_quantity': F('total_quantity') + quantity,
+        'harvest_count': F('harvest_count') + count,
+        'updated_at': timezone.now(),
+    }
+    if manager.filter(**filters).update(**changes):
+        if count < 0:
+            manager.filter(harvest_count__lte=0, **filters).delete()
+        return
+
+    if count < 0:
+        # La fila ya no existe (p. ej. eliminada en cascada junto a su parcela)
+        return
+    try:
+        with transaction.atomic():
+            model(total_quantity=quantity, harvest_count=count, **filters).save()
+    except IntegrityError:
+        # Otro proceso creó la fila entre el UPDATE y el INSERT
+        manager.filter(**filters).update(**changes)
+
+
+# ----------------------------------------------------------------------
+# Reconstrucción y verificación
+# ----------------------------------------------------------------------
+
+def _expected(model, organization_id=None):
+    """{(org, *clave): (total, cosechas)} calculado desde HarvestedProduct"""
+    harvest_fields = list(SUMMARIES[model].values())
+    harvests = HarvestedProduct.objects.all_organizations()
+    if organization_id:
+        harvests = harvests.filter(organization_id=organization_id)
+    rows = (
+        harvests.values('organization_id', *harvest_fields)
+        .annotate(total=Sum('quantity'), n=Count('id'))
+        .order_by()
+    )
+    return {
+        (row['organization_id'],) + tuple(row[field] for field in harvest_fields): (row['total'], row['n'])
+        for row in rows
+    }
+
+
+def _stored(model, organization_id=None):
+    summary_fields = list(SUMMARIES[model].keys())
+    summaries = model.objects.all_organizations()
+    if organization_id:
+        summaries = summaries.filter(organization_id=organization_id)
+    return {
+        (row[0],) + tuple(row[1:-2]): (row[-2], row[-1])
+        for row in summaries.values_list(
+            'organization_id', *summary_fields, 'total_quantity', 'harvest_count'
+        ).order_by()
+    }
+
+
+def rebuild_summaries(organization_id=None, batch_size=1000):
+    """
+    Recalcula todos los resúmenes (de una organización o de todas) en una
+    transacción. Retorna {tabla: filas creadas}.
+    """
+    created = {}
+    with transaction.atomic():
+        for model, fields in SUMMARIES.items():
+            summaries = model.objects.all_organizations()
+            if organization_id:
+                summaries = summaries.filter(organization_id=organization_id)
+            summaries.delete()
+
+            rows = [
+                model(
+                    organization_id=key[0],
+                    total_quantity=total,
+                    harvest_count=n,
+                    **dict(zip(fields.keys(), key[1:]))
+                )
+                for key, (total, n) in _expected(model, organization_id).items()
+            ]
+            model.objects.bulk_create(rows, batch_size=batch_size)
+            created[model._meta.db_table] = len(rows)
+    return created
+
+
+def check_summaries(organization_id=None):
+    """
+    Compara los resúmenes con la agregación de HarvestedProduct.
+    Retorna la lista de diferencias: {'table', 'key', 'expected', 'stored'}
+    donde expected/stored son (total, cosechas) o None si falta la fila.
+    """
+    differences = []
+    for model in SUMMARIES:
+        expected = _expected(model, organization_id)
+        stored = _stored(model, organization_id)
+        for key in sorted(expected.keys() | stored.keys(), key=str):
+            if expected.get(key) != stored.get(key):
+                differences.append({
+                    'table': model._meta.db_table,
+                    'key': key,
+                    'expected': expected.get(key),
+                    'stored': stored.get(key),
+                })
+    return differences
@@ -3,7 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q, Sum, Avg, Count
-from .models import HarvestedProduct
+from .models import HarvestedProduct, ParcelCampaignSummary, PartnerCampaignSummary
 from .serializers import HarvestedProductSerializer, HarvestedProductListSerializer
 
 
@@ -11,6 +11,7 @@ class HarvestedProductViewSet(viewsets.ModelViewSet):
     """ViewSet para productos cosechados"""
     queryset = HarvestedProduct.objects.select_related('campaign', 'parcel', 'partner')
     permission_classes = [IsAuthenticated]
+    keyset_pagination = True  # ?pagination=cursor
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -54,20 +55,25 @@ class HarvestedProductViewSet(viewsets.ModelViewSet):
         if not campaign_id:
             return Response({'error': 'campaign_id es requerido'}, status=400)
         
-        products = self.queryset.filter(campaign_id=campaign_id)
+        # Leer los resúmenes precalculados en lugar de recorrer las cosechas
+        by_parcel = ParcelCampaignSummary.objects.filter(campaign_id=campaign_id)
+        by_partner = PartnerCampaignSummary.objects.filter(campaign_id=campaign_id)
+        totals = by_parcel.aggregate(total=Sum('total_quantity'), count=Sum('harvest_count'))
+        total_quantity = totals['total'] or 0
+        total_products = totals['count'] or 0
         
         report = {
-            'total_quantity': products.aggregate(Sum('quantity'))['quantity__sum'] or 0,
-            'total_products': products.count(),
-            'by_parcel': products.values('parcel__code').annotate(
-                total=Sum('quantity'),
-                count=Count('id')
-            ),
-            'by_partner': products.values('partner__first_name', 'partner__last_name').annotate(
-                total=Sum('quantity'),
-                count=Count('id')
-            ),
-            'average_yield': products.aggregate(Avg('quantity'))['quantity__avg'] or 0,
+            'total_quantity': total_quantity,
+            'total_products': total_products,
+            'by_parcel': by_parcel.values('parcel__code').annotate(
+                total=Sum('total_quantity'),
+                count=Sum('harvest_count')
+            ).order_by('parcel__code'),
+            'by_partner': by_partner.values('partner__first_name', 'partner__last_name').annotate(
+                total=Sum('total_quantity'),
+                count=Sum('harvest_count')
+            ).order_by('partner__last_name', 'partner__first_name'),
+            'average_yield': total_quantity / total_products if total_products else 0,
         }
         
         return Response(report)
@@ -79,19 +85,21 @@ class HarvestedProductViewSet(viewsets.ModelViewSet):
         if not parcel_id:
             return Response({'error': 'parcel_id es requerido'}, status=400)
         
-        products = self.queryset.filter(parcel_id=parcel_id)
+        summaries = ParcelCampaignSummary.objects.filter(parcel_id=parcel_id)
+        totals = summaries.aggregate(total=Sum('total_quantity'), count=Sum('harvest_count'))
         
         report = {
-            'total_quantity': products.aggregate(Sum('quantity'))['quantity__sum'] or 0,
-            'total_harvests': products.count(),
-            'by_campaign': products.values('campaign__name').annotate(
-                total=Sum('quantity'),
-                count=Count('id')
-            ),
-            'by_product': products.values('product_name').annotate(
+            'total_quantity': totals['total'] or 0,
+            'total_harvests': totals['count'] or 0,
+            'by_campaign': summaries.values('campaign__name').annotate(
+                total=Sum('total_quantity'),
+                count=Sum('harvest_count')
+            ).order_by('campaign__name'),
+            # Sin resumen por parcela y producto: agrupa las cosechas de la parcela (índice por parcela)
+            'by_product': HarvestedProduct.objects.filter(parcel_id=parcel_id).values('product_name').annotate(
                 total=Sum('quantity'),
                 count=Count('id')
-            ),
+            ).order_by('product_name'),
         }
         
         return Response(report)
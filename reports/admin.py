@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ReportType, GeneratedReport
+from .models import ReportType, GeneratedReport, MLModelVersion, MLTrainingRun
 
 
 @admin.register(ReportType)
@@ -9,5 +9,20 @@ class ReportTypeAdmin(admin.ModelAdmin):
 
 @admin.register(GeneratedReport)
 class GeneratedReportAdmin(admin.ModelAdmin):
-    list_display = ['title', 'report_type', 'file_format', 'generated_at', 'download_count']
-    list_filter = ['report_type', 'file_format', 'generated_at']
+    list_display = ['title', 'report_type', 'file_format', 'status', 'generated_at', 'download_count']
+    list_filter = ['report_type', 'file_format', 'status', 'generated_at']
+
+
+@admin.register(MLModelVersion)
+class MLModelVersionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'version', 'organization', 'is_active', 'file_size', 'created_at']
+    list_filter = ['name', 'is_active']
+    readonly_fields = ['checksum', 'file_size', 'feature_names', 'metrics', 'created_at']
+
+
+@admin.register(MLTrainingRun)
+class MLTrainingRunAdmin(admin.ModelAdmin):
+    list_display = ['name', 'organization', 'requested_mode', 'mode', 'status', 'samples',
+                    'test_score', 'duration_seconds', 'created_at']
+    list_filter = ['name', 'status', 'mode']
+    readonly_fields = ['metrics', 'error', 'created_at', 'started_at', 'completed_at']
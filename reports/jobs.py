@@ -0,0 +1,303 @@
+"""
+Generación de reportes en segundo plano.
+
+export_report encola un GeneratedReport en estado PENDING: la tabla
+generated_reports es la cola. Los workers toman los trabajos con un UPDATE
+condicional, así cada trabajo lo procesa un solo worker aunque haya varios
+procesos. En producción los workers corren en un proceso aparte:
+
+    python manage.py run_report_workers --workers 2
+
+REPORT_JOB_WORKERS > 0 agrega threads dentro de cada proceso web (útil en
+desarrollo); por defecto es 0 para que la generación de PDF/Excel no
+compita por el GIL con los requests. El archivo se escribe en
+REPORT_STORAGE_DIR/<organización>/ y se sirve desde el endpoint download.
+
+Pedidos idénticos (organización, reporte, formato, filtros) reutilizan el
+trabajo en curso o el archivo generado hace menos de REPORT_ARTIFACT_TTL
+segundos. Un trabajo en curso por más de REPORT_JOB_TIMEOUT segundos se
+considera abandonado (worker caído) y se vuelve a tomar, hasta
+REPORT_JOB_MAX_ATTEMPTS intentos.
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from tenants.middleware import set_current_organization
+from .models import GeneratedReport, ReportType
+from .utils import write_csv, write_excel, write_pdf
+
+
+FILE_EXTENSIONS = {
+    GeneratedReport.PDF: 'pdf',
+    GeneratedReport.EXCEL: 'xlsx',
+    GeneratedReport.CSV: 'csv',
+}
+
+CONTENT_TYPES = {
+    GeneratedReport.PDF: 'application/pdf',
+    GeneratedReport.EXCEL: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    GeneratedReport.CSV: 'text/csv',
+}
+
+
+def make_cache_key(organization_id, report_code, file_format, filters, data=None):
+    """Hash estable de un pedido de reporte"""
+    payload = json.dumps(
+        [organization_id, report_code, file_format, filters, data],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def artifact_path(report):
+    """Ruta absoluta del archivo generado"""
+    return os.path.join(str(settings.REPORT_STORAGE_DIR), report.file_path)
+
+
+def find_reusable(organization, cache_key):
+    """Trabajo en curso o reporte vigente con la misma clave (o None)"""
+    reports = GeneratedReport.objects.all_organizations().filter(
+        organization=organization, cache_key=cache_key
+    )
+    in_progress = reports.filter(
+        status__in=[GeneratedReport.PENDING, GeneratedReport.RUNNING]
+    ).order_by('-id').first()
+    if in_progress:
+        return in_progress
+
+    fresh_since = timezone.now() - timedelta(seconds=settings.REPORT_ARTIFACT_TTL)
+    for report in reports.filter(
+        status=GeneratedReport.COMPLETED, completed_at__gte=fresh_since
+    ).order_by('-completed_at')[:5]:
+        if report.file_path and os.path.exists(artifact_path(report)):
+            return report
+    return None
+
+
+def enqueue(organization, user, report_code, report_type_name, title, file_format,
+            filters=None, data=None):
+    """
+    Encola la generación de un reporte. `data` son los datos ya calculados
+    (exportaciones personalizadas); si es None el worker los calcula.
+    Retorna (reporte, reutilizado).
+    """
+    filters = filters or {}
+    cache_key = make_cache_key(organization.id, report_code, file_format, filters, data)
+    existing = find_reusable(organization, cache_key)
+    if existing:
+        return existing, True
+
+    report_type, _ = ReportType.objects.all_organizations().get_or_create(
+        organization=organization, name=report_type_name
+    )
+    report = GeneratedReport.objects.create(
+        organization=organization,
+        report_type=report_type,
+        report_code=report_code,
+        title=title,
+        filters=filters,
+        cache_key=cache_key,
+        file_format=file_format,
+        data=data or {},
+        generated_by=user if user and user.is_authenticated else None,
+        status=GeneratedReport.PENDING,
+    )
+    transaction.on_commit(report_worker_pool.wake)
+    return report, False
+
+
+# ----------------------------------------------------------------------
+# Ejecución
+# ----------------------------------------------------------------------
+
+def claim_next():
+    """Toma el próximo trabajo pendiente (o abandonado). None si no hay."""
+    reports = GeneratedReport.objects.all_organizations()
+    stale_before = timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    candidates = reports.filter(
+        Q(status=GeneratedReport.PENDING) |
+        Q(status=GeneratedReport.RUNNING, started_at__lt=stale_before)
+    ).order_by('id').values_list('id', 'status', 'attempts')[:10]
+
+    for report_id, status, attempts in candidates:
+        # UPDATE condicional: solo un worker gana cada trabajo
+        claimed = reports.filter(id=report_id, status=status, attempts=attempts).update(
+            status=GeneratedReport.RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return reports.select_related('organization').get(id=report_id)
+    return None
+
+
+def build_report(report):
+    """(filas, encabezados, título) del reporte"""
+    if report.data.get('rows') is not None:
+        return report.data['rows'], report.data['headers'], report.title
+
+    from .views import EXPORT_REPORTS, ReportViewSet
+    method_name = EXPORT_REPORTS[report.report_code][0]
+    rows, headers = getattr(ReportViewSet(), method_name)()
+    return rows, headers, report.title
+
+
+def render(file_format, rows, headers, title, path):
+    """Escribe el archivo. Lanza ImportError si falta la librería del formato."""
+    if file_format == GeneratedReport.CSV:
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            write_csv(rows, headers, output)
+    elif file_format == GeneratedReport.EXCEL:
+        with open(path, 'wb') as output:
+            write_excel(rows, headers, output)
+    else:
+        with open(path, 'wb') as output:
+            write_pdf(rows, title, headers, output)
+
+
+def run_job(report):
+    """Genera el archivo de un trabajo ya tomado y actualiza su estado"""
+    max_attempts = settings.REPORT_JOB_MAX_ATTEMPTS
+    set_current_organization(report.organization)
+    try:
+        rows, headers, title = build_report(report)
+
+        directory = os.path.join(str(settings.REPORT_STORAGE_DIR), str(report.organization_id))
+        os.makedirs(directory, exist_ok=True)
+        file_format = report.file_format
+        temp_path = os.path.join(directory, f'{report.id}.tmp')
+        try:
+            render(file_format, rows, headers, title, temp_path)
+        except ImportError:
+            # Sin openpyxl/reportlab se genera CSV, igual que la exportación
+            # síncrona; las filas pueden ser un generador ya consumido
+            file_format = GeneratedReport.CSV
+            rows, headers, title = build_report(report)
+            render(file_format, rows, headers, title, temp_path)
+
+        report.file_format = file_format
+        report.file_path = os.path.join(
+            str(report.organization_id),
+            f'{report.id}_{report.report_code or "reporte"}.{FILE_EXTENSIONS[file_format]}'
+        )
+        os.replace(temp_path, artifact_path(report))
+        report.file_size = os.path.getsize(artifact_path(report))
+        report.status = GeneratedReport.COMPLETED
+        report.completed_at = timezone.now()
+        report.error = ''
+    except Exception as e:
+        print(f"Error al generar el reporte {report.id}: {e}")
+        report.error = str(e)
+        report.status = (
+            GeneratedReport.FAILED if report.attempts >= max_attempts else GeneratedReport.PENDING
+        )
+    finally:
+        set_current_organization(None)
+
+    report.save(update_fields=[
+        'file_format', 'file_path', 'file_size', 'status', 'completed_at', 'error'
+    ])
+    return report
+
+
+class ReportWorkerPool:
+    """
+    Threads que procesan una cola respaldada en la base de datos. Por
+    defecto la de reportes; `claim` toma el próximo trabajo (o None) y `run`
+    lo ejecuta y retorna el objeto con su estado final (COMPLETED/FAILED).
+    """
+
+    def __init__(self, workers=None, poll_interval=None, claim=None, run=None, name='report-worker'):
+        self.workers = settings.REPORT_JOB_WORKERS if workers is None else workers
+        self.poll_interval = (
+            settings.REPORT_JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        )
+        self.claim = claim or claim_next
+        self.run = run or run_job
+        self.name = name
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.completed = 0
+        self.failed = 0
+
+    def _alive(self):
+        return self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        # Tras un fork (gunicorn) los threads del padre no existen en el hijo
+        if self.workers <= 0 or self._alive():
+            return
+        with self._lock:
+            if self._alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'{self.name}-{n}', daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def wake(self):
+        """Inicia los workers si hace falta y los despierta"""
+        self.start()
+        self._wake.set()
+
+    def run_pending(self):
+        """Procesa trabajos hasta vaciar la cola. Retorna la cantidad procesada."""
+        processed = 0
+        while not self._stop.is_set():
+            connection.close_if_unusable_or_obsolete()
+            job = self.claim()
+            if job is None:
+                break
+            job = self.run(job)
+            if job.status == 'COMPLETED':
+                self.completed += 1
+            elif job.status == 'FAILED':
+                self.failed += 1
+            processed += 1
+        return processed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"Error en el worker {self.name}: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+        connection.close()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._pid == os.getpid():
+            for thread in self._threads:
+                thread.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'alive': sum(thread.is_alive() for thread in self._threads) if self._pid == os.getpid() else 0,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
+
+
+report_worker_pool = ReportWorkerPool()
+# Terminar el trabajo en curso antes de salir; lo pendiente queda en la cola
+atexit.register(report_worker_pool.stop, timeout=30)
@@ -0,0 +1,144 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from tenants.models import Organization
+from tenants.middleware import set_current_organization
+from partners.models import Partner, Community
+from parcels.models import Parcel, SoilType
+from campaigns.models import Campaign
+from production.models import HarvestedProduct
+from production.summaries import rebuild_summaries
+from reports import queries as report_queries
+from reports.views import ReportViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de regresión de reportes: genera un dataset sintético (por defecto '
+        '10.000 socios y 100.000 cosechas) dentro de una transacción que se revierte, '
+        'ejecuta cada reporte y falla si alguno supera su presupuesto de consultas'
+    )
+
+    # Presupuesto de consultas por reporte (constante, independiente del tamaño)
+    BUDGETS = {
+        'partner_performance': 3,
+        'parcel_performance': 2,
+        'partners_by_community': 2,
+        'active_partners_by_community': 1,
+        'hectares_by_crop': 1,
+        '_get_performance_data': 3,
+        '_get_population_data': 1,
+        '_get_parcel_performance_data': 2,
+        '_get_partners_by_community_data': 2,
+        '_get_hectares_by_crop_data': 1,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partners', type=int, default=10000)
+        parser.add_argument('--harvests', type=int, default=100000)
+        parser.add_argument('--communities', type=int, default=50)
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                self.seed(options['partners'], options['harvests'], options['communities'])
+                failures = self.run_reports()
+                raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            set_current_organization(None)
+
+        if failures:
+            raise CommandError('Reportes fuera de presupuesto: ' + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Todos los reportes dentro del presupuesto de consultas'))
+
+    def seed(self, n_partners, n_harvests, n_communities):
+        start = time.perf_counter()
+        rng = random.Random(42)
+        org = Organization.objects.create(
+            name='Benchmark Reportes', subdomain=f'benchmark-{int(time.time())}',
+            email='benchmark@example.com'
+        )
+        set_current_organization(org)
+
+        communities = Community.objects.bulk_create([
+            Community(organization=org, name=f'Comunidad {i}') for i in range(n_communities)
+        ])
+        soil = SoilType.objects.create(organization=org, name='Franco')
+        campaign = Campaign.objects.create(
+            organization=org, code='BENCH', name='Benchmark',
+            start_date=date(2024, 1, 1), end_date=date(2024, 12, 31), target_area=Decimal('1000')
+        )
+        partners = Partner.objects.bulk_create([
+            Partner(
+                organization=org, ci=f'{1000000 + i}', first_name=f'Socio{i}', last_name='Benchmark',
+                phone='+59170000000', community=communities[i % n_communities],
+                status='ACTIVE' if i % 5 else 'INACTIVE'
+            )
+            for i in range(n_partners)
+        ], batch_size=2000)
+        parcels = Parcel.objects.bulk_create([
+            Parcel(
+                organization=org, code=f'P-{i}', name=f'Parcela {i}', location='Benchmark',
+                surface=Decimal(rng.randint(1, 50)), partner=partner, soil_type=soil
+            )
+            for i, partner in enumerate(partners)
+        ], batch_size=2000)
+        HarvestedProduct.objects.bulk_create([
+            HarvestedProduct(
+                organization=org, campaign=campaign, parcel=parcels[i % len(parcels)],
+                partner=partners[i % len(partners)], product_name='Quinua',
+                harvest_date=date(2024, 1, 1) + timedelta(days=i % 365),
+                quantity=Decimal(rng.randint(10, 1000))
+            )
+            for i in range(n_harvests)
+        ], batch_size=5000)
+        # bulk_create no dispara señales: materializar los resúmenes de producción
+        rebuild_summaries(org.id)
+        self.stdout.write(
+            f'Dataset: {n_partners} socios, {len(parcels)} parcelas, {n_harvests} cosechas '
+            f'({time.perf_counter() - start:.1f}s)'
+        )
+
+    def run_reports(self):
+        view = ReportViewSet()
+        reports = {
+            'partner_performance': report_queries.partner_performance,
+            'parcel_performance': report_queries.parcel_performance,
+            'partners_by_community': report_queries.partners_by_community,
+            'active_partners_by_community': report_queries.active_partners_by_community,
+            'hectares_by_crop': report_queries.hectares_by_crop,
+            '_get_performance_data': view._get_performance_data,
+            '_get_population_data': view._get_population_data,
+            '_get_parcel_performance_data': view._get_parcel_performance_data,
+            '_get_partners_by_community_data': view._get_partners_by_community_data,
+            '_get_hectares_by_crop_data': view._get_hectares_by_crop_data,
+        }
+
+        failures = []
+        for name, report in reports.items():
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                result = report()
+                rows = len(list(result[0] if isinstance(result, tuple) else result))
+            elapsed = time.perf_counter() - start
+            budget = self.BUDGETS[name]
+            line = f'{name}: {len(queries)} consultas (máx {budget}), {rows} filas, {elapsed:.2f}s'
+            if len(queries) > budget:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return failures
@@ -0,0 +1,70 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reports.jobs import ReportWorkerPool
+from reports.ml_training import claim_next_run, run_training
+
+
+# Colas disponibles: nombre -> (claim, run, descripción)
+QUEUES = {
+    'reports': (None, None, 'reportes'),
+    # Proceso dedicado: el ajuste puede usar ML_TRAINING_N_JOBS núcleos
+    'training': (
+        claim_next_run, partial(run_training, n_jobs=settings.ML_TRAINING_N_JOBS), 'entrenamientos'
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa la cola de reportes (GeneratedReport en estado PENDING) o de '
+        'entrenamientos del modelo (MLTrainingRun) con un pool de workers. Es la '
+        'forma de procesar las colas en producción (los procesos web no tienen '
+        'workers propios salvo REPORT_JOB_WORKERS/ML_TRAINING_WORKERS > 0); cada '
+        'trabajo lo toma un solo worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', choices=sorted(QUEUES), default='reports',
+            help='Cola a procesar (default: reports)'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Cantidad de threads (default: 2)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Segundos entre consultas a la cola (default: REPORT_JOB_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Procesar los trabajos pendientes y terminar'
+        )
+
+    def handle(self, *args, **options):
+        claim, run, label = QUEUES[options['queue']]
+        if options['once']:
+            pool = ReportWorkerPool(workers=0, claim=claim, run=run)
+            processed = pool.run_pending()
+            self.stdout.write(self.style.SUCCESS(
+                f'{processed} {label} procesados ({pool.completed} completados, {pool.failed} fallidos)'
+            ))
+            return
+
+        pool = ReportWorkerPool(
+            workers=options['workers'], poll_interval=options['poll_interval'],
+            claim=claim, run=run, name=f'{options["queue"]}-worker'
+        )
+        pool.start()
+        self.stdout.write(f'Procesando {label} con {pool.workers} workers (Ctrl+C para detener)')
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo workers...')
+            pool.stop(timeout=pool.poll_interval + 5)
+        self.stdout.write(self.style.SUCCESS(f'Workers detenidos: {pool.stats()}'))
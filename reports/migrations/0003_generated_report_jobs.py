@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_alter_reporttype_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedreport',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fin de generación'),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='Error'),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='report_code',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Código de reporte'),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Inicio de generación'),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'En cola'), ('RUNNING', 'Generando'), ('COMPLETED', 'Completado'), ('FAILED', 'Fallido')], default='COMPLETED', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='generatedreport',
+            index=models.Index(fields=['status', 'id'], name='generated_r_status_29b496_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generatedreport',
+            index=models.Index(fields=['organization', 'cache_key', 'status'], name='generated_r_organiz_8357ab_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0003_generated_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MLModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='yield_predictor', max_length=100, verbose_name='Modelo')),
+                ('version', models.PositiveIntegerField(verbose_name='Versión')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Archivo')),
+                ('checksum', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('file_size', models.BigIntegerField(blank=True, null=True, verbose_name='Tamaño (bytes)')),
+                ('feature_names', models.JSONField(default=list, verbose_name='Features')),
+                ('metrics', models.JSONField(default=dict, verbose_name='Métricas de entrenamiento')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Versión activa')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ml_model_versions', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Versión de Modelo ML',
+                'verbose_name_plural': 'Versiones de Modelos ML',
+                'db_table': 'ml_model_versions',
+                'ordering': ['-version'],
+                'indexes': [models.Index(fields=['organization', 'name', 'is_active'], name='ml_model_ve_organiz_67862c_idx')],
+                'unique_together': {('organization', 'name', 'version')},
+            },
+        ),
+    ]
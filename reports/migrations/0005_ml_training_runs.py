@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0004_ml_model_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlmodelversion',
+            name='last_harvest_id',
+            field=models.BigIntegerField(default=0, verbose_name='Última cosecha vista'),
+        ),
+        migrations.CreateModel(
+            name='MLTrainingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='yield_predictor', max_length=100, verbose_name='Modelo')),
+                ('requested_mode', models.CharField(choices=[('FULL', 'Completo'), ('INCREMENTAL', 'Incremental')], default='INCREMENTAL', max_length=20, verbose_name='Modo solicitado')),
+                ('mode', models.CharField(blank=True, choices=[('FULL', 'Completo'), ('INCREMENTAL', 'Incremental')], max_length=20, verbose_name='Modo ejecutado')),
+                ('status', models.CharField(choices=[('PENDING', 'En cola'), ('RUNNING', 'Entrenando'), ('COMPLETED', 'Completado'), ('FAILED', 'Fallido')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('base_version', models.PositiveIntegerField(blank=True, null=True, verbose_name='Versión base')),
+                ('samples', models.PositiveIntegerField(default=0, verbose_name='Muestras')),
+                ('train_score', models.FloatField(blank=True, null=True)),
+                ('test_score', models.FloatField(blank=True, null=True)),
+                ('metrics', models.JSONField(default=dict, verbose_name='Métricas')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True, verbose_name='Duración (s)')),
+                ('model_version', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='training_runs', to='reports.mlmodelversion', verbose_name='Versión generada')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='tenants.organization', verbose_name='Organización')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ml_training_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Entrenamiento de Modelo ML',
+                'verbose_name_plural': 'Entrenamientos de Modelos ML',
+                'db_table': 'ml_training_runs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='ml_training_status_5b86b9_idx'), models.Index(fields=['organization', 'name', 'status'], name='ml_training_organiz_ae20f1_idx')],
+            },
+        ),
+    ]
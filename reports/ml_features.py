@@ -0,0 +1,148 @@
+"""
+Extracción de features para el predictor de rendimiento.
+
+El conjunto de entrenamiento se arma con una sola consulta de cosechas
+unidas a su parcela (values_list recorrido por rangos de id) que se vuelca
+directamente en arrays de NumPy; el número de cosechas por parcela se
+calcula agrupando esos mismos arrays.
+
+Los ids de tipo de suelo y cultivo se codifican con un vocabulario ordenado
+que se guarda junto al modelo, así el código de cada categoría es el mismo
+en entrenamiento y en predicción (hash() de Python cambia entre procesos).
+"""
+import numpy as np
+from django.db.models import FloatField, IntegerField, Value
+from django.db.models.functions import Cast, Coalesce
+
+from production.models import HarvestedProduct
+
+
+FEATURE_NAMES = ['surface', 'soil_type', 'crop_type', 'harvest_count']
+
+# Código para categorías nulas o no vistas en entrenamiento
+UNKNOWN = -1
+
+HARVEST_COLUMNS = ['id', 'parcel_id', 'surface', 'soil_type_id', 'crop_id', 'quantity']
+
+
+class CategoricalEncoder:
+    """Codificación ordinal estable de ids (índice en el vocabulario ordenado)"""
+
+    def __init__(self, categories=None):
+        self.categories = np.asarray(sorted(categories or []), dtype=np.int64)
+
+    @classmethod
+    def fit(cls, values):
+        values = np.asarray(values, dtype=np.int64)
+        return cls(np.unique(values[values != UNKNOWN]).tolist())
+
+    def transform(self, values):
+        values = np.asarray(values, dtype=np.int64)
+        if not len(self.categories):
+            return np.full(values.shape, UNKNOWN, dtype=np.int64)
+        positions = np.searchsorted(self.categories, values)
+        positions = np.clip(positions, 0, len(self.categories) - 1)
+        return np.where(self.categories[positions] == values, positions, UNKNOWN)
+
+    def to_dict(self):
+        return {'categories': self.categories.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('categories', []))
+
+
+def load_harvest_arrays(queryset=None, chunk_size=50000):
+    """
+    Cosechas × parcelas como arrays de NumPy ({columna: array}), leyendo
+    `chunk_size` filas por consulta. Ids nulos se representan con UNKNOWN.
+    """
+    if queryset is None:
+        queryset = HarvestedProduct.objects.all()
+    rows = queryset.filter(parcel__surface__gt=0).annotate(
+        surface=Cast('parcel__surface', FloatField()),
+        soil_type_id=Coalesce('parcel__soil_type_id', Value(UNKNOWN), output_field=IntegerField()),
+        crop_id=Coalesce('parcel__current_crop_id', Value(UNKNOWN), output_field=IntegerField()),
+        quantity_value=Cast('quantity', FloatField()),
+    )
+
+    chunks = []
+    last_id = 0
+    while True:
+        chunk = list(
+            rows.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'parcel_id', 'surface', 'soil_type_id', 'crop_id', 'quantity_value'
+            )[:chunk_size]
+        )
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=np.float64))
+        last_id = chunk[-1][0]
+
+    matrix = np.concatenate(chunks) if chunks else np.empty((0, len(HARVEST_COLUMNS)))
+    arrays = {name: matrix[:, index] for index, name in enumerate(HARVEST_COLUMNS)}
+    for name in ('id', 'parcel_id', 'soil_type_id', 'crop_id'):
+        arrays[name] = arrays[name].astype(np.int64)
+    return arrays
+
+
+def count_by_group(keys):
+    """Para cada elemento, cuántas veces aparece su clave en `keys`"""
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64)
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    return counts[inverse]
+
+
+def fit_encoders(arrays):
+    return {
+        'soil_type': CategoricalEncoder.fit(arrays['soil_type_id']),
+        'crop_type': CategoricalEncoder.fit(arrays['crop_id']),
+    }
+
+
+def feature_matrix(surface, soil_type_ids, crop_ids, harvest_counts, encoders):
+    """Matriz de features (columnas FEATURE_NAMES) a partir de arrays"""
+    return np.column_stack([
+        np.asarray(surface, dtype=np.float64),
+        encoders['soil_type'].transform(soil_type_ids),
+        encoders['crop_type'].transform(crop_ids),
+        np.asarray(harvest_counts, dtype=np.float64),
+    ]).astype(np.float64)
+
+
+def build_training_set(queryset=None, chunk_size=50000, encoders=None, parcel_counts=None):
+    """
+    (X, y, encoders, último id): una fila por cosecha con cantidad > 0; el
+    objetivo es el rendimiento (kg/ha) de esa cosecha.
+
+    `parcel_counts` ({parcel_id: cosechas}) reemplaza el conteo calculado
+    sobre las cosechas leídas, cuando el queryset es solo una parte del
+    historial (reentrenamiento incremental).
+    """
+    arrays = load_harvest_arrays(queryset, chunk_size)
+    if parcel_counts is None:
+        # El conteo incluye todas las cosechas de la parcela, también las de cantidad 0
+        harvest_counts = count_by_group(arrays['parcel_id'])
+    else:
+        harvest_counts = np.array(
+            [parcel_counts.get(parcel_id, 0) for parcel_id in arrays['parcel_id'].tolist()],
+            dtype=np.int64
+        )
+
+    mask = arrays['quantity'] > 0
+    if encoders is None:
+        encoders = fit_encoders({name: values[mask] for name, values in arrays.items()})
+
+    X = feature_matrix(
+        arrays['surface'][mask], arrays['soil_type_id'][mask], arrays['crop_id'][mask],
+        harvest_counts[mask], encoders
+    )
+    y = arrays['quantity'][mask] / arrays['surface'][mask]
+    last_id = int(arrays['id'].max()) if len(arrays['id']) else 0
+    return X, y, encoders, last_id
+
+
+def encode_ids(values):
+    """Ids (con None) como array de enteros con UNKNOWN para nulos"""
+    return np.array([UNKNOWN if value is None else value for value in values], dtype=np.int64)
@@ -4,58 +4,53 @@ Sistema de predicciones con Random Forest para reportes agrícolas
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from django.db.models import Avg, Sum, Count
-from production.models import HarvestedProduct
+from django.db.models import Sum
+from production.models import ParcelCampaignSummary
 from parcels.models import Parcel
 from partners.models import Partner
-import joblib
-import os
+from tenants.middleware import get_current_organization
+from . import ml_features
+from .ml_registry import model_registry
 
 
 class YieldPredictor:
-    """Predictor de rendimiento usando Random Forest"""
+    """
+    Predictor de rendimiento usando Random Forest. Cada organización tiene
+    sus propias versiones del modelo (reports/ml_registry.py).
+    """
     
-    def __init__(self):
+    def __init__(self, organization=None):
         self.model = RandomForestRegressor(
             n_estimators=100,
             max_depth=10,
             random_state=42
         )
         self.is_trained = False
-        self.model_path = 'reports/models/yield_predictor.pkl'
+        self.encoders = None
+        self.organization = organization or get_current_organization()
+        self.version = None
+        self.last_harvest_id = 0
     
-    def prepare_training_data(self):
-        """Prepara datos de entrenamiento desde la base de datos"""
-        parcels = Parcel.objects.all().select_related('partner', 'soil_type', 'current_crop')
-        
-        X = []  # Features
-        y = []  # Target (rendimiento)
-        
-        for parcel in parcels:
-            # Obtener producción histórica
-            production = HarvestedProduct.objects.filter(parcel=parcel)
-            
-            # Crear una muestra por cada registro de producción
-            for prod in production:
-                if parcel.surface and float(parcel.surface) > 0 and prod.quantity:
-                    # Features: superficie, tipo de suelo (encoded), cultivo (encoded)
-                    features = [
-                        float(parcel.surface),
-                        hash(str(parcel.soil_type_id)) % 100,  # Simple encoding
-                        hash(str(parcel.current_crop_id)) % 100,
-                        production.count(),  # Número de cosechas
-                    ]
-                    
-                    # Target: rendimiento (kg/ha) de esta cosecha específica
-                    yield_value = float(prod.quantity) / float(parcel.surface)
-                    
-                    X.append(features)
-                    y.append(yield_value)
-        
-        return np.array(X), np.array(y)
+    def prepare_training_data(self, chunk_size=50000):
+        """
+        Prepara datos de entrenamiento desde la base de datos: una consulta
+        de cosechas × parcelas por bloque, volcada a arrays (reports/ml_features.py).
+        Ajusta las codificaciones de tipo de suelo y cultivo del predictor.
+        """
+        X, y, self.encoders, self.last_harvest_id = ml_features.build_training_set(chunk_size=chunk_size)
+        return X, y
     
-    def train(self):
-        """Entrena el modelo con datos históricos"""
+    def train(self, user=None, n_jobs=None):
+        """
+        Entrena el modelo desde cero con datos históricos y lo registra como
+        nueva versión. `n_jobs` paraleliza el ajuste de los árboles.
+        """
+        if self.organization is None:
+            return {
+                'success': False,
+                'message': 'Organización no especificada'
+            }
+        
         X, y = self.prepare_training_data()
         
         if len(X) < 10:
@@ -70,32 +65,59 @@ class YieldPredictor:
         )
         
         # Entrenar
+        self.model.set_params(n_jobs=n_jobs)
         self.model.fit(X_train, y_train)
+        self.model.set_params(n_jobs=None)
         self.is_trained = True
         
         # Evaluar
         train_score = self.model.score(X_train, y_train)
         test_score = self.model.score(X_test, y_test)
         
-        # Guardar modelo
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        joblib.dump(self.model, self.model_path)
+        # Registrar el modelo junto con sus codificaciones
+        record = model_registry.register(
+            self.organization,
+            {
+                'model': self.model,
+                'encoders': {name: encoder.to_dict() for name, encoder in self.encoders.items()},
+                'feature_names': ml_features.FEATURE_NAMES,
+            },
+            metrics={
+                'mode': 'FULL',
+                'train_score': train_score,
+                'test_score': test_score,
+                'samples': len(X),
+                'n_estimators': len(self.model.estimators_),
+            },
+            user=user,
+            last_harvest_id=self.last_harvest_id,
+        )
+        self.version = record.version
         
         return {
             'success': True,
             'train_score': train_score,
             'test_score': test_score,
             'samples': len(X),
+            'version': record.version,
             'message': f'Modelo entrenado con {len(X)} muestras'
         }
     
-    def load_model(self):
-        """Carga modelo previamente entrenado"""
-        if os.path.exists(self.model_path):
-            self.model = joblib.load(self.model_path)
-            self.is_trained = True
-            return True
-        return False
+    def load_model(self, version=None):
+        """Carga la versión activa (o `version`) desde el registro de modelos"""
+        if self.organization is None:
+            return False
+        loaded = model_registry.get(self.organization.id, version)
+        if loaded is None:
+            return False
+        self.model = loaded.bundle['model']
+        self.encoders = {
+            name: ml_features.CategoricalEncoder.from_dict(data)
+            for name, data in loaded.bundle['encoders'].items()
+        }
+        self.version = loaded.version
+        self.is_trained = True
+        return True
     
     def predict_yield(self, surface, soil_type_id, crop_id, harvest_count=1):
         """Predice el rendimiento para una parcela"""
@@ -103,12 +125,13 @@ class YieldPredictor:
             if not self.load_model():
                 return None
         
-        features = np.array([[
-            float(surface),
-            hash(str(soil_type_id)) % 100,
-            hash(str(crop_id)) % 100,
-            harvest_count
-        ]])
+        features = ml_features.feature_matrix(
+            [float(surface)],
+            ml_features.encode_ids([soil_type_id]),
+            ml_features.encode_ids([crop_id]),
+            [harvest_count],
+            self.encoders
+        )
         
         prediction = self.model.predict(features)[0]
         return max(0, prediction)  # No permitir valores negativos
@@ -127,73 +150,121 @@ class YieldPredictor:
 
 
 class ProductionForecaster:
-    """Predictor de producción futura"""
+    """
+    Predictor de producción futura. Las predicciones se calculan por lotes
+    de parcelas: una matriz de features y una llamada a predict por lote, con
+    el historial de cosechas tomado de los resúmenes de producción.
+    """
     
-    def __init__(self):
-        self.yield_predictor = YieldPredictor()
+    def __init__(self, organization=None):
+        self.yield_predictor = YieldPredictor(organization)
     
-    def forecast_parcel_production(self, parcel_id):
-        """Predice la producción futura de una parcela"""
-        try:
-            parcel = Parcel.objects.get(id=parcel_id)
-            
-            # Obtener historial
-            production = HarvestedProduct.objects.filter(parcel=parcel)
-            harvest_count = production.count()
-            
-            # Predecir rendimiento
-            predicted_yield = self.yield_predictor.predict_yield(
-                surface=parcel.surface,
-                soil_type_id=parcel.soil_type_id,
-                crop_id=parcel.current_crop_id,
-                harvest_count=harvest_count + 1
+    def forecast_parcels(self, parcels, chunk_size=5000):
+        """
+        Genera la predicción de cada parcela del queryset, procesando
+        `chunk_size` parcelas por lote (3 consultas y un predict por lote).
+        No genera nada si el modelo no está entrenado.
+        """
+        predictor = self.yield_predictor
+        if not predictor.is_trained and not predictor.load_model():
+            return
+        organization_id = predictor.organization.id
+        
+        last_id = 0
+        while True:
+            rows = list(
+                parcels.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'code', 'surface', 'soil_type_id', 'current_crop_id'
+                )[:chunk_size]
             )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            ids, codes, surfaces, soil_types, crops = zip(*rows)
             
-            if predicted_yield is None:
-                return None
-            
-            # Calcular producción total predicha
-            predicted_production = predicted_yield * float(parcel.surface)
+            # Historial: cosechas y cantidad total por parcela (1 consulta)
+            history = {
+                row[0]: row[1:]
+                for row in ParcelCampaignSummary.objects.all_organizations().filter(
+                    organization_id=organization_id, parcel_id__in=ids
+                ).values('parcel_id').annotate(
+                    count=Sum('harvest_count'), total=Sum('total_quantity')
+                ).order_by().values_list('parcel_id', 'count', 'total')
+            }
+            counts = np.array([history.get(pid, (0, 0))[0] or 0 for pid in ids], dtype=np.float64)
+            totals = np.array([float(history.get(pid, (0, 0))[1] or 0) for pid in ids], dtype=np.float64)
+            averages = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+            surface = np.array([float(value or 0) for value in surfaces], dtype=np.float64)
             
-            # Obtener producción histórica promedio
-            avg_production = production.aggregate(Avg('quantity'))['quantity__avg'] or 0
+            features = ml_features.feature_matrix(
+                surface,
+                ml_features.encode_ids(soil_types),
+                ml_features.encode_ids(crops),
+                counts + 1,
+                predictor.encoders
+            )
+            predicted_yields = np.maximum(predictor.model.predict(features), 0)
+            predicted_production = predicted_yields * surface
             
-            return {
-                'parcel_id': parcel.id,
-                'parcel_code': parcel.code,
-                'predicted_yield': round(predicted_yield, 2),
-                'predicted_production': round(predicted_production, 2),
-                'historical_avg': round(float(avg_production), 2),
-                'confidence': 'medium',  # Podría calcularse con intervalos de confianza
-                'recommendation': self._generate_recommendation(predicted_yield, avg_production)
-            }
-        except Parcel.DoesNotExist:
+            for index, parcel_id in enumerate(ids):
+                yield {
+                    'parcel_id': parcel_id,
+                    'parcel_code': codes[index],
+                    'predicted_yield': round(float(predicted_yields[index]), 2),
+                    'predicted_production': round(float(predicted_production[index]), 2),
+                    'historical_avg': round(float(averages[index]), 2),
+                    'confidence': 'medium',  # Podría calcularse con intervalos de confianza
+                    'recommendation': self._generate_recommendation(
+                        float(predicted_yields[index]), averages[index]
+                    )
+                }
+    
+    def parcels_for(self, partner_id=None, campaign_id=None):
+        """Parcelas de un socio, de una campaña o de toda la organización"""
+        parcels = Parcel.objects.all()
+        if partner_id:
+            parcels = parcels.filter(partner_id=partner_id)
+        if campaign_id:
+            parcels = parcels.filter(campaigns__id=campaign_id)
+        return parcels
+    
+    def forecast_batch(self, partner_id=None, campaign_id=None):
+        """Predicción agregada de un socio, una campaña o toda la organización"""
+        parcel_predictions = list(self.forecast_parcels(self.parcels_for(partner_id, campaign_id)))
+        if not self.yield_predictor.is_trained:
             return None
+        return {
+            'partner_id': partner_id,
+            'campaign_id': campaign_id,
+            'model_version': self.yield_predictor.version,
+            'total_predicted_production': round(
+                sum(prediction['predicted_production'] for prediction in parcel_predictions), 2
+            ),
+            'parcels_count': len(parcel_predictions),
+            'parcel_predictions': parcel_predictions
+        }
+    
+    def forecast_parcel_production(self, parcel_id):
+        """Predice la producción futura de una parcela"""
+        return next(self.forecast_parcels(Parcel.objects.filter(id=parcel_id)), None)
     
     def forecast_partner_production(self, partner_id):
         """Predice la producción total de un socio"""
         try:
             partner = Partner.objects.get(id=partner_id)
-            parcels = partner.parcels.all()
-            
-            total_predicted = 0
-            parcel_predictions = []
-            
-            for parcel in parcels:
-                prediction = self.forecast_parcel_production(parcel.id)
-                if prediction:
-                    total_predicted += prediction['predicted_production']
-                    parcel_predictions.append(prediction)
-            
-            return {
-                'partner_id': partner.id,
-                'partner_name': partner.full_name,
-                'total_predicted_production': round(total_predicted, 2),
-                'parcels_count': len(parcel_predictions),
-                'parcel_predictions': parcel_predictions
-            }
         except Partner.DoesNotExist:
             return None
+        
+        result = self.forecast_batch(partner_id=partner.id)
+        if result is None:
+            return None
+        return {
+            'partner_id': partner.id,
+            'partner_name': partner.full_name,
+            'total_predicted_production': result['total_predicted_production'],
+            'parcels_count': result['parcels_count'],
+            'parcel_predictions': result['parcel_predictions']
+        }
     
     def _generate_recommendation(self, predicted_yield, historical_avg):
         """Genera recomendación basada en predicción"""
@@ -0,0 +1,226 @@
+"""
+Registro de modelos de predicción por organización.
+
+Cada entrenamiento se guarda como una nueva versión (MLModelVersion) en
+ML_MODEL_DIR/<organización>/<modelo>-v<versión>.joblib, sin compresión
+para poder cargarlo con mmap: los arrays de los árboles se leen bajo
+demanda desde el archivo y los procesos comparten las páginas.
+
+Los modelos cargados se mantienen en un LRU por proceso con clave
+(organización, modelo, versión). La entrada guarda el checksum con el que
+se cargó; si el registro de la base de datos indica otro checksum (el
+archivo fue regenerado) se vuelve a cargar. La versión activa de cada
+organización se cachea ML_MODEL_ACTIVE_TTL segundos.
+"""
+import hashlib
+import os
+import threading
+
+import joblib
+from django.conf import settings
+from django.db import transaction
+
+from tenants.cache import LocalTTLCache
+from .models import MLModelVersion
+
+
+DEFAULT_MODEL = 'yield_predictor'
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 del archivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LoadedModel:
+    """Contenido de un archivo de modelo con los metadatos de su versión"""
+
+    def __init__(self, record, bundle, checksum):
+        self.record = record
+        self.bundle = bundle
+        # Checksum del archivo cargado (no del registro, que puede cambiar)
+        self.checksum = checksum
+
+    @property
+    def version(self):
+        return self.record.version
+
+
+class ModelRegistry:
+    """Versiones de modelos por organización con LRU de modelos cargados"""
+
+    def __init__(self):
+        self._models = LocalTTLCache(
+            max_size=getattr(settings, 'ML_MODEL_CACHE_SIZE', 8),
+            ttl=getattr(settings, 'ML_MODEL_CACHE_TTL', 3600),
+        )
+        self._active = LocalTTLCache(
+            max_size=1024,
+            ttl=getattr(settings, 'ML_MODEL_ACTIVE_TTL', 30),
+        )
+        self._load_lock = threading.Lock()
+        self.loads = 0
+
+    @staticmethod
+    def model_dir(organization_id):
+        return os.path.join(str(settings.ML_MODEL_DIR), str(organization_id))
+
+    @staticmethod
+    def absolute_path(record):
+        return os.path.join(str(settings.ML_MODEL_DIR), record.file_path)
+
+    def _versions(self, organization_id, name):
+        return MLModelVersion.objects.all_organizations().filter(
+            organization_id=organization_id, name=name
+        )
+
+    # ------------------------------------------------------------------
+    # Registro de versiones
+    # ------------------------------------------------------------------
+
+    def register(self, organization, bundle, metrics=None, name=DEFAULT_MODEL, user=None,
+                 last_harvest_id=0):
+        """
+        Guarda `bundle` como nueva versión activa de la organización.
+        Retorna el MLModelVersion creado.
+        """
+        directory = self.model_dir(organization.id)
+        os.makedirs(directory, exist_ok=True)
+
+        with transaction.atomic():
+            last = self._versions(organization.id, name).select_for_update().order_by('-version').first()
+            version = last.version + 1 if last else 1
+            file_name = f'{name}-v{version}.joblib'
+            path = os.path.join(directory, file_name)
+            temp_path = f'{path}.tmp'
+            # Sin compresión: requisito para cargar con mmap_mode
+            joblib.dump(bundle, temp_path)
+            os.replace(temp_path, path)
+
+            self._versions(organization.id, name).filter(is_active=True).update(is_active=False)
+            record = MLModelVersion.objects.create(
+                organization=organization,
+                name=name,
+                version=version,
+                file_path=os.path.join(str(organization.id), file_name),
+                checksum=file_checksum(path),
+                file_size=os.path.getsize(path),
+                feature_names=list(bundle.get('feature_names', [])),
+                metrics=metrics or {},
+                last_harvest_id=last_harvest_id,
+                is_active=True,
+                created_by=user if user and user.is_authenticated else None,
+            )
+
+        self._active.delete((organization.id, name))
+        self._prune(organization.id, name)
+        return record
+
+    def _prune(self, organization_id, name):
+        """Elimina archivos y registros de versiones antiguas"""
+        keep = getattr(settings, 'ML_MODEL_KEEP_VERSIONS', 3)
+        old = list(self._versions(organization_id, name).filter(is_active=False).order_by('-version')[keep:])
+        for record in old:
+            try:
+                os.remove(self.absolute_path(record))
+            except OSError:
+                pass
+            self._models.delete((organization_id, name, record.version))
+        if old:
+            MLModelVersion.objects.all_organizations().filter(id__in=[r.id for r in old]).delete()
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def active_record(self, organization_id, name=DEFAULT_MODEL):
+        key = (organization_id, name)
+        record = self._active.get(key)
+        if record is None:
+            record = self._versions(organization_id, name).filter(is_active=True).order_by('-version').first()
+            if record is None:
+                return None
+            self._active.set(key, record)
+        return record
+
+    def get(self, organization_id, version=None, name=DEFAULT_MODEL):
+        """LoadedModel de la versión pedida (o la activa); None si no existe"""
+        if version is None:
+            record = self.active_record(organization_id, name)
+        else:
+            record = self._versions(organization_id, name).filter(version=version).first()
+        if record is None:
+            return None
+
+        key = (organization_id, name, record.version)
+        loaded = self._models.get(key)
+        if loaded is not None and loaded.checksum == record.checksum:
+            return loaded
+
+        with self._load_lock:
+            loaded = self._models.get(key)
+            if loaded is not None and loaded.checksum == record.checksum:
+                return loaded
+            path = self.absolute_path(record)
+            if not os.path.exists(path):
+                print(f"Archivo de modelo no encontrado: {path}")
+                return None
+            checksum = file_checksum(path)
+            if checksum != record.checksum:
+                # Se usa el archivo actual y se registra su checksum, así las
+                # próximas consultas (que leen el registro de la BD) coinciden
+                print(f"Checksum distinto para {record} ({path}); se usa el archivo actual")
+                MLModelVersion.objects.all_organizations().filter(pk=record.pk).update(
+                    checksum=checksum, file_size=os.path.getsize(path)
+                )
+                record.checksum = checksum
+            loaded = LoadedModel(record, joblib.load(path, mmap_mode='r'), checksum)
+            self._models.set(key, loaded)
+            self.loads += 1
+            return loaded
+
+    def load_for_training(self, record):
+        """Copia modificable (sin mmap ni caché) del modelo de una versión"""
+        return joblib.load(self.absolute_path(record))
+
+    def invalidate(self, organization_id=None):
+        """Descarta modelos cargados (de una organización o todos)"""
+        if organization_id is None:
+            self._models.clear()
+            self._active.clear()
+            return
+        self._models.delete_where(lambda key: key[0] == organization_id)
+        self._active.delete_where(lambda key: key[0] == organization_id)
+
+    # ------------------------------------------------------------------
+    # Metadatos
+    # ------------------------------------------------------------------
+
+    def versions(self, organization_id, name=DEFAULT_MODEL):
+        """Metadatos de las versiones guardadas (la más reciente primero)"""
+        return [
+            {
+                'version': record.version,
+                'is_active': record.is_active,
+                'checksum': record.checksum,
+                'file_size': record.file_size,
+                'feature_names': record.feature_names,
+                'metrics': record.metrics,
+                'created_at': record.created_at,
+            }
+            for record in self._versions(organization_id, name).order_by('-version')
+        ]
+
+    def stats(self):
+        return {
+            'loads': self.loads,
+            'models': self._models.stats(),
+            'active': self._active.stats(),
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,256 @@
+"""
+Entrenamiento del predictor de rendimiento en segundo plano.
+
+train_ml_model encola un MLTrainingRun en estado PENDING; los workers lo
+toman con un UPDATE condicional, igual que los reportes de reports/jobs.py.
+En producción entrena un proceso aparte:
+
+    python manage.py run_report_workers --queue training --workers 1
+
+que ajusta el bosque con ML_TRAINING_N_JOBS procesos. Con
+ML_TRAINING_WORKERS > 0 también entrenan threads del proceso web
+(training_worker_pool), limitados a ML_TRAINING_IN_PROCESS_N_JOBS. Cada
+organización tiene a lo sumo un entrenamiento pendiente: los pedidos
+repetidos reutilizan el que ya está en cola.
+
+Modo incremental: la versión activa guarda el último id de cosecha con el
+que se entrenó (MLModelVersion.last_harvest_id). Solo se leen las cosechas
+posteriores y el bosque crece con warm_start: se agregan
+ML_INCREMENTAL_TREES árboles ajustados a los datos nuevos, conservando los
+existentes. Cuando el bosque llegaría a ML_MAX_TREES, o no hay versión
+activa, se entrena desde cero.
+"""
+import atexit
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from sklearn.model_selection import train_test_split
+
+from production.models import HarvestedProduct, ParcelCampaignSummary
+from tenants.middleware import set_current_organization
+from .jobs import ReportWorkerPool
+from .ml_features import CategoricalEncoder, build_training_set
+from .ml_predictions import YieldPredictor
+from .ml_registry import DEFAULT_MODEL, model_registry
+from .models import MLModelVersion, MLTrainingRun
+
+
+# Mínimo de cosechas nuevas para agregar árboles; con menos se esperan más datos
+MIN_NEW_SAMPLES = 10
+
+
+def request_training(organization, user=None, mode=MLTrainingRun.INCREMENTAL, name=DEFAULT_MODEL):
+    """
+    Encola un entrenamiento para la organización. Si ya hay uno pendiente
+    se reutiliza (un pedido completo prevalece sobre uno incremental).
+    Retorna (run, reutilizado).
+    """
+    pending = MLTrainingRun.objects.all_organizations().filter(
+        organization=organization, name=name, status=MLTrainingRun.PENDING
+    ).order_by('id').first()
+    if pending:
+        if mode == MLTrainingRun.FULL and pending.requested_mode != MLTrainingRun.FULL:
+            pending.requested_mode = MLTrainingRun.FULL
+            pending.save(update_fields=['requested_mode'])
+        return pending, True
+
+    run = MLTrainingRun.objects.create(
+        organization=organization,
+        name=name,
+        requested_mode=mode,
+        requested_by=user if user and user.is_authenticated else None,
+        status=MLTrainingRun.PENDING,
+    )
+    transaction.on_commit(training_worker_pool.wake)
+    return run, False
+
+
+def claim_next_run():
+    """
+    Toma el próximo entrenamiento pendiente (o abandonado) de una
+    organización que no tenga otro en curso. None si no hay.
+    """
+    runs = MLTrainingRun.objects.all_organizations()
+    stale_before = timezone.now() - timedelta(seconds=settings.ML_TRAINING_TIMEOUT)
+    busy = set(
+        runs.filter(status=MLTrainingRun.RUNNING, started_at__gte=stale_before)
+        .values_list('organization_id', 'name')
+    )
+    candidates = runs.filter(
+        Q(status=MLTrainingRun.PENDING) |
+        Q(status=MLTrainingRun.RUNNING, started_at__lt=stale_before)
+    ).order_by('id').values_list('id', 'organization_id', 'name', 'status', 'attempts')[:10]
+
+    for run_id, organization_id, name, status, attempts in candidates:
+        if (organization_id, name) in busy:
+            continue
+        # UPDATE condicional: solo un worker gana cada entrenamiento
+        claimed = runs.filter(id=run_id, status=status, attempts=attempts).update(
+            status=MLTrainingRun.RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return runs.select_related('organization').get(id=run_id)
+    return None
+
+
+def _parcel_harvest_counts():
+    """{parcel_id: cosechas} de la organización actual desde los resúmenes"""
+    return dict(
+        ParcelCampaignSummary.objects.values('parcel_id')
+        .annotate(n=Sum('harvest_count')).order_by()
+        .values_list('parcel_id', 'n')
+    )
+
+
+def train_incremental(run, record, n_jobs=1):
+    """
+    Agrega árboles ajustados a las cosechas posteriores a `record`.
+    Retorna (versión nueva o None si no hay datos suficientes, métricas).
+    """
+    bundle = model_registry.load_for_training(record)
+    model = bundle['model']
+    encoders = {
+        name: CategoricalEncoder.from_dict(data) for name, data in bundle['encoders'].items()
+    }
+    X, y, _, last_id = build_training_set(
+        HarvestedProduct.objects.filter(id__gt=record.last_harvest_id),
+        encoders=encoders,
+        parcel_counts=_parcel_harvest_counts(),
+    )
+    metrics = {
+        'mode': MLTrainingRun.INCREMENTAL,
+        'base_version': record.version,
+        'samples': len(X),
+    }
+    if len(X) < MIN_NEW_SAMPLES:
+        metrics['skipped'] = f'{len(X)} cosechas nuevas (mínimo {MIN_NEW_SAMPLES})'
+        return None, metrics
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    n_trees = len(model.estimators_)
+    model.set_params(
+        warm_start=True,
+        n_estimators=n_trees + settings.ML_INCREMENTAL_TREES,
+        n_jobs=n_jobs,
+    )
+    model.fit(X_train, y_train)
+    model.set_params(warm_start=False, n_jobs=None)
+
+    metrics.update({
+        # Puntajes sobre los datos nuevos, con todo el bosque
+        'train_score': model.score(X_train, y_train),
+        'test_score': model.score(X_test, y_test),
+        'n_estimators': len(model.estimators_),
+        'added_estimators': len(model.estimators_) - n_trees,
+    })
+    new_record = model_registry.register(
+        run.organization, bundle, metrics=metrics, name=run.name, user=run.requested_by,
+        last_harvest_id=max(last_id, record.last_harvest_id),
+    )
+    return new_record, metrics
+
+
+def _versions(run):
+    return MLModelVersion.objects.all_organizations().filter(
+        organization_id=run.organization_id, name=run.name
+    )
+
+
+def train_full(run, n_jobs=1):
+    """Entrena desde cero con todo el historial. Retorna (versión, métricas)."""
+    predictor = YieldPredictor(run.organization)
+    result = predictor.train(user=run.requested_by, n_jobs=n_jobs)
+    if not result.get('success'):
+        raise ValueError(result.get('message', 'No se pudo entrenar el modelo'))
+    record = _versions(run).get(version=predictor.version)
+    return record, dict(record.metrics)
+
+
+def run_training(run, n_jobs=None):
+    """
+    Ejecuta un entrenamiento ya tomado y actualiza su estado. `n_jobs` por
+    defecto es el límite para threads del proceso web.
+    """
+    if n_jobs is None:
+        n_jobs = settings.ML_TRAINING_IN_PROCESS_N_JOBS
+    max_attempts = settings.REPORT_JOB_MAX_ATTEMPTS
+    started = time.perf_counter()
+    set_current_organization(run.organization)
+    try:
+        # Sin la caché del registro: otro proceso pudo registrar una versión
+        active = _versions(run).filter(is_active=True).order_by('-version').first()
+        incremental = (
+            run.requested_mode == MLTrainingRun.INCREMENTAL
+            and active is not None
+            and active.last_harvest_id > 0
+            and active.metrics.get('n_estimators', 0) + settings.ML_INCREMENTAL_TREES
+            <= settings.ML_MAX_TREES
+        )
+
+        if incremental:
+            record, metrics = train_incremental(run, active, n_jobs)
+            run.mode = MLTrainingRun.INCREMENTAL
+            run.base_version = active.version
+        else:
+            record, metrics = train_full(run, n_jobs)
+            run.mode = MLTrainingRun.FULL
+            run.base_version = None
+
+        run.model_version = record
+        run.metrics = metrics
+        run.samples = metrics.get('samples', 0)
+        run.train_score = metrics.get('train_score')
+        run.test_score = metrics.get('test_score')
+        run.status = MLTrainingRun.COMPLETED
+        run.completed_at = timezone.now()
+        run.error = ''
+    except Exception as e:
+        print(f"Error en el entrenamiento {run.id}: {e}")
+        run.error = str(e)
+        run.status = MLTrainingRun.FAILED if run.attempts >= max_attempts else MLTrainingRun.PENDING
+    finally:
+        set_current_organization(None)
+
+    run.duration_seconds = round(time.perf_counter() - started, 3)
+    run.save(update_fields=[
+        'mode', 'base_version', 'model_version', 'metrics', 'samples', 'train_score',
+        'test_score', 'status', 'completed_at', 'error', 'duration_seconds'
+    ])
+    return run
+
+
+def run_payload(run):
+    """Representación JSON de un entrenamiento"""
+    return {
+        'id': run.id,
+        'status': run.status,
+        'requested_mode': run.requested_mode,
+        'mode': run.mode,
+        'base_version': run.base_version,
+        'model_version': run.model_version.version if run.model_version_id else None,
+        'samples': run.samples,
+        'train_score': run.train_score,
+        'test_score': run.test_score,
+        'metrics': run.metrics,
+        'attempts': run.attempts,
+        'error': run.error,
+        'created_at': run.created_at,
+        'started_at': run.started_at,
+        'completed_at': run.completed_at,
+        'duration_seconds': run.duration_seconds,
+    }
+
+
+training_worker_pool = ReportWorkerPool(
+    workers=settings.ML_TRAINING_WORKERS,
+    claim=claim_next_run,
+    run=run_training,
+    name='ml-trainer',
+)
+atexit.register(training_worker_pool.stop, timeout=30)
@@ -43,7 +43,10 @@ class ReportType(TenantModel):
 
 
 class GeneratedReport(TenantModel):
-    """Reportes generados"""
+    """
+    Reportes generados. Las filas en estado PENDING forman la cola de
+    generación en segundo plano (reports/jobs.py).
+    """
     PDF = 'PDF'
     EXCEL = 'EXCEL'
     CSV = 'CSV'
@@ -54,13 +57,28 @@ class GeneratedReport(TenantModel):
         (CSV, 'CSV'),
     ]
     
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+    
+    STATUS_CHOICES = [
+        (PENDING, 'En cola'),
+        (RUNNING, 'Generando'),
+        (COMPLETED, 'Completado'),
+        (FAILED, 'Fallido'),
+    ]
+    
     report_type = models.ForeignKey(ReportType, on_delete=models.PROTECT,
                                    related_name='generated_reports')
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     
     # Filtros aplicados
+    report_code = models.CharField(max_length=100, blank=True, verbose_name='Código de reporte')
     filters = models.JSONField(default=dict, verbose_name='Filtros aplicados')
+    # Hash de (organización, reporte, formato, filtros) para reutilizar archivos
+    cache_key = models.CharField(max_length=64, blank=True, db_index=True)
     
     # Archivo
     file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
@@ -70,6 +88,13 @@ class GeneratedReport(TenantModel):
     # Datos del reporte
     data = models.JSONField(default=dict, verbose_name='Datos del reporte')
     
+    # Generación en segundo plano
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=COMPLETED)
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    error = models.TextField(blank=True, verbose_name='Error')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Inicio de generación')
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name='Fin de generación')
+    
     # Metadatos
     generated_at = models.DateTimeField(auto_now_add=True)
     generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
@@ -84,6 +109,108 @@ class GeneratedReport(TenantModel):
         verbose_name = 'Reporte Generado'
         verbose_name_plural = 'Reportes Generados'
         ordering = ['-generated_at']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['organization', 'cache_key', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.generated_at.strftime('%Y-%m-%d')}"
+
+
+class MLModelVersion(TenantModel):
+    """
+    Versión entrenada de un modelo de predicción por organización. El archivo
+    (joblib) vive en ML_MODEL_DIR/<organización>/; el registro guarda su
+    checksum y metadatos (reports/ml_registry.py).
+    """
+    name = models.CharField(max_length=100, default='yield_predictor', verbose_name='Modelo')
+    version = models.PositiveIntegerField(verbose_name='Versión')
+    file_path = models.CharField(max_length=500, verbose_name='Archivo')
+    checksum = models.CharField(max_length=64, verbose_name='SHA-256')
+    file_size = models.BigIntegerField(null=True, blank=True, verbose_name='Tamaño (bytes)')
+    feature_names = models.JSONField(default=list, verbose_name='Features')
+    metrics = models.JSONField(default=dict, verbose_name='Métricas de entrenamiento')
+    # Mayor id de HarvestedProduct incluido en el entrenamiento (reentrenamiento incremental)
+    last_harvest_id = models.BigIntegerField(default=0, verbose_name='Última cosecha vista')
+    is_active = models.BooleanField(default=True, verbose_name='Versión activa')
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='ml_model_versions')
+
+    class Meta:
+        db_table = 'ml_model_versions'
+        verbose_name = 'Versión de Modelo ML'
+        verbose_name_plural = 'Versiones de Modelos ML'
+        ordering = ['-version']
+        unique_together = [['organization', 'name', 'version']]
+        indexes = [
+            models.Index(fields=['organization', 'name', 'is_active']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class MLTrainingRun(TenantModel):
+    """
+    Ejecución de entrenamiento del modelo de rendimiento. Las filas en estado
+    PENDING forman la cola del entrenador en segundo plano (reports/ml_training.py).
+    """
+    FULL = 'FULL'
+    INCREMENTAL = 'INCREMENTAL'
+    
+    MODE_CHOICES = [
+        (FULL, 'Completo'),
+        (INCREMENTAL, 'Incremental'),
+    ]
+    
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+    
+    STATUS_CHOICES = [
+        (PENDING, 'En cola'),
+        (RUNNING, 'Entrenando'),
+        (COMPLETED, 'Completado'),
+        (FAILED, 'Fallido'),
+    ]
+    
+    name = models.CharField(max_length=100, default='yield_predictor', verbose_name='Modelo')
+    requested_mode = models.CharField(max_length=20, choices=MODE_CHOICES, default=INCREMENTAL,
+                                      verbose_name='Modo solicitado')
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, blank=True, verbose_name='Modo ejecutado')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    
+    # Resultado
+    base_version = models.PositiveIntegerField(null=True, blank=True, verbose_name='Versión base')
+    model_version = models.ForeignKey(MLModelVersion, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='training_runs', verbose_name='Versión generada')
+    samples = models.PositiveIntegerField(default=0, verbose_name='Muestras')
+    train_score = models.FloatField(null=True, blank=True)
+    test_score = models.FloatField(null=True, blank=True)
+    metrics = models.JSONField(default=dict, verbose_name='Métricas')
+    error = models.TextField(blank=True)
+    
+    # Tiempos
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True, verbose_name='Duración (s)')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='ml_training_runs')
+
+    class Meta:
+        db_table = 'ml_training_runs'
+        verbose_name = 'Entrenamiento de Modelo ML'
+        verbose_name_plural = 'Entrenamientos de Modelos ML'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['organization', 'name', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} {self.get_requested_mode_display()} - {self.get_status_display()}"
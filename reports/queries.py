@@ -0,0 +1,136 @@
+"""
+Consultas de reportes basadas en agregaciones agrupadas.
+
+Cada función produce su reporte en un número constante de consultas,
+independiente de la cantidad de socios, parcelas o comunidades: la
+producción se lee de los resúmenes precalculados (production/summaries.py)
+con un solo GROUP BY por dimensión y se combina en memoria con las filas
+base; los conteos por estado usan agregación condicional.
+
+Las funciones por socio, parcela y comunidad retornan un generador: las
+consultas (y el filtro de organización) se arman al llamarlas, pero las
+filas base se leen con .iterator() a medida que se consumen, así una
+exportación en streaming no carga el reporte completo en memoria.
+
+Usadas por ReportViewSet (reports/views.py) y por el comando
+benchmark_reports.
+"""
+from django.db.models import Count, Q, Sum
+
+from partners.models import Partner, Community
+from parcels.models import Parcel
+from production.models import ParcelCampaignSummary, PartnerCampaignSummary
+
+
+# Filas por lote al recorrer las filas base
+CHUNK_SIZE = 2000
+
+# Tabla resumen que se agrega para cada dimensión
+SUMMARY_SOURCES = {
+    'partner_id': PartnerCampaignSummary,
+    'partner__community_id': PartnerCampaignSummary,
+    'parcel_id': ParcelCampaignSummary,
+}
+
+
+def _harvest_totals(group_by, with_avg=False, **filters):
+    """
+    {valor de group_by: {'total': cantidad total, 'avg': cantidad promedio por
+    cosecha}} en 1 consulta sobre los resúmenes por campaña
+    """
+    rows = (
+        SUMMARY_SOURCES[group_by].objects.filter(**filters)
+        .values(group_by)
+        .annotate(total=Sum('total_quantity'), count=Sum('harvest_count'))
+        .order_by()
+    )
+    totals = {}
+    for row in rows:
+        if with_avg:
+            row['avg'] = row['total'] / row['count'] if row['count'] else 0
+        totals[row[group_by]] = row
+    return totals
+
+
+def partner_performance(partner_id=None):
+    """Producción total, rendimiento promedio y parcelas por socio (3 consultas)"""
+    partners = Partner.objects.all()
+    harvest_filters = {}
+    parcels = Parcel.objects.all()
+    if partner_id:
+        partners = partners.filter(id=partner_id)
+        harvest_filters['partner_id'] = partner_id
+        parcels = parcels.filter(partner_id=partner_id)
+
+    totals = _harvest_totals('partner_id', with_avg=True, **harvest_filters)
+    parcel_counts = dict(
+        parcels.values('partner_id').annotate(n=Count('id')).order_by().values_list('partner_id', 'n')
+    )
+
+    rows = partners.values('id', 'first_name', 'last_name').order_by('id')
+
+    def generate():
+        for partner in rows.iterator(chunk_size=CHUNK_SIZE):
+            harvest = totals.get(partner['id'], {})
+            partner['total_production'] = harvest.get('total') or 0
+            partner['avg_yield'] = harvest.get('avg') or 0
+            partner['total_parcels'] = parcel_counts.get(partner['id'], 0)
+            yield partner
+    return generate()
+
+
+def parcel_performance(parcel_id=None):
+    """Producción total por parcela con datos del socio (2 consultas)"""
+    parcels = Parcel.objects.all()
+    harvest_filters = {}
+    if parcel_id:
+        parcels = parcels.filter(id=parcel_id)
+        harvest_filters['parcel_id'] = parcel_id
+
+    totals = _harvest_totals('parcel_id', **harvest_filters)
+
+    rows = parcels.values(
+        'id', 'code', 'surface', 'partner__first_name', 'partner__last_name'
+    ).order_by('id')
+
+    def generate():
+        for parcel in rows.iterator(chunk_size=CHUNK_SIZE):
+            parcel['total_production'] = totals.get(parcel['id'], {}).get('total') or 0
+            yield parcel
+    return generate()
+
+
+def partners_by_community():
+    """Socios (totales/activos) y producción por comunidad (2 consultas)"""
+    totals = _harvest_totals('partner__community_id')
+    communities = Community.objects.annotate(
+        total_partners=Count('partners'),
+        active_partners=Count('partners', filter=Q(partners__status='ACTIVE')),
+    ).values('id', 'name', 'total_partners', 'active_partners').order_by('name')
+
+    def generate():
+        for community in communities.iterator(chunk_size=CHUNK_SIZE):
+            community['inactive_partners'] = community['total_partners'] - community['active_partners']
+            community['total_production'] = totals.get(community['id'], {}).get('total') or 0
+            yield community
+    return generate()
+
+
+def active_partners_by_community():
+    """Socios activos por comunidad con agregación condicional (1 consulta)"""
+    return Partner.objects.values('community__name').annotate(
+        count=Count('id', filter=Q(status='ACTIVE'))
+    ).order_by('community__name')
+
+
+def total_hectares():
+    """Superficie total de las parcelas (1 consulta)"""
+    return Parcel.objects.aggregate(total=Sum('surface'))['total'] or 0
+
+
+def hectares_by_crop():
+    """Hectáreas y parcelas por cultivo (1 consulta)"""
+    return Parcel.objects.values('current_crop__name').annotate(
+        total_hectares=Sum('surface'),
+        parcel_count=Count('id')
+    ).order_by('current_crop__name')
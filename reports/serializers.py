@@ -16,6 +16,8 @@ class GeneratedReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = GeneratedReport
         fields = ['id', 'report_type', 'report_type_name', 'title', 'description',
-                  'filters', 'file_format', 'file_path', 'file_size', 'data',
+                  'report_code', 'filters', 'file_format', 'file_path', 'file_size', 'data',
+                  'status', 'error', 'started_at', 'completed_at',
                   'generated_at', 'is_public', 'download_count']
-        read_only_fields = ['generated_at', 'download_count']
+        read_only_fields = ['generated_at', 'download_count', 'status', 'error',
+                            'started_at', 'completed_at']
@@ -1,138 +1,180 @@
-"""Utilidades para exportación de reportes"""
-from io import BytesIO
-from django.http import HttpResponse
+"""
+Utilidades para exportación de reportes.
+
+CSV y Excel se generan en streaming: las filas pueden ser cualquier
+iterable (p. ej. un queryset recorrido con .iterator(chunk_size=...)) y
+nunca se cargan completas en memoria.
+"""
 import csv
+import tempfile
+from io import BytesIO, StringIO
+from itertools import chain, islice
 
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 
-def export_to_csv(data, filename, headers):
-    """Exportar datos a CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    writer = csv.writer(response)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def iter_csv(data, headers, chunk_rows=1000):
+    """Genera el CSV en bloques de `chunk_rows` filas"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
     writer.writerow(headers)
-    
-    for row in data:
+    for count, row in enumerate(data, 1):
         writer.writerow(row)
-    
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def export_to_csv(data, filename, headers):
+    """Exportar datos a CSV (StreamingHttpResponse)"""
+    response = StreamingHttpResponse(iter_csv(data, headers), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 
+def estimate_column_widths(headers, sample, min_width=8, max_width=50):
+    """
+    Ancho de cada columna según el valor más largo entre los encabezados y
+    una muestra de filas (no es necesario recorrer todos los datos)
+    """
+    widths = [len(str(header)) for header in headers]
+    for row in sample:
+        for index, value in enumerate(row[:len(widths)]):
+            if value is not None:
+                widths[index] = max(widths[index], len(str(value)))
+    return [min(max(width + 2, min_width), max_width) for width in widths]
+
+
+def write_csv(data, headers, output):
+    """Escribir el CSV en un archivo de texto abierto"""
+    for chunk in iter_csv(data, headers):
+        output.write(chunk)
+
+
+def write_excel(data, headers, output, sheet_name='Reporte', sample_size=200):
+    """
+    Escribir un .xlsx con openpyxl en modo write-only: las filas se vuelcan
+    a medida que llegan, sin mantener la hoja en memoria.
+    Lanza ImportError si openpyxl no está instalado.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+
+    # En modo write-only los anchos se fijan antes de la primera fila
+    rows = iter(data)
+    sample = list(islice(rows, sample_size))
+    for index, width in enumerate(estimate_column_widths(headers, sample), 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+    # Estilo para encabezados
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center')
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in chain(sample, rows):
+        ws.append(list(row))
+
+    wb.save(output)
+
+
+def write_pdf(data, title, headers, output):
+    """
+    Escribir el PDF (tabla con título) en un archivo binario abierto.
+    Lanza ImportError si reportlab no está instalado.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    elements = []
+
+    # Estilos
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#366092'),
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+
+    # Título
+    elements.append(Paragraph(title, title_style))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Tabla (repite encabezados en cada página)
+    table = Table([list(headers)] + [list(row) for row in data], repeatRows=1)
+
+    # Estilo de tabla
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    ]))
+
+    elements.append(table)
+    doc.build(elements)
+
+
 def export_to_excel(data, filename, headers, sheet_name='Reporte'):
-    """Exportar datos a Excel"""
+    """
+    Exportar datos a Excel: se escribe en un archivo temporal y la respuesta
+    se envía por bloques desde ese archivo.
+    """
+    output = tempfile.TemporaryFile(suffix='.xlsx')
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill
-        
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-        
-        # Estilo para encabezados
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        
-        # Escribir encabezados
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-        
-        # Escribir datos
-        for row_num, row_data in enumerate(data, 2):
-            for col_num, value in enumerate(row_data, 1):
-                ws.cell(row=row_num, column=col_num, value=value)
-        
-        # Ajustar ancho de columnas
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Guardar en BytesIO
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        response = HttpResponse(
-            output.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
-        
+        write_excel(data, headers, output, sheet_name)
     except ImportError:
         # Si openpyxl no está instalado, retornar CSV
+        output.close()
         return export_to_csv(data, filename.replace('.xlsx', '.csv'), headers)
+    output.seek(0)
+    # FileResponse cierra (y elimina) el archivo temporal al terminar de enviarlo
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
 
 
 def export_to_pdf(data, filename, title, headers):
-    """Exportar datos a PDF"""
+    """
+    Exportar datos a PDF de forma síncrona. Para tablas grandes usar la
+    generación en segundo plano (reports/jobs.py).
+    """
+    buffer = BytesIO()
     try:
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        elements = []
-        
-        # Estilos
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-        
-        # Título
-        elements.append(Paragraph(title, title_style))
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Tabla
-        table_data = [headers] + data
-        table = Table(table_data)
-        
-        # Estilo de tabla
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        
-        elements.append(table)
-        
-        # Generar PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
-        
+        write_pdf(data, title, headers, buffer)
     except ImportError:
         # Si reportlab no está instalado, retornar CSV
         return export_to_csv(data, filename.replace('.pdf', '.csv'), headers)
+    buffer.seek(0)
+
+    response = HttpResponse(buffer.read(), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
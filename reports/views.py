@@ -2,17 +2,40 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
-from django.db.models import Sum, Count, Avg
-import csv
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.models import Count, F
+import json
+import os
 from datetime import datetime
+from tenants.middleware import get_current_organization
 from .models import ReportType, GeneratedReport
 from .serializers import ReportTypeSerializer, GeneratedReportSerializer
 from .utils import export_to_csv, export_to_excel, export_to_pdf
 from .ml_predictions import YieldPredictor, ProductionForecaster
-from partners.models import Partner, Community
-from parcels.models import Parcel
-from production.models import HarvestedProduct
+from .ml_registry import model_registry
+from .ml_training import request_training, run_payload
+from .models import MLTrainingRun
+from . import queries as report_queries
+from . import jobs as report_jobs
+from partners.models import Partner
+
+
+# Reportes exportables: código -> (método que arma filas/encabezados, título, ReportType)
+EXPORT_REPORTS = {
+    'performance_by_partner': ('_get_performance_data', 'Reporte de Rendimiento por Socio', ReportType.PERFORMANCE),
+    'population_active_partners': ('_get_population_data', 'Población Activa de Socios', ReportType.POPULATION),
+    'hectares_by_crop': ('_get_hectares_data', 'Hectáreas por Cultivo', ReportType.HECTARES),
+    'performance_by_parcel': ('_get_parcel_performance_data', 'Reporte de Rendimiento por Parcela', ReportType.PERFORMANCE),
+    'partners_by_community': ('_get_partners_by_community_data', 'Socios por Comunidad', ReportType.POPULATION),
+    'hectares_by_crop_detailed': ('_get_hectares_by_crop_data', 'Hectáreas por Cultivo - Detallado', ReportType.HECTARES),
+}
+
+
+def _partner_name(row):
+    """Nombre del socio desde una fila de parcel_performance()"""
+    if row['partner__first_name'] is None:
+        return "Sin socio"
+    return f"{row['partner__first_name']} {row['partner__last_name']}"
 
 
 class ReportTypeViewSet(viewsets.ReadOnlyModelViewSet):
@@ -26,32 +49,23 @@ class ReportViewSet(viewsets.ModelViewSet):
     serializer_class = GeneratedReportSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_queryset(self):
+        # Evaluar el filtro por organización en cada request
+        return GeneratedReport.objects.select_related('report_type')
+    
     @action(detail=False, methods=['get'])
     def performance_by_partner(self, request):
         """Reporte de rendimiento por socio"""
         partner_id = request.query_params.get('partner_id')
         
         try:
-            if partner_id:
-                partners = Partner.objects.filter(id=partner_id)
-            else:
-                partners = Partner.objects.all()
-            
-            data = []
-            for partner in partners:
-                production = HarvestedProduct.objects.filter(partner=partner)
-                total_prod = production.aggregate(Sum('quantity'))['quantity__sum'] or 0
-                avg_yield = production.aggregate(Avg('quantity'))['quantity__avg'] or 0
-                
-                partner_name = f"{partner.first_name} {partner.last_name}"
-                
-                data.append({
-                    'partner_id': partner.id,
-                    'partner_name': partner_name,
-                    'total_production': float(total_prod),
-                    'total_parcels': partner.parcels.count(),
-                    'avg_yield': float(avg_yield)
-                })
+            data = [{
+                'partner_id': row['id'],
+                'partner_name': f"{row['first_name']} {row['last_name']}",
+                'total_production': float(row['total_production']),
+                'total_parcels': row['total_parcels'],
+                'avg_yield': float(row['avg_yield'])
+            } for row in report_queries.partner_performance(partner_id)]
             
             return Response(data)
         except Exception as e:
@@ -67,7 +81,7 @@ class ReportViewSet(viewsets.ModelViewSet):
             'total_active': Partner.objects.filter(status='ACTIVE').count(),
             'by_community': Partner.objects.values('community__name').annotate(
                 count=Count('id')
-            ),
+            ).order_by('community__name'),
             'by_status': Partner.objects.values('status').annotate(count=Count('id'))
         }
         return Response(data)
@@ -75,22 +89,29 @@ class ReportViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def hectares_by_crop(self, request):
         """Hectáreas por cultivo"""
-        data = Parcel.objects.values('current_crop__name').annotate(
-            total_hectares=Sum('surface'),
-            parcel_count=Count('id')
-        )
-        return Response(data)
+        return Response(report_queries.hectares_by_crop())
     
     @action(detail=False, methods=['post'])
     def export_report(self, request):
-        """Exportar reporte en múltiples formatos (CSV, Excel, PDF)"""
+        """
+        Exportar reporte en múltiples formatos (CSV, Excel, PDF).
+        
+        Por defecto responde el archivo. Con async=true el reporte se encola
+        (lo procesa run_report_workers) y se responde 202 con el id del
+        GeneratedReport; el archivo se consulta en /reports/{id}/status/ y se
+        descarga en /reports/{id}/download/.
+        """
         report_type = request.data.get('report_type')
         export_format = request.data.get('format', 'csv').lower()
         custom_data = request.data.get('data')  # Datos filtrados del frontend
         custom_headers = request.data.get('headers')  # Headers personalizados
         selected_columns = request.data.get('selected_columns', [])
+        run_async = request.data.get('async', False)
+        if isinstance(run_async, str):
+            run_async = run_async.lower() == 'true'
         
         try:
+            data = headers = None
             # Si se envían datos personalizados, usarlos
             if custom_data and custom_headers:
                 # Convertir datos de dict a lista de listas
@@ -106,40 +127,19 @@ class ReportViewSet(viewsets.ModelViewSet):
                             row.append(value if value is not None else '')
                     data.append(row)
                 headers = custom_headers
-                
-                # Determinar título según tipo de reporte
-                title_map = {
-                    'performance_by_partner': 'Reporte de Rendimiento por Socio',
-                    'performance_by_parcel': 'Reporte de Rendimiento por Parcela',
-                    'partners_by_community': 'Socios por Comunidad',
-                    'hectares_by_crop': 'Hectáreas por Cultivo',
-                    'hectares_by_crop_detailed': 'Hectáreas por Cultivo - Detallado',
-                    'population_active_partners': 'Población Activa de Socios'
-                }
-                title = title_map.get(report_type, 'Reporte')
+                title = EXPORT_REPORTS.get(report_type, (None, 'Reporte'))[1]
+            elif report_type in EXPORT_REPORTS:
+                # Modo legacy: datos calculados en el servidor
+                title = EXPORT_REPORTS[report_type][1]
             else:
-                # Obtener datos según el tipo de reporte (modo legacy)
-                if report_type == 'performance_by_partner':
-                    data, headers = self._get_performance_data()
-                    title = 'Reporte de Rendimiento por Socio'
-                elif report_type == 'population_active_partners':
-                    data, headers = self._get_population_data()
-                    title = 'Población Activa de Socios'
-                elif report_type == 'hectares_by_crop':
-                    data, headers = self._get_hectares_data()
-                    title = 'Hectáreas por Cultivo'
-                elif report_type == 'performance_by_parcel':
-                    data, headers = self._get_parcel_performance_data()
-                    title = 'Reporte de Rendimiento por Parcela'
-                elif report_type == 'partners_by_community':
-                    data, headers = self._get_partners_by_community_data()
-                    title = 'Socios por Comunidad'
-                elif report_type == 'hectares_by_crop_detailed':
-                    data, headers = self._get_hectares_by_crop_data()
-                    title = 'Hectáreas por Cultivo - Detallado'
-                else:
-                    return Response({'error': 'Tipo de reporte no válido'}, 
-                                  status=status.HTTP_400_BAD_REQUEST)
+                return Response({'error': 'Tipo de reporte no válido'}, 
+                              status=status.HTTP_400_BAD_REQUEST)
+            
+            if run_async:
+                return self._enqueue_export(request, report_type, export_format, title, data, headers)
+            
+            if data is None:
+                data, headers = getattr(self, EXPORT_REPORTS[report_type][0])()
             
             # Generar archivo según formato
             filename = f"{report_type}_{datetime.now().strftime('%Y%m%d')}"
@@ -156,144 +156,180 @@ class ReportViewSet(viewsets.ModelViewSet):
                 'message': 'Error al exportar el reporte'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _enqueue_export(self, request, report_type, export_format, title, data, headers):
+        """Encolar la exportación en segundo plano (reports/jobs.py)"""
+        organization = get_current_organization()
+        if not organization:
+            return Response({'error': 'Organización no especificada'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = {
+            'pdf': GeneratedReport.PDF,
+            'excel': GeneratedReport.EXCEL,
+        }.get(export_format, GeneratedReport.CSV)
+        report_type_name = EXPORT_REPORTS.get(report_type, (None, None, ReportType.CUSTOM))[2]
+        
+        report, reused = report_jobs.enqueue(
+            organization=organization,
+            user=request.user,
+            report_code=report_type or 'custom',
+            report_type_name=report_type_name,
+            title=title,
+            file_format=file_format,
+            filters=request.data.get('filters') or {},
+            data={'rows': data, 'headers': headers} if data is not None else None,
+        )
+        payload = self._job_payload(report)
+        payload['reused'] = reused
+        return Response(payload, status=status.HTTP_202_ACCEPTED)
+    
+    def _job_payload(self, report):
+        payload = {
+            'id': report.id,
+            'status': report.status,
+            'file_format': report.file_format,
+            'file_size': report.file_size,
+            'error': report.error,
+            'generated_at': report.generated_at,
+            'completed_at': report.completed_at,
+            'status_url': self.reverse_action('job-status', args=[report.id]),
+            'download_url': None,
+        }
+        if report.status == GeneratedReport.COMPLETED:
+            payload['download_url'] = self.reverse_action('download', args=[report.id])
+        return payload
+    
+    @action(detail=True, methods=['get'], url_path='status', url_name='job-status')
+    def job_status(self, request, pk=None):
+        """Estado de un reporte generado en segundo plano"""
+        report = self.get_object()
+        if report.status == GeneratedReport.PENDING:
+            # Asegura que haya workers en este proceso (p. ej. tras un reinicio)
+            report_jobs.report_worker_pool.wake()
+        return Response(self._job_payload(report))
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Descargar el archivo de un reporte generado"""
+        report = self.get_object()
+        if report.status != GeneratedReport.COMPLETED:
+            return Response(self._job_payload(report), status=status.HTTP_409_CONFLICT)
+        
+        path = report_jobs.artifact_path(report)
+        if not report.file_path or not os.path.exists(path):
+            return Response({'error': 'El archivo del reporte ya no está disponible'},
+                            status=status.HTTP_404_NOT_FOUND)
+        
+        GeneratedReport.objects.filter(id=report.id).update(download_count=F('download_count') + 1)
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(report.file_path),
+            content_type=report_jobs.CONTENT_TYPES[report.file_format],
+        )
+    
+    # Los _get_*_data retornan (filas, encabezados) con las filas como
+    # generador: las consultas se arman al llamarlos (con la organización del
+    # request) y las filas se producen a medida que el exportador las escribe.
+    
     def _get_performance_data(self):
         """Obtener datos de rendimiento"""
-        partners = Partner.objects.all()
         headers = ['ID', 'Socio', 'Producción Total', 'Parcelas', 'Rendimiento Promedio']
-        data = []
-        
-        for partner in partners:
-            production = HarvestedProduct.objects.filter(partner=partner)
-            partner_name = f"{partner.first_name} {partner.last_name}"
-            data.append([
-                partner.id,
-                partner_name,
-                production.aggregate(Sum('quantity'))['quantity__sum'] or 0,
-                partner.parcels.count(),
-                round(production.aggregate(Avg('quantity'))['quantity__avg'] or 0, 2)
-            ])
+        data = ([
+            row['id'],
+            f"{row['first_name']} {row['last_name']}",
+            row['total_production'],
+            row['total_parcels'],
+            round(row['avg_yield'], 2)
+        ] for row in report_queries.partner_performance())
         
         return data, headers
     
     def _get_population_data(self):
         """Obtener datos de población"""
         headers = ['Comunidad', 'Socios Activos']
-        data = []
-        
-        communities = Partner.objects.values('community__name').annotate(
-            count=Count('id', filter=Partner.objects.filter(status='ACTIVE').values('id'))
-        )
-        
-        for item in communities:
-            data.append([
-                item['community__name'] or 'Sin comunidad',
-                item['count']
-            ])
+        data = ([
+            item['community__name'] or 'Sin comunidad',
+            item['count']
+        ] for item in report_queries.active_partners_by_community().iterator())
         
         return data, headers
     
     def _get_hectares_data(self):
         """Obtener datos de hectáreas"""
         headers = ['Cultivo', 'Hectáreas Totales', 'Número de Parcelas']
-        data = []
-        
-        crops = Parcel.objects.values('current_crop__name').annotate(
-            total_hectares=Sum('surface'),
-            parcel_count=Count('id')
-        )
-        
-        for item in crops:
-            data.append([
-                item['current_crop__name'] or 'Sin cultivo',
-                round(float(item['total_hectares'] or 0), 2),
-                item['parcel_count']
-            ])
+        data = ([
+            item['current_crop__name'] or 'Sin cultivo',
+            round(float(item['total_hectares'] or 0), 2),
+            item['parcel_count']
+        ] for item in report_queries.hectares_by_crop().iterator())
         
         return data, headers
     
     def _get_parcel_performance_data(self):
         """Obtener datos de rendimiento por parcela"""
         headers = ['Código Parcela', 'Socio', 'Superficie (ha)', 'Producción (kg)', 'Rendimiento (kg/ha)']
-        data = []
-        
-        parcels = Parcel.objects.all().select_related('partner')
         
-        for parcel in parcels:
-            production = HarvestedProduct.objects.filter(parcel=parcel)
-            total_prod = production.aggregate(Sum('quantity'))['quantity__sum'] or 0
-            
-            partner_name = f"{parcel.partner.first_name} {parcel.partner.last_name}" if parcel.partner else "Sin socio"
-            parcel_code = parcel.code if hasattr(parcel, 'code') else f"Parcela-{parcel.id}"
-            surface = float(parcel.surface) if parcel.surface else 0
-            yield_per_ha = float(total_prod) / surface if surface > 0 else 0
-            
-            data.append([
-                parcel_code,
-                partner_name,
-                round(surface, 2),
-                round(float(total_prod), 2),
-                round(yield_per_ha, 2)
-            ])
+        def rows(parcels):
+            for parcel in parcels:
+                total_prod = parcel['total_production']
+                surface = float(parcel['surface']) if parcel['surface'] else 0
+                yield_per_ha = float(total_prod) / surface if surface > 0 else 0
+                
+                yield [
+                    parcel['code'] or f"Parcela-{parcel['id']}",
+                    _partner_name(parcel),
+                    round(surface, 2),
+                    round(float(total_prod), 2),
+                    round(yield_per_ha, 2)
+                ]
         
-        return data, headers
+        return rows(report_queries.parcel_performance()), headers
     
     def _get_partners_by_community_data(self):
         """Obtener datos de socios por comunidad"""
         headers = ['Comunidad', 'Total Socios', 'Socios Activos', 'Socios Inactivos', 'Producción Total (kg)', 'Promedio por Socio (kg)']
-        data = []
         
-        communities = Community.objects.all()
-        
-        for community in communities:
-            partners = Partner.objects.filter(community=community)
-            active_partners = partners.filter(status='ACTIVE')
-            
-            # Calcular producción total
-            total_production = 0
-            for partner in partners:
-                prod = HarvestedProduct.objects.filter(partner=partner).aggregate(Sum('quantity'))
-                total_production += prod['quantity__sum'] or 0
-            
-            avg_production = total_production / partners.count() if partners.count() > 0 else 0
-            
-            data.append([
-                community.name,
-                partners.count(),
-                active_partners.count(),
-                partners.count() - active_partners.count(),
-                round(float(total_production), 2),
-                round(float(avg_production), 2)
-            ])
+        def rows(communities):
+            for community in communities:
+                total_production = community['total_production']
+                total_partners = community['total_partners']
+                avg_production = total_production / total_partners if total_partners > 0 else 0
+                
+                yield [
+                    community['name'],
+                    total_partners,
+                    community['active_partners'],
+                    community['inactive_partners'],
+                    round(float(total_production), 2),
+                    round(float(avg_production), 2)
+                ]
         
-        return data, headers
+        return rows(report_queries.partners_by_community()), headers
     
     def _get_hectares_by_crop_data(self):
         """Obtener datos de hectáreas por cultivo"""
         headers = ['Cultivo', 'Hectáreas Totales', 'Número de Parcelas', 'Tamaño Promedio (ha)', '% del Total']
-        data = []
         
-        crops = Parcel.objects.values('current_crop__name').annotate(
-            total_hectares=Sum('surface'),
-            parcel_count=Count('id')
-        )
+        # El total se consulta aparte para no recorrer los cultivos dos veces
+        total_hectares = float(report_queries.total_hectares())
         
-        total_hectares = sum(float(item['total_hectares'] or 0) for item in crops)
-        
-        for item in crops:
-            hectares = float(item['total_hectares'] or 0)
-            count = item['parcel_count']
-            avg_size = hectares / count if count > 0 else 0
-            percentage = (hectares / total_hectares * 100) if total_hectares > 0 else 0
-            
-            data.append([
-                item['current_crop__name'] or 'Sin cultivo',
-                round(hectares, 2),
-                count,
-                round(avg_size, 2),
-                round(percentage, 1)
-            ])
+        def rows(crops):
+            for item in crops:
+                hectares = float(item['total_hectares'] or 0)
+                count = item['parcel_count']
+                avg_size = hectares / count if count > 0 else 0
+                percentage = (hectares / total_hectares * 100) if total_hectares > 0 else 0
+                
+                yield [
+                    item['current_crop__name'] or 'Sin cultivo',
+                    round(hectares, 2),
+                    count,
+                    round(avg_size, 2),
+                    round(percentage, 1)
+                ]
         
-        return data, headers
+        return rows(report_queries.hectares_by_crop().iterator()), headers
     
     @action(detail=False, methods=['get'])
     def performance_by_parcel(self, request):
@@ -301,26 +337,18 @@ class ReportViewSet(viewsets.ModelViewSet):
         parcel_id = request.query_params.get('parcel_id')
         
         try:
-            if parcel_id:
-                parcels = Parcel.objects.filter(id=parcel_id).select_related('partner')
-            else:
-                parcels = Parcel.objects.all().select_related('partner')
-            
             data = []
-            for parcel in parcels:
-                production = HarvestedProduct.objects.filter(parcel=parcel)
-                total_prod = production.aggregate(Sum('quantity'))['quantity__sum'] or 0
-                
-                # Obtener nombre del socio
-                partner_name = f"{parcel.partner.first_name} {parcel.partner.last_name}" if parcel.partner else "Sin socio"
+            for parcel in report_queries.parcel_performance(parcel_id):
+                total_prod = parcel['total_production']
+                surface = parcel['surface']
                 
                 data.append({
-                    'parcel_id': parcel.id,
-                    'parcel_code': parcel.code if hasattr(parcel, 'code') else f"Parcela-{parcel.id}",
-                    'partner_name': partner_name,
-                    'surface': float(parcel.surface) if parcel.surface else 0,
+                    'parcel_id': parcel['id'],
+                    'parcel_code': parcel['code'] or f"Parcela-{parcel['id']}",
+                    'partner_name': _partner_name(parcel),
+                    'surface': float(surface) if surface else 0,
                     'total_production': float(total_prod),
-                    'yield_per_hectare': float(total_prod) / float(parcel.surface) if parcel.surface and float(parcel.surface) > 0 else 0
+                    'yield_per_hectare': float(total_prod) / float(surface) if surface and float(surface) > 0 else 0
                 })
             
             return Response(data)
@@ -332,11 +360,27 @@ class ReportViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def train_ml_model(self, request):
-        """Entrena el modelo de Machine Learning con datos históricos"""
+        """
+        Encola el entrenamiento del modelo de Machine Learning. Por defecto es
+        incremental (solo cosechas nuevas); mode=full reentrena desde cero.
+        Responde 202 con el entrenamiento; lo ejecuta run_report_workers
+        --queue training y el estado se consulta en ml_training_runs.
+        """
+        organization = get_current_organization()
+        if not organization:
+            return Response({'error': 'Organización no especificada'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        mode = str(request.data.get('mode', 'incremental')).upper()
+        if mode not in (MLTrainingRun.INCREMENTAL, MLTrainingRun.FULL):
+            return Response({'error': 'mode debe ser incremental o full'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            predictor = YieldPredictor()
-            result = predictor.train()
-            return Response(result)
+            run, reused = request_training(organization, request.user, mode)
+            payload = run_payload(run)
+            payload['reused'] = reused
+            return Response(payload, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             return Response({
                 'success': False,
@@ -396,6 +440,51 @@ class ReportViewSet(viewsets.ModelViewSet):
                 'message': 'Error al predecir producción del socio'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['get'])
+    def forecast_production(self, request):
+        """
+        Predicción por lotes para un socio (?partner_id=), una campaña
+        (?campaign_id=) o toda la organización. Con ?stream=true responde en
+        JSON lines (una parcela por línea y el total al final) a medida que
+        se procesa cada lote, para organizaciones grandes.
+        """
+        partner_id = request.query_params.get('partner_id')
+        campaign_id = request.query_params.get('campaign_id')
+        
+        try:
+            forecaster = ProductionForecaster()
+            if not forecaster.yield_predictor.load_model():
+                return Response({
+                    'error': 'Modelo no entrenado. Ejecuta /train_ml_model/ primero.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            if request.query_params.get('stream', '').lower() == 'true':
+                parcels = forecaster.parcels_for(partner_id, campaign_id)
+                return StreamingHttpResponse(
+                    self._stream_forecast(forecaster.forecast_parcels(parcels)),
+                    content_type='application/x-ndjson'
+                )
+            
+            return Response(forecaster.forecast_batch(partner_id, campaign_id))
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Error al predecir producción'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @staticmethod
+    def _stream_forecast(predictions):
+        total = 0
+        count = 0
+        for prediction in predictions:
+            total += prediction['predicted_production']
+            count += 1
+            yield json.dumps(prediction) + '\n'
+        yield json.dumps({
+            'total_predicted_production': round(total, 2),
+            'parcels_count': count,
+        }) + '\n'
+    
     @action(detail=False, methods=['get'])
     def ml_insights(self, request):
         """Obtiene insights del modelo de ML"""
@@ -411,6 +500,7 @@ class ReportViewSet(viewsets.ModelViewSet):
             return Response({
                 'feature_importance': importance,
                 'model_status': 'trained',
+                'model_version': predictor.version,
                 'recommendations': [
                     'La superficie de la parcela es el factor más importante' if importance['surface'] > 0.3 else None,
                     'El tipo de suelo tiene impacto significativo' if importance['soil_type'] > 0.2 else None,
@@ -423,6 +513,31 @@ class ReportViewSet(viewsets.ModelViewSet):
                 'message': 'Error al obtener insights'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['get'])
+    def ml_models(self, request):
+        """Versiones del modelo de predicción de la organización con sus métricas"""
+        organization = get_current_organization()
+        if not organization:
+            return Response({'error': 'Organización no especificada'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'versions': model_registry.versions(organization.id),
+            'cache': model_registry.stats(),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def ml_training_runs(self, request):
+        """Entrenamientos recientes de la organización, o uno con ?run_id="""
+        runs = MLTrainingRun.objects.select_related('model_version')
+        run_id = request.query_params.get('run_id')
+        if run_id:
+            run = runs.filter(id=run_id).first()
+            if run is None:
+                return Response({'error': 'Entrenamiento no encontrado'},
+                                status=status.HTTP_404_NOT_FOUND)
+            return Response(run_payload(run))
+        return Response([run_payload(run) for run in runs.order_by('-id')[:20]])
+    
     @action(detail=False, methods=['get'])
     def fertilization_plan(self, request):
         """Genera plan de fertilización inteligente basado en IA"""
@@ -576,27 +691,19 @@ class ReportViewSet(viewsets.ModelViewSet):
     def partners_by_community(self, request):
         """Reporte de socios por comunidad con estadísticas"""
         try:
-            communities = Community.objects.all()
-            
             data = []
-            for community in communities:
-                partners = Partner.objects.filter(community=community)
-                active_partners = partners.filter(status='ACTIVE')
-                
-                # Calcular producción total de la comunidad
-                total_production = 0
-                for partner in partners:
-                    prod = HarvestedProduct.objects.filter(partner=partner).aggregate(Sum('quantity'))
-                    total_production += prod['quantity__sum'] or 0
+            for community in report_queries.partners_by_community():
+                total_production = community['total_production']
+                total_partners = community['total_partners']
                 
                 data.append({
-                    'community_id': community.id,
-                    'community_name': community.name,
-                    'total_partners': partners.count(),
-                    'active_partners': active_partners.count(),
-                    'inactive_partners': partners.count() - active_partners.count(),
+                    'community_id': community['id'],
+                    'community_name': community['name'],
+                    'total_partners': total_partners,
+                    'active_partners': community['active_partners'],
+                    'inactive_partners': community['inactive_partners'],
                     'total_production': round(float(total_production), 2),
-                    'avg_production_per_partner': round(float(total_production) / partners.count(), 2) if partners.count() > 0 else 0
+                    'avg_production_per_partner': round(float(total_production) / total_partners, 2) if total_partners > 0 else 0
                 })
             
             return Response({
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum
 from django.core.validators import MinValueValidator
 from partners.models import Partner
 from campaigns.models import Campaign
@@ -166,23 +167,92 @@ class Order(TenantModel):
     def __str__(self):
         return f"{self.order_number} - {self.customer.name}"
 
-    def calculate_totals(self):
-        """Calcular totales del pedido"""
-        self.subtotal = sum(item.line_total for item in self.items.all())
+    def _apply_totals(self, subtotal):
+        self.subtotal = subtotal
         self.discount_amount = (self.subtotal * self.discount_percentage) / 100
         self.total = self.subtotal - self.discount_amount + self.tax_amount
-        self.save()
+
+    def calculate_totals(self):
+        """Calcular totales del pedido (una suma en la base de datos y un solo guardado)"""
+        self._apply_totals(self.items.aggregate(subtotal=Sum('line_total'))['subtotal'] or 0)
+        self.save(update_fields=['subtotal', 'discount_amount', 'total', 'updated_at'])
+
+    @staticmethod
+    def _build_items(order, lines):
+        """
+        OrderItem sin guardar para las líneas dadas: diccionarios con product
+        (o product_id), quantity, unit_price y notes opcional.
+        """
+        items = []
+        for line in lines:
+            if 'product_id' in line:
+                product_id = line['product_id']
+            else:
+                product_id = getattr(line['product'], 'pk', line['product'])
+            items.append(OrderItem(
+                organization_id=order.organization_id,
+                order=order,
+                product_id=product_id,
+                quantity=line['quantity'],
+                unit_price=line['unit_price'],
+                line_total=line['quantity'] * line['unit_price'],
+                notes=line.get('notes', ''),
+            ))
+        return items
+
+    def add_items(self, lines):
+        """
+        Agrega muchas líneas al pedido con un solo INSERT y recalcula los
+        totales una vez (un UPDATE del pedido y un registro de auditoría).
+        Retorna los items creados.
+        """
+        with transaction.atomic():
+            items = OrderItem.objects.bulk_create(self._build_items(self, lines), batch_size=500)
+            self.calculate_totals()
+        return items
+
+    @classmethod
+    def create_with_items(cls, lines, **fields):
+        """
+        Crea el pedido con todas sus líneas. Los totales se calculan en una
+        pasada sobre las líneas antes del INSERT del pedido, así el pedido se
+        guarda una sola vez (un registro de auditoría) y las líneas van en un
+        bulk_create.
+        """
+        lines = list(lines)
+        with transaction.atomic():
+            order = cls(**fields)
+            order._apply_totals(sum((line['quantity'] * line['unit_price'] for line in lines), 0))
+            order.save()
+            OrderItem.objects.bulk_create(cls._build_items(order, lines), batch_size=500)
+        return order
+
+    # Valores anotados en SQL por OrderViewSet (evitan una consulta por pedido)
+    _total_items = None
+    _total_quantity = None
 
     @property
     def total_items(self):
         """Total de items en el pedido"""
+        if self._total_items is not None:
+            return self._total_items
         return self.items.count()
 
+    @total_items.setter
+    def total_items(self, value):
+        self._total_items = value
+
     @property
     def total_quantity(self):
         """Cantidad total de productos"""
+        if self._total_quantity is not None:
+            return self._total_quantity
         return sum(item.quantity for item in self.items.all())
 
+    @total_quantity.setter
+    def total_quantity(self, value):
+        self._total_quantity = value or 0
+
 
 class OrderItem(TenantModel):
     """Items de pedido"""
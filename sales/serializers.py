@@ -1,4 +1,6 @@
+from decimal import Decimal
 from rest_framework import serializers
+from production.models import HarvestedProduct
 from .models import PaymentMethod, Customer, Order, OrderItem, Payment
 
 
@@ -62,6 +64,46 @@ class OrderSerializer(serializers.ModelSerializer):
         return value
 
 
+class OrderListSerializer(OrderSerializer):
+    """Pedido sin sus líneas, para listados (las líneas se piden con ?expand=items)"""
+    
+    class Meta(OrderSerializer.Meta):
+        fields = [field for field in OrderSerializer.Meta.fields if field != 'items']
+
+
+class OrderLineSerializer(serializers.Serializer):
+    """Línea de la carga masiva de un pedido (ver Order.add_items)"""
+    product = serializers.IntegerField()
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+def validate_order_lines(lines):
+    """Verifica en una sola consulta que existan los productos de las líneas"""
+    product_ids = {line['product'] for line in lines}
+    found = set(HarvestedProduct.objects.filter(id__in=product_ids).values_list('id', flat=True))
+    missing = sorted(product_ids - found)
+    if missing:
+        raise serializers.ValidationError(f"Productos inexistentes: {missing}")
+    return lines
+
+
+class OrderBulkCreateSerializer(OrderSerializer):
+    """Pedido con todas sus líneas en un solo request"""
+    lines = OrderLineSerializer(many=True, write_only=True, allow_empty=False)
+    
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ['lines']
+
+    def validate_lines(self, value):
+        return validate_order_lines(value)
+
+    def create(self, validated_data):
+        lines = validated_data.pop('lines')
+        return Order.create_with_items(lines, **validated_data)
+
+
 class PaymentSerializer(serializers.ModelSerializer):
     order_number = serializers.CharField(source='order.order_number', read_only=True)
     payment_method_name = serializers.CharField(source='payment_method.get_name_display', read_only=True)
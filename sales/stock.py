@@ -0,0 +1,131 @@
+"""
+Reserva de stock al confirmar pedidos.
+
+La confirmación corre en una sola transacción:
+1. Bloquea el pedido (SELECT ... FOR UPDATE) y verifica que siga en
+   borrador, así dos confirmaciones del mismo pedido no descuentan dos veces.
+2. Suma las cantidades pedidas por producto y bloquea todos los productos
+   en una consulta ordenada por id: dos pedidos que comparten productos los
+   bloquean en el mismo orden y no se produce un deadlock.
+3. Descuenta cada producto con un UPDATE condicional
+   (quantity = quantity - n WHERE quantity >= n).
+Si falta stock de algún producto no se descuenta nada.
+
+En PostgreSQL la espera por los bloqueos se limita a SALES_STOCK_LOCK_TIMEOUT
+segundos (lock_timeout); al vencer se lanza StockLocked y el pedido puede
+confirmarse de nuevo.
+
+Los resúmenes de producción se mantienen sobre HarvestedProduct.quantity:
+como los UPDATE no disparan señales, la diferencia se aplica aquí con
+production.summaries.apply_changes.
+"""
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F, Sum
+
+from audit.utils import log_audit
+from production import summaries
+from production.models import HarvestedProduct
+from .models import Order
+
+
+class StockReservationError(Exception):
+    """No se pudo confirmar el pedido"""
+
+
+class OrderNotDraft(StockReservationError):
+    pass
+
+
+class StockLocked(StockReservationError):
+    pass
+
+
+class InsufficientStock(StockReservationError):
+    """Falta stock; `shortages` detalla cada producto"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        names = ', '.join(shortage['product_name'] for shortage in shortages)
+        super().__init__(f'Stock insuficiente para {names}')
+
+
+def _set_lock_timeout():
+    timeout = getattr(settings, 'SALES_STOCK_LOCK_TIMEOUT', 0)
+    if timeout and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL lock_timeout = %s', [f'{int(timeout * 1000)}ms'])
+
+
+def confirm_order(order_id):
+    """
+    Descuenta el stock de las líneas del pedido y lo marca como confirmado,
+    todo o nada. Retorna el pedido; lanza StockReservationError si no se puede.
+    """
+    try:
+        with transaction.atomic():
+            _set_lock_timeout()
+            order = Order.objects.all_organizations().select_for_update().get(pk=order_id)
+            if order.status != Order.DRAFT:
+                raise OrderNotDraft('Solo se pueden confirmar pedidos en borrador')
+
+            requested = dict(
+                order.items.values('product_id').annotate(total=Sum('quantity'))
+                .order_by().values_list('product_id', 'total')
+            )
+            products = list(
+                HarvestedProduct.objects.all_organizations().select_for_update()
+                .filter(id__in=requested).order_by('id')
+                .values(*summaries.SNAPSHOT_FIELDS, 'id')
+            )
+
+            shortages = [
+                {
+                    'product_id': product['id'],
+                    'product_name': product['product_name'],
+                    'requested': requested[product['id']],
+                    'available': product['quantity'],
+                }
+                for product in products
+                if product['quantity'] < requested[product['id']]
+            ]
+            if shortages:
+                raise InsufficientStock(shortages)
+
+            changes = []
+            for product in products:
+                quantity = requested[product['id']]
+                # Condición redundante con el bloqueo; protege a las bases sin FOR UPDATE
+                updated = HarvestedProduct.objects.all_organizations().filter(
+                    id=product['id'], quantity__gte=quantity
+                ).update(quantity=F('quantity') - quantity)
+                if not updated:
+                    raise InsufficientStock([{
+                        'product_id': product['id'],
+                        'product_name': product['product_name'],
+                        'requested': quantity,
+                        'available': None,
+                    }])
+                previous = {field: product[field] for field in summaries.SNAPSHOT_FIELDS}
+                current = dict(previous, quantity=product['quantity'] - quantity, id=product['id'])
+                changes.append((previous, current))
+            summaries.apply_changes(changes)
+
+            order.status = Order.CONFIRMED
+            order.save(update_fields=['status', 'updated_at'])
+    except OperationalError as e:
+        if 'lock' in str(e).lower():
+            raise StockLocked('Los productos están siendo reservados por otro pedido; intente nuevamente')
+        raise
+
+    # Fuera de la transacción: solo se audita lo que quedó confirmado
+    for previous, current in changes:
+        log_audit(
+            action='UPDATE',
+            model_name='HarvestedProduct',
+            object_id=current['id'],
+            description=f"Producto {current['product_name']} - "
+                        f"{previous['quantity'] - current['quantity']}kg reservado para el pedido "
+                        f"{order.order_number} (quedan {current['quantity']}kg)"
+        )
+    return order
@@ -2,16 +2,17 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Sum, Count
-from django.http import HttpResponse
-import csv
+from django.db.models import Q, Sum, Count, Prefetch
 from datetime import datetime
 from .models import PaymentMethod, Customer, Order, OrderItem, Payment
 from .serializers import (PaymentMethodSerializer, CustomerSerializer, 
-                          OrderSerializer, OrderItemSerializer, PaymentSerializer)
+                          OrderSerializer, OrderListSerializer, OrderItemSerializer, PaymentSerializer,
+                          OrderBulkCreateSerializer, OrderLineSerializer, validate_order_lines)
 from users.permissions import IsAdminOrReadOnly
 from audit.mixins import AuditMixin
 from audit.models import AuditLog
+from reports.utils import export_to_csv
+from .stock import confirm_order, InsufficientStock, StockLocked, StockReservationError
 
 
 class PaymentMethodViewSet(AuditMixin, viewsets.ModelViewSet):
@@ -50,8 +51,31 @@ class OrderViewSet(AuditMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     audit_model_name = 'Order'
     
+    def _expand_items(self):
+        """El listado incluye las líneas solo con ?expand=items"""
+        if self.action != 'list':
+            return True
+        expand = self.request.query_params.get('expand', '')
+        return 'items' in [part.strip() for part in expand.split(',')]
+    
+    def get_serializer_class(self):
+        if self.action == 'list' and not self._expand_items():
+            return OrderListSerializer
+        return super().get_serializer_class()
+    
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # Totales en SQL y líneas con su producto en una sola consulta adicional
+        queryset = Order.objects.select_related('customer', 'campaign').annotate(
+            total_items=Count('items'),
+            total_quantity=Sum('items__quantity'),
+        ).order_by('-order_date', '-created_at', '-id')
+        if self._expand_items():
+            queryset = queryset.prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+            )
+        return self._filter(queryset)
+    
+    def _filter(self, queryset):
         customer = self.request.query_params.get('customer', None)
         campaign = self.request.query_params.get('campaign', None)
         status_filter = self.request.query_params.get('status', None)
@@ -74,6 +98,41 @@ class OrderViewSet(AuditMixin, viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
     
+    def _order_response(self, order, response_status=status.HTTP_200_OK):
+        order = (
+            Order.objects.select_related('customer', 'campaign')
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product')))
+            .get(pk=order.pk)
+        )
+        return Response(OrderSerializer(order).data, status=response_status)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_create(self, request):
+        """Crear un pedido con todas sus líneas (campo lines) en un solo paso"""
+        serializer = OrderBulkCreateSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save(created_by=request.user)
+        return self._order_response(order, status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def add_items(self, request, pk=None):
+        """Agregar muchas líneas a un pedido en borrador ({"lines": [...]} o la lista sola)"""
+        order = self.get_object()
+        if order.status != Order.DRAFT:
+            return Response({'error': 'Solo se pueden agregar items a pedidos en borrador'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        lines = request.data
+        if isinstance(lines, dict):
+            lines = lines.get('lines')
+        if not isinstance(lines, list):
+            return Response({'error': 'Se espera una lista de líneas (lines)'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        serializer = OrderLineSerializer(data=lines, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        order.add_items(validate_order_lines(serializer.validated_data))
+        return self._order_response(order)
+    
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         order = self.get_object()
@@ -81,17 +140,16 @@ class OrderViewSet(AuditMixin, viewsets.ModelViewSet):
             return Response({'error': 'Solo se pueden confirmar pedidos en borrador'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar stock y descontar
-        for item in order.items.all():
-            product = item.product
-            if product.quantity < item.quantity:
-                return Response({'error': f'Stock insuficiente para {product.product_name}'}, 
-                              status=status.HTTP_400_BAD_REQUEST)
-            product.quantity -= item.quantity
-            product.save()
-        
-        order.status = Order.CONFIRMED
-        order.save()
+        # Verificar stock y descontar en una transacción (ver sales/stock.py)
+        try:
+            confirm_order(order.pk)
+        except InsufficientStock as e:
+            return Response({'error': str(e), 'shortages': e.shortages},
+                          status=status.HTTP_400_BAD_REQUEST)
+        except StockLocked as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except StockReservationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'message': 'Pedido confirmado exitosamente'})
     
     @action(detail=True, methods=['post'])
@@ -122,18 +180,21 @@ class OrderViewSet(AuditMixin, viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        orders = self.get_queryset()
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="ventas_{datetime.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Número', 'Cliente', 'Fecha', 'Total', 'Estado'])
-        
-        for order in orders:
-            writer.writerow([order.order_number, order.customer.name, order.order_date, 
-                           order.total, order.get_status_display()])
-        
-        return response
+        """Exportar pedidos a CSV en streaming (memoria constante)"""
+        orders = self._filter(
+            Order.objects.select_related('customer')
+            .only('order_number', 'customer__name', 'order_date', 'total', 'status')
+        )
+        rows = (
+            [order.order_number, order.customer.name, order.order_date,
+             order.total, order.get_status_display()]
+            for order in orders.iterator(chunk_size=2000)
+        )
+        return export_to_csv(
+            rows,
+            f'ventas_{datetime.now().strftime("%Y%m%d")}.csv',
+            ['Número', 'Cliente', 'Fecha', 'Total', 'Estado']
+        )
 
 
 class OrderItemViewSet(viewsets.ModelViewSet):
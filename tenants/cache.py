@@ -0,0 +1,396 @@
+"""
+Caché de resolución de tenants.
+
+Dos niveles:
+1. LRU en memoria por proceso (worker) con TTL.
+2. Caché compartida de Django (opcional) para que los workers se
+   calienten entre sí sin tocar la base de datos.
+
+Las entradas se invalidan desde las señales post_save/post_delete de
+Organization (ver tenants/signals.py). Con caché compartida, la
+invalidación cambia además una versión por subdominio en ella y cada worker
+compara esa versión antes de usar su LRU, así una organización desactivada
+o renombrada deja de resolverse en todos los workers en el siguiente
+request. Sin caché compartida (o con un backend por proceso como
+LocMemCache) los demás workers la siguen resolviendo hasta
+TENANT_CACHE_TTL segundos. Los subdominios inexistentes
+también se cachean (resultado negativo) para no consultar la BD en cada
+request con un subdominio inválido.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# Marcador para resultados negativos (subdominio inexistente o inactivo)
+_MISSING = '__missing__'
+
+# Backends que no se comparten entre procesos
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+class LocalTTLCache:
+    """
+    LRU en memoria con expiración por entrada y contadores de aciertos/fallos.
+    Es seguro entre threads del mismo proceso.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Elimina todas las entradas cuya clave cumpla el predicado"""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def get_shared_cache(alias):
+    """Obtiene el backend de caché compartida configurado, o None si no existe"""
+    if not alias:
+        return None
+    try:
+        return caches[alias]
+    except InvalidCacheBackendError:
+        return None
+
+
+class TenantRegistry:
+    """
+    Registro de organizaciones activas indexado por subdominio.
+
+    Uso:
+        organization = tenant_registry.get_by_subdomain('cooperativa1')
+    """
+
+    KEY_PREFIX = 'tenants:subdomain:'
+    VERSION_PREFIX = 'tenants:version:'
+
+    def __init__(self):
+        self.local = LocalTTLCache(
+            max_size=getattr(settings, 'TENANT_CACHE_MAX_SIZE', 1024),
+            ttl=getattr(settings, 'TENANT_CACHE_TTL', 60),
+        )
+        self.negative_ttl = getattr(settings, 'TENANT_CACHE_NEGATIVE_TTL', 30)
+        self.shared_ttl = getattr(settings, 'TENANT_CACHE_SHARED_TTL', 300)
+        self.shared_alias = getattr(settings, 'TENANT_CACHE_ALIAS', None)
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.db_queries = 0
+
+    @property
+    def shared(self):
+        shared = get_shared_cache(self.shared_alias)
+        # Un backend por proceso no sirve para invalidar en los demás workers
+        if shared is None or isinstance(shared, PROCESS_LOCAL_BACKENDS):
+            return None
+        return shared
+
+    def _shared_key(self, subdomain):
+        return f'{self.KEY_PREFIX}{subdomain}'
+
+    def _version_key(self, subdomain):
+        return f'{self.VERSION_PREFIX}{subdomain}'
+
+    def get_by_subdomain(self, subdomain):
+        """
+        Retorna la organización activa con ese subdominio o None.
+        Devuelve una copia para que el request no modifique la instancia cacheada.
+        """
+        if not subdomain:
+            return None
+
+        shared = self.shared
+        version = self._get_version(shared, subdomain)
+        entry = self.local.get(subdomain)
+        if entry is not None and entry[0] == version:
+            value = entry[1]
+        else:
+            value = self._get_from_shared(shared, subdomain)
+            if value is None:
+                value = self._load(subdomain)
+                self._set_shared(shared, subdomain, value)
+            self.local.set(
+                subdomain, (version, value),
+                ttl=self.negative_ttl if value == _MISSING else None
+            )
+
+        if value == _MISSING:
+            return None
+        return copy.copy(value)
+
+    def _get_version(self, shared, subdomain):
+        """Versión vigente del subdominio en la caché compartida (None si no hay)"""
+        if shared is None:
+            return None
+        try:
+            return shared.get(self._version_key(subdomain))
+        except Exception as e:
+            print(f"Error al leer versión de tenants en caché compartida: {e}")
+            return None
+
+    def _get_from_shared(self, shared, subdomain):
+        if shared is None:
+            return None
+        try:
+            value = shared.get(self._shared_key(subdomain))
+        except Exception as e:
+            print(f"Error al leer caché compartida de tenants: {e}")
+            return None
+        if value is None:
+            self.shared_misses += 1
+        else:
+            self.shared_hits += 1
+        return value
+
+    def _set_shared(self, shared, subdomain, value):
+        if shared is None:
+            return
+        timeout = self.negative_ttl if value == _MISSING else self.shared_ttl
+        try:
+            shared.set(self._shared_key(subdomain), value, timeout)
+        except Exception as e:
+            print(f"Error al escribir caché compartida de tenants: {e}")
+
+    def _load(self, subdomain):
+        from .models import Organization
+        self.db_queries += 1
+        try:
+            return Organization.objects.get(subdomain=subdomain, is_active=True)
+        except Organization.DoesNotExist:
+            return _MISSING
+
+    def invalidate(self, *subdomains):
+        """Invalida uno o más subdominios en ambos niveles"""
+        shared = self.shared
+        for subdomain in subdomains:
+            if not subdomain:
+                continue
+            self.local.delete(subdomain)
+            if shared is not None:
+                try:
+                    shared.delete(self._shared_key(subdomain))
+                    # Sin expiración: los LRU de los demás workers la comparan
+                    shared.set(self._version_key(subdomain), uuid.uuid4().hex, None)
+                except Exception as e:
+                    print(f"Error al invalidar caché compartida de tenants: {e}")
+
+    def clear(self):
+        """Vacía la caché local y reinicia los contadores"""
+        self.local.clear()
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.db_queries = 0
+
+    def stats(self):
+        stats = self.local.stats()
+        stats.update({
+            'shared_enabled': self.shared is not None,
+            'shared_hits': self.shared_hits,
+            'shared_misses': self.shared_misses,
+            'db_queries': self.db_queries,
+        })
+        return stats
+
+
+tenant_registry = TenantRegistry()
+
+
+class MembershipCache:
+    """
+    Caché de la decisión de acceso (usuario, organización) del middleware.
+
+    Guarda dos cosas:
+    - Si el usuario tiene Partner en la organización, por (user_id, org_id).
+    - El nombre del rol por role_id, para no seguir request.user.role en cada request.
+
+    Se invalida desde las señales de Partner, OrganizationMember y Role, y se
+    precalienta en el login.
+
+    Con caché compartida (TENANT_CACHE_ALIAS) la decisión se lee siempre de
+    ella y no del LRU local: una revocación borra la clave compartida y todos
+    los workers la ven en el siguiente request. Sin caché compartida (o con
+    un backend por proceso como LocMemCache) cada worker usa su LRU y la
+    revocación llega a los demás workers al vencer
+    TENANT_MEMBERSHIP_CACHE_TTL segundos.
+    """
+
+    MEMBER_PREFIX = 'tenants:member:'
+    ROLE_PREFIX = 'tenants:role:'
+
+    def __init__(self):
+        self.local = LocalTTLCache(
+            max_size=getattr(settings, 'TENANT_MEMBERSHIP_CACHE_MAX_SIZE', 10000),
+            ttl=getattr(settings, 'TENANT_MEMBERSHIP_CACHE_TTL', 60),
+        )
+        self.shared_ttl = getattr(settings, 'TENANT_CACHE_SHARED_TTL', 300)
+        self.shared_alias = getattr(settings, 'TENANT_CACHE_ALIAS', None)
+        self.db_queries = 0
+
+    @property
+    def shared(self):
+        shared = get_shared_cache(self.shared_alias)
+        # Un backend por proceso no sirve para invalidar en los demás workers
+        if shared is None or isinstance(shared, PROCESS_LOCAL_BACKENDS):
+            return None
+        return shared
+
+    def _cached(self, local_key, shared_key, loader):
+        shared = self.shared
+        if shared is None:
+            value = self.local.get(local_key)
+            if value is None:
+                self.db_queries += 1
+                value = loader()
+                self.local.set(local_key, value)
+            return value
+
+        value = None
+        try:
+            value = shared.get(shared_key)
+        except Exception as e:
+            print(f"Error al leer caché compartida de membresías: {e}")
+
+        if value is None:
+            self.db_queries += 1
+            value = loader()
+            try:
+                shared.set(shared_key, value, self.shared_ttl)
+            except Exception as e:
+                print(f"Error al escribir caché compartida de membresías: {e}")
+        return value
+
+    def get_role_name(self, role_id):
+        """Nombre del rol (o '' si no existe)"""
+        if not role_id:
+            return ''
+
+        def load():
+            from users.models import Role
+            return Role.objects.filter(pk=role_id).values_list('name', flat=True).first() or ''
+
+        return self._cached(('role', role_id), f'{self.ROLE_PREFIX}{role_id}', load)
+
+    def has_partner(self, user_id, organization_id):
+        """Indica si el usuario tiene un Partner en la organización"""
+        def load():
+            from partners.models import Partner
+            # Usar all_organizations() para bypassear el filtro automático del TenantManager
+            return Partner.objects.all_organizations().filter(
+                organization_id=organization_id,
+                user_id=user_id
+            ).exists()
+
+        return self._cached(
+            ('member', user_id, organization_id),
+            f'{self.MEMBER_PREFIX}{user_id}:{organization_id}',
+            load
+        )
+
+    def has_access(self, user, organization):
+        """
+        Decisión de acceso del middleware: los usuarios con rol ADMIN acceden a
+        todas las organizaciones, el resto necesita un Partner en la organización.
+        """
+        if self.get_role_name(user.role_id) == 'ADMIN':
+            return True
+        return self.has_partner(user.pk, organization.pk)
+
+    def warm(self, user, organization):
+        """Precalienta la decisión de acceso (usado en el login)"""
+        self.invalidate_membership(user.pk, organization.pk)
+        self.invalidate_role(user.role_id)
+        return self.has_access(user, organization)
+
+    def _delete_shared(self, key):
+        shared = self.shared
+        if shared is None:
+            return
+        try:
+            shared.delete(key)
+        except Exception as e:
+            print(f"Error al invalidar caché compartida de membresías: {e}")
+
+    def invalidate_membership(self, user_id, organization_id):
+        if not user_id or not organization_id:
+            return
+        self.local.delete(('member', user_id, organization_id))
+        self._delete_shared(f'{self.MEMBER_PREFIX}{user_id}:{organization_id}')
+
+    def invalidate_role(self, role_id):
+        if not role_id:
+            return
+        self.local.delete(('role', role_id))
+        self._delete_shared(f'{self.ROLE_PREFIX}{role_id}')
+
+    def clear(self):
+        self.local.clear()
+        self.db_queries = 0
+
+    def stats(self):
+        stats = self.local.stats()
+        stats.update({
+            'shared_enabled': self.shared is not None,
+            'db_queries': self.db_queries,
+        })
+        return stats
+
+
+membership_cache = MembershipCache()
@@ -1,6 +1,6 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
-from .models import Organization
+from .cache import tenant_registry, membership_cache
 import threading
 
 # Thread-local storage para el tenant actual
@@ -23,6 +23,9 @@ class TenantMiddleware(MiddlewareMixin):
     1. Subdominio (ej: cooperativa1.tuapp.com)
     2. Header HTTP X-Organization-Subdomain
     3. Query parameter ?org=subdomain
+
+    La resolución subdominio -> organización pasa por tenant_registry
+    (tenants/cache.py) para no consultar la BD en cada request.
     """
     
     def process_request(self, request):
@@ -53,37 +56,19 @@ class TenantMiddleware(MiddlewareMixin):
         if len(parts) > 2 or (len(parts) == 2 and parts[0] not in ['localhost', '127']):
             subdomain = parts[0]
             if subdomain not in ['www', 'api', 'admin']:
-                try:
-                    organization = Organization.objects.get(
-                        subdomain=subdomain,
-                        is_active=True
-                    )
-                except Organization.DoesNotExist:
-                    pass
+                organization = tenant_registry.get_by_subdomain(subdomain)
         
         # Método 2: Header HTTP (útil para APIs y desarrollo)
         if not organization:
             subdomain = request.headers.get('X-Organization-Subdomain')
             if subdomain:
-                try:
-                    organization = Organization.objects.get(
-                        subdomain=subdomain,
-                        is_active=True
-                    )
-                except Organization.DoesNotExist:
-                    pass
+                organization = tenant_registry.get_by_subdomain(subdomain)
         
         # Método 3: Query parameter (útil para desarrollo)
         if not organization:
             subdomain = request.GET.get('org')
             if subdomain:
-                try:
-                    organization = Organization.objects.get(
-                        subdomain=subdomain,
-                        is_active=True
-                    )
-                except Organization.DoesNotExist:
-                    pass
+                organization = tenant_registry.get_by_subdomain(subdomain)
         
         # Establecer la organización en el thread-local y en el request
         set_current_organization(organization)
@@ -104,22 +89,15 @@ class TenantMiddleware(MiddlewareMixin):
                 return None
                 
             # Verificar si el usuario es ADMIN (puede acceder a todas las organizaciones)
-            is_admin = request.user.role and request.user.role.name == 'ADMIN'
+            # o tiene un partner en esta organización. La decisión se cachea por
+            # (user_id, org_id) en membership_cache.
+            has_access = membership_cache.has_access(request.user, organization)
             
-            if not is_admin:
-                # Verificar si el usuario tiene un partner en esta organización
-                # Usar all_organizations() para bypassear el filtro automático del TenantManager
-                from partners.models import Partner
-                has_access = Partner.objects.all_organizations().filter(
-                    organization=organization,
-                    user=request.user
-                ).exists()
-                
-                if not has_access:
-                    return JsonResponse({
-                        'error': 'Acceso denegado',
-                        'detail': f'No tienes acceso a la organización {organization.name}'
-                    }, status=403)
+            if not has_access:
+                return JsonResponse({
+                    'error': 'Acceso denegado',
+                    'detail': f'No tienes acceso a la organización {organization.name}'
+                }, status=403)
         
         return None
     
@@ -0,0 +1,79 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .models import Organization, OrganizationMember
+from .cache import tenant_registry, membership_cache
+
+
+@receiver(pre_save, sender=Organization)
+def remember_previous_subdomain(sender, instance, **kwargs):
+    """Guardar el subdominio anterior para invalidarlo si cambia"""
+    instance._previous_subdomain = None
+    if instance.pk:
+        instance._previous_subdomain = Organization.objects.filter(
+            pk=instance.pk
+        ).values_list('subdomain', flat=True).first()
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_organization_cache(sender, instance, **kwargs):
+    """Invalidar la caché de tenants al crear/actualizar una organización"""
+    tenant_registry.invalidate(
+        instance.subdomain,
+        getattr(instance, '_previous_subdomain', None)
+    )
+
+
+@receiver(post_delete, sender=Organization)
+def invalidate_deleted_organization_cache(sender, instance, **kwargs):
+    """Invalidar la caché de tenants al eliminar una organización"""
+    tenant_registry.invalidate(instance.subdomain)
+
+
+def _remember_previous_membership(sender, instance):
+    instance._previous_membership = None
+    if instance.pk:
+        manager = getattr(sender.objects, 'all_organizations', None)
+        queryset = manager() if manager else sender.objects.all()
+        instance._previous_membership = queryset.filter(
+            pk=instance.pk
+        ).values_list('user_id', 'organization_id').first()
+
+
+def _invalidate_membership(instance):
+    membership_cache.invalidate_membership(instance.user_id, instance.organization_id)
+    previous = getattr(instance, '_previous_membership', None)
+    if previous and previous != (instance.user_id, instance.organization_id):
+        membership_cache.invalidate_membership(*previous)
+
+
+@receiver(pre_save, sender='partners.Partner')
+def remember_previous_partner_membership(sender, instance, **kwargs):
+    """Guardar usuario y organización anteriores del socio para invalidar su acceso si cambian"""
+    _remember_previous_membership(sender, instance)
+
+
+@receiver(post_save, sender='partners.Partner')
+@receiver(post_delete, sender='partners.Partner')
+def invalidate_partner_membership(sender, instance, **kwargs):
+    """Invalidar la decisión de acceso del usuario asociado al socio"""
+    _invalidate_membership(instance)
+
+
+@receiver(pre_save, sender=OrganizationMember)
+def remember_previous_organization_member(sender, instance, **kwargs):
+    """Guardar usuario y organización anteriores de la membresía"""
+    _remember_previous_membership(sender, instance)
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def invalidate_organization_member(sender, instance, **kwargs):
+    """Invalidar la decisión de acceso al cambiar la membresía"""
+    _invalidate_membership(instance)
+
+
+@receiver(post_save, sender='users.Role')
+@receiver(post_delete, sender='users.Role')
+def invalidate_role(sender, instance, **kwargs):
+    """Invalidar el nombre de rol cacheado"""
+    membership_cache.invalidate_role(instance.pk)
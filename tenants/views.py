@@ -7,6 +7,7 @@ from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 from .models import Organization, OrganizationMember
+from .cache import tenant_registry, membership_cache
 from .serializers import (
     OrganizationSerializer,
     OrganizationRegistrationSerializer,
@@ -200,7 +201,9 @@ def super_admin_dashboard_stats(request):
             'active': active_users
         },
         'plan_distribution': plan_distribution,
-        'recent_organizations': recent_orgs_data
+        'recent_organizations': recent_orgs_data,
+        'tenant_cache': tenant_registry.stats(),
+        'membership_cache': membership_cache.stats()
     })
 
 
@@ -193,11 +193,12 @@ class UserViewSet(AuditMixin, viewsets.ModelViewSet):
             # Registrar en auditoría
             try:
                 from audit.mixins import get_client_ip, get_user_agent
+                from audit.utils import log_audit
                 description = f"Usuario {user.username} se registró como {register_type.upper()}"
                 if plan:
                     description += f" con plan {plan}"
                 
-                AuditLog.objects.create(
+                log_audit(
                     user=user,
                     action=AuditLog.CREATE,
                     model_name='User',
@@ -264,6 +265,7 @@ class UserViewSet(AuditMixin, viewsets.ModelViewSet):
         
         # Validar acceso a la organización en el login
         from tenants.models import Organization
+        from tenants.cache import membership_cache
         from partners.models import Partner
         
         org_subdomain = request.headers.get('X-Organization-Subdomain') or request.GET.get('org')
@@ -328,6 +330,9 @@ class UserViewSet(AuditMixin, viewsets.ModelViewSet):
                             print(f"Partner ADMIN creado para {user.username} en {organization.name}")
                         except Exception as e:
                             print(f"Error al crear partner admin: {e}")
+                
+                # Precalentar la decisión de acceso que usa TenantMiddleware
+                membership_cache.warm(user, organization)
             except Organization.DoesNotExist:
                 return Response(
                     {'error': 'Organización no encontrada'},
@@ -344,7 +349,8 @@ class UserViewSet(AuditMixin, viewsets.ModelViewSet):
         # Registrar login en auditoría (opcional si no hay organización)
         try:
             from audit.mixins import get_client_ip, get_user_agent
-            AuditLog.objects.create(
+            from audit.utils import log_audit
+            log_audit(
                 user=user,
                 action=AuditLog.LOGIN,
                 description=f"Usuario {user.username} inició sesión",
@@ -371,7 +377,8 @@ class UserViewSet(AuditMixin, viewsets.ModelViewSet):
         # Registrar logout en auditoría antes de cerrar sesión (opcional)
         try:
             from audit.mixins import get_client_ip, get_user_agent
-            AuditLog.objects.create(
+            from audit.utils import log_audit
+            log_audit(
                 user=user,
                 action=AuditLog.LOGOUT,
                 description=f"Usuario {username} cerró sesión",
@@ -0,0 +1,163 @@
+"""
+Clima para todas las parcelas de una organización.
+
+Las coordenadas de las parcelas se agrupan en celdas de la grilla de
+weather/cache.py y cada celda distinta se consulta una sola vez, en
+paralelo con un pool acotado de WEATHER_BULK_WORKERS threads. Las celdas
+ya cacheadas no llaman al servicio externo; las demás respetan un límite
+de WEATHER_RATE_LIMIT llamadas por segundo y se reintentan
+WEATHER_FETCH_RETRIES veces ante errores transitorios (timeouts, 429, 5xx).
+Una celda que sigue fallando recibe el pronóstico simulado, igual que
+WeatherService.get_forecast.
+
+El servicio se puede apuntar a un servidor local con WEATHER_API_URL (o
+WeatherService(base_url=...)) para probarlo sin red.
+"""
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from tenants.middleware import get_current_organization, set_current_organization
+from .cache import FORECAST, weather_cache
+from .weather_service import WeatherService
+
+
+# Códigos HTTP que vale la pena reintentar
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Espacia las llamadas a `rate` por segundo entre todos los threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def is_retryable(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUS
+    return isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError))
+
+
+class BulkWeatherFetcher:
+    """Pronósticos de muchas ubicaciones: {celda: pronóstico diario}"""
+
+    def __init__(self, service=None, workers=None, rate_limit=None, retries=None, backoff=None):
+        self.service = service or WeatherService()
+        self.workers = settings.WEATHER_BULK_WORKERS if workers is None else workers
+        self.retries = settings.WEATHER_FETCH_RETRIES if retries is None else retries
+        self.backoff = settings.WEATHER_RETRY_BACKOFF if backoff is None else backoff
+        self.rate_limiter = RateLimiter(
+            settings.WEATHER_RATE_LIMIT if rate_limit is None else rate_limit
+        )
+        self.upstream_calls = 0
+        self.retried = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------------
+    # Celdas
+    # ------------------------------------------------------------------
+
+    def parcel_cells(self, parcels):
+        """
+        {parcel_id: celda} para un queryset o lista de parcelas. Las parcelas
+        sin coordenadas usan la ubicación por defecto del servicio.
+        """
+        if hasattr(parcels, 'values_list'):
+            rows = parcels.values_list('id', 'latitude', 'longitude').order_by()
+        else:
+            rows = [(parcel.id, parcel.latitude, parcel.longitude) for parcel in parcels]
+        return {
+            parcel_id: weather_cache.snap(
+                self.service.DEFAULT_LAT if lat is None else lat,
+                self.service.DEFAULT_LON if lon is None else lon,
+            )
+            for parcel_id, lat, lon in rows
+        }
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def _fetch_with_retries(self, lat, lon):
+        attempt = 0
+        while True:
+            self.rate_limiter.wait()
+            self.upstream_calls += 1
+            try:
+                return self.service._fetch_forecast(lat, lon)
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                retry_after = getattr(e, 'headers', None) and e.headers.get('Retry-After')
+                if retry_after and str(retry_after).isdigit():
+                    delay = max(delay, float(retry_after))
+                attempt += 1
+                self.retried += 1
+                time.sleep(delay)
+
+    def _forecast_for_cell(self, cell, organization):
+        # La organización permite guardar el resultado en WeatherForecast
+        set_current_organization(organization)
+        try:
+            return weather_cache.get(FORECAST, cell[0], cell[1], self._fetch_with_retries)
+        except Exception as e:
+            print(f"Error al obtener el pronóstico de la celda {cell}: {e}")
+            self.failed += 1
+            return self.service._get_simulated_forecast(cell[0], cell[1], self.service.MAX_FORECAST_DAYS)
+        finally:
+            set_current_organization(None)
+            connection.close()
+
+    def fetch_forecasts(self, cells):
+        """{celda: pronóstico diario} para las celdas distintas de `cells`"""
+        cells = sorted(set(cells))
+        if not self.service.api_key:
+            return {
+                cell: self.service._get_simulated_forecast(cell[0], cell[1], self.service.MAX_FORECAST_DAYS)
+                for cell in cells
+            }
+        if not cells:
+            return {}
+
+        organization = get_current_organization()
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.workers, len(cells))),
+            thread_name_prefix='weather-bulk',
+        ) as executor:
+            forecasts = executor.map(lambda cell: self._forecast_for_cell(cell, organization), cells)
+            return dict(zip(cells, forecasts))
+
+    def fetch_for_parcels(self, parcels):
+        """(parcela -> celda, celda -> pronóstico) para las parcelas dadas"""
+        cells = self.parcel_cells(parcels)
+        return cells, self.fetch_forecasts(cells.values())
+
+    def stats(self):
+        return {
+            'upstream_calls': self.upstream_calls,
+            'retried': self.retried,
+            'failed': self.failed,
+        }
+
+
+def fetch_parcel_forecasts(parcels, **kwargs):
+    """Atajo: (parcela -> celda, celda -> pronóstico) con un fetcher nuevo"""
+    return BulkWeatherFetcher(**kwargs).fetch_for_parcels(parcels)
@@ -0,0 +1,299 @@
+"""
+Caché del clima por celda de grilla.
+
+Las coordenadas se ajustan a una grilla de WEATHER_GRID_SIZE grados: todas
+las consultas dentro de la misma celda (parcelas a metros de distancia)
+comparten una sola llamada al servicio externo, hecha con las coordenadas
+del centro de la celda.
+
+Dos niveles:
+1. LRU en memoria por proceso (tenants.cache.LocalTTLCache).
+2. Los modelos WeatherData (clima actual) y WeatherForecast (pronóstico),
+   compartidos entre procesos y reinicios. El clima es un dato público: las
+   filas de una celda se reutilizan para cualquier organización; se guardan
+   a nombre de la organización que hizo la consulta. Las filas de la caché
+   se distinguen por data_source = DATA_SOURCE y un payload no vacío; los
+   datos cargados a mano no se leen ni se modifican. Cada celda tiene una
+   sola fila de clima actual (se actualiza en cada refresco) y las filas de
+   su último pronóstico.
+
+Una entrada vale WEATHER_CURRENT_TTL / WEATHER_FORECAST_TTL segundos. Una
+entrada vencida pero con menos de WEATHER_STALE_TTL segundos se sirve igual
+mientras un único refresco corre en segundo plano; sin ninguna entrada, la
+consulta espera al servicio (una sola llamada por celda aunque lleguen
+varias consultas a la vez).
+"""
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tenants.cache import LocalTTLCache
+from tenants.middleware import get_current_organization
+from .models import WeatherData, WeatherForecast
+
+
+CURRENT = 'current'
+FORECAST = 'forecast'
+
+# Fuente de las filas escritas por la caché (ver migración 0004_weather_cache_source)
+DATA_SOURCE = 'OpenWeatherMap (caché)'
+
+
+def _decimal(value, places=2):
+    if value is None:
+        return None
+    return Decimal(str(round(float(value), places)))
+
+
+def _wind_ms(kmh):
+    """El servicio entrega km/h; los modelos guardan m/s"""
+    return _decimal(float(kmh or 0) / 3.6)
+
+
+class WeatherCache:
+    """Datos del clima por (tipo, celda) con refresco en segundo plano"""
+
+    def __init__(self):
+        self._memory = LocalTTLCache(
+            max_size=getattr(settings, 'WEATHER_CACHE_SIZE', 4096),
+            ttl=getattr(settings, 'WEATHER_STALE_TTL', 86400),
+        )
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = None
+        self._pid = None
+        self.upstream_calls = 0
+        self.stale_served = 0
+
+    # ------------------------------------------------------------------
+    # Grilla y vigencia
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def snap(lat, lon, grid_size=None):
+        """Centro de la celda que contiene (lat, lon)"""
+        grid_size = grid_size or settings.WEATHER_GRID_SIZE
+        return (
+            round(round(float(lat) / grid_size) * grid_size, 4),
+            round(round(float(lon) / grid_size) * grid_size, 4),
+        )
+
+    @staticmethod
+    def ttl(kind):
+        if kind == CURRENT:
+            return settings.WEATHER_CURRENT_TTL
+        return settings.WEATHER_FORECAST_TTL
+
+    def _is_fresh(self, kind, fetched_at):
+        return timezone.now() - fetched_at < timedelta(seconds=self.ttl(kind))
+
+    def _lock_for(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def get(self, kind, lat, lon, fetch):
+        """
+        Datos de `kind` (CURRENT/FORECAST) para la celda de (lat, lon).
+        `fetch(lat, lon)` consulta el servicio externo con el centro de la
+        celda y lanza una excepción si falla (solo cuando no hay nada que
+        servir). Retorna una copia: los llamadores pueden modificarla.
+        """
+        cell = self.snap(lat, lon)
+        key = (kind, cell)
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = self._load(kind, cell)
+            if entry is not None:
+                self._memory.set(key, entry)
+
+        if entry is not None:
+            payload, fetched_at = entry
+            if not self._is_fresh(kind, fetched_at):
+                self.stale_served += 1
+                self._schedule_refresh(kind, cell, fetch, get_current_organization())
+            return copy.deepcopy(payload)
+
+        return copy.deepcopy(self.refresh(kind, cell, fetch, get_current_organization()))
+
+    def refresh(self, kind, cell, fetch, organization=None):
+        """
+        Consulta el servicio para la celda y guarda el resultado. Si otra
+        consulta (de este u otro proceso) ya lo refrescó, se usa ese.
+        """
+        key = (kind, cell)
+        with self._lock_for(key):
+            entry = self._memory.get(key)
+            if entry is not None and self._is_fresh(kind, entry[1]):
+                return entry[0]
+            entry = self._load(kind, cell)
+            if entry is not None and self._is_fresh(kind, entry[1]):
+                self._memory.set(key, entry)
+                return entry[0]
+
+            payload = fetch(*cell)
+            self.upstream_calls += 1
+            fetched_at = timezone.now()
+            self._memory.set(key, (payload, fetched_at))
+            try:
+                self._persist(kind, cell, payload, organization)
+            except Exception as e:
+                print(f"Error al guardar el clima de la celda {cell}: {e}")
+            return payload
+
+    def _schedule_refresh(self, kind, cell, fetch, organization):
+        key = (kind, cell)
+        executor = self._get_executor()
+        with self._locks_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        executor.submit(self._background_refresh, kind, cell, fetch, organization)
+
+    def _background_refresh(self, kind, cell, fetch, organization):
+        try:
+            self.refresh(kind, cell, fetch, organization)
+        except Exception as e:
+            print(f"Error al refrescar el clima de la celda {cell}: {e}")
+        finally:
+            with self._locks_lock:
+                self._refreshing.discard((kind, cell))
+            connection.close()
+
+    def _get_executor(self):
+        # Tras un fork (gunicorn) el pool del padre no tiene threads en el hijo
+        with self._locks_lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.WEATHER_REFRESH_WORKERS,
+                    thread_name_prefix='weather-refresh',
+                )
+                self._pid = os.getpid()
+                self._refreshing.clear()
+            return self._executor
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cell_filter(cell):
+        return {'latitude': Decimal(str(cell[0])), 'longitude': Decimal(str(cell[1]))}
+
+    def _cached_rows(self, model, cell):
+        """Filas de la celda escritas por la caché (de cualquier organización)"""
+        return (
+            model.objects.all_organizations()
+            .filter(data_source=DATA_SOURCE, **self._cell_filter(cell))
+            .exclude(payload={})
+        )
+
+    def _load(self, kind, cell):
+        """(payload, fecha de consulta) guardado para la celda, o None"""
+        oldest = timezone.now() - timedelta(seconds=settings.WEATHER_STALE_TTL)
+        if kind == CURRENT:
+            row = (
+                self._cached_rows(WeatherData, cell)
+                .filter(created_at__gte=oldest)
+                .order_by('-created_at')
+                .values_list('payload', 'created_at')
+                .first()
+            )
+            return tuple(row) if row else None
+
+        rows = list(
+            self._cached_rows(WeatherForecast, cell)
+            .filter(created_at__gte=oldest)
+            .order_by('forecast_date')
+            .values_list('payload', 'created_at')
+        )
+        if not rows:
+            return None
+        return [payload for payload, _ in rows], min(created_at for _, created_at in rows)
+
+    def _persist(self, kind, cell, payload, organization):
+        # Sin organización (p. ej. un script) el resultado queda solo en memoria
+        if organization is None:
+            return
+        now = timezone.localtime()
+        location = dict(self._cell_filter(cell), organization=organization, data_source=DATA_SOURCE)
+
+        if kind == CURRENT:
+            fields = dict(
+                date=now.date(),
+                time=now.time().replace(microsecond=0),
+                temperature=_decimal(payload['temperature']),
+                feels_like=_decimal(payload.get('feels_like')),
+                temp_min=_decimal(payload.get('temp_min')),
+                temp_max=_decimal(payload.get('temp_max')),
+                humidity=_decimal(payload['humidity']),
+                pressure=_decimal(payload.get('pressure')),
+                wind_speed=_wind_ms(payload.get('wind_speed')),
+                wind_direction=payload.get('wind_direction'),
+                cloudiness=payload.get('clouds'),
+                weather_condition=payload.get('icon', '')[:100],
+                weather_description=payload.get('description', '')[:200],
+                payload=payload,
+                **location
+            )
+            # Una sola fila por celda: se actualiza la existente
+            with transaction.atomic():
+                rows = self._cached_rows(WeatherData, cell)
+                latest = rows.order_by('-created_at', '-id').values_list('id', flat=True).first()
+                if latest is None:
+                    WeatherData.objects.bulk_create([WeatherData(**fields)])
+                    return
+                rows.exclude(id=latest).delete()
+                WeatherData.objects.all_organizations().filter(id=latest).update(
+                    created_at=timezone.now(), **fields
+                )
+            return
+
+        # El pronóstico vigente de la celda reemplaza al anterior
+        with transaction.atomic():
+            self._cached_rows(WeatherForecast, cell).delete()
+            WeatherForecast.objects.bulk_create([
+                WeatherForecast(
+                    forecast_date=day['date'],
+                    temperature=_decimal((day['temp_min'] + day['temp_max']) / 2),
+                    temp_min=_decimal(day['temp_min']),
+                    temp_max=_decimal(day['temp_max']),
+                    weather_condition=day.get('description', '')[:100],
+                    precipitation_probability=_decimal(day.get('rain_probability', 0)),
+                    wind_speed=_wind_ms(day.get('wind_speed')),
+                    humidity=_decimal(day['humidity']),
+                    payload=day,
+                    **location
+                )
+                for day in payload
+            ])
+
+    # ------------------------------------------------------------------
+    # Administración
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """Descarta la caché en memoria (las filas guardadas se mantienen)"""
+        self._memory.clear()
+
+    def stats(self):
+        return {
+            'upstream_calls': self.upstream_calls,
+            'stale_served': self.stale_served,
+            'refreshing': len(self._refreshing),
+            'memory': self._memory.stats(),
+        }
+
+
+weather_cache = WeatherCache()
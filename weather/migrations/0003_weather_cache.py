@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0002_weatheralert_organization_weatherdata_organization_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherdata',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Datos del servicio'),
+        ),
+        migrations.AddField(
+            model_name='weatherforecast',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['latitude', 'longitude', 'created_at'], name='weather_dat_latitud_ff4e5f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherforecast',
+            index=models.Index(fields=['latitude', 'longitude', 'forecast_date'], name='weather_for_latitud_69df51_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Max
+
+
+OLD_SOURCE = 'OpenWeatherMap'
+CACHE_SOURCE = 'OpenWeatherMap (caché)'
+
+
+def mark_cache_rows(apps, schema_editor):
+    """
+    Las filas escritas por la caché (payload no vacío) pasan a la fuente
+    propia de la caché; del clima actual se conserva la última por celda.
+    """
+    WeatherData = apps.get_model('weather', 'WeatherData')
+    WeatherForecast = apps.get_model('weather', 'WeatherForecast')
+    for model in (WeatherData, WeatherForecast):
+        model.objects.filter(data_source=OLD_SOURCE).exclude(payload={}).update(
+            data_source=CACHE_SOURCE
+        )
+
+    cached = WeatherData.objects.filter(data_source=CACHE_SOURCE).exclude(payload={})
+    keep = (
+        cached.values('latitude', 'longitude').annotate(last=Max('id'))
+        .order_by().values_list('last', flat=True)
+    )
+    cached.exclude(id__in=list(keep)).delete()
+
+
+def unmark_cache_rows(apps, schema_editor):
+    for name in ('WeatherData', 'WeatherForecast'):
+        apps.get_model('weather', name).objects.filter(data_source=CACHE_SOURCE).update(
+            data_source=OLD_SOURCE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0003_weather_cache'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_cache_rows, unmark_cache_rows),
+    ]
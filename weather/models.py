@@ -55,6 +55,8 @@ class WeatherData(TenantModel):
     
     # Fuente de datos
     data_source = models.CharField(max_length=100, default='OpenWeatherMap', verbose_name='Fuente')
+    # Respuesta normalizada del servicio (caché de weather/cache.py)
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Datos del servicio')
     
     # Metadatos
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de registro')
@@ -67,6 +69,7 @@ class WeatherData(TenantModel):
         indexes = [
             models.Index(fields=['community', 'date']),
             models.Index(fields=['date']),
+            models.Index(fields=['latitude', 'longitude', 'created_at']),
         ]
 
     def __str__(self):
@@ -105,6 +108,8 @@ class WeatherForecast(TenantModel):
     
     # Fuente
     data_source = models.CharField(max_length=100, default='OpenWeatherMap')
+    # Pronóstico del día tal como lo entrega el servicio (caché de weather/cache.py)
+    payload = models.JSONField(default=dict, blank=True)
     
     # Metadatos
     created_at = models.DateTimeField(auto_now_add=True)
@@ -114,6 +119,9 @@ class WeatherForecast(TenantModel):
         verbose_name = 'Pronóstico del Tiempo'
         verbose_name_plural = 'Pronósticos del Tiempo'
         ordering = ['forecast_date', 'forecast_time']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude', 'forecast_date']),
+        ]
 
     def __str__(self):
         return f"Pronóstico: {self.forecast_date} - {self.temperature}°C"
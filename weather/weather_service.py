@@ -1,5 +1,9 @@
 """
-Servicio para obtener datos del clima usando OpenWeatherMap API
+Servicio para obtener datos del clima usando OpenWeatherMap API.
+
+Las respuestas se cachean por celda de grilla (weather/cache.py): las
+llamadas al servicio externo crecen con las celdas consultadas, no con los
+requests.
 """
 import os
 import urllib.request
@@ -7,14 +11,28 @@ import urllib.error
 import json
 from datetime import datetime, timedelta
 
+from django.conf import settings
+
+from .cache import CURRENT, FORECAST, weather_cache
+
 
 class WeatherService:
     """Servicio para interactuar con OpenWeatherMap API"""
     
     BASE_URL = "https://api.openweathermap.org/data/2.5"
     
-    def __init__(self):
-        self.api_key = os.getenv('OPENWEATHER_API_KEY')
+    # Ubicación por defecto (Santa Cruz) para parcelas sin coordenadas
+    DEFAULT_LAT = -17.78
+    DEFAULT_LON = -63.18
+    
+    # Días que entrega el endpoint /forecast (se cachean todos)
+    MAX_FORECAST_DAYS = 5
+    
+    def __init__(self, api_key=None, base_url=None):
+        self.api_key = api_key or os.getenv('OPENWEATHER_API_KEY')
+        # WEATHER_API_URL permite apuntar a un servidor local en pruebas
+        self.base_url = base_url or getattr(settings, 'WEATHER_API_URL', None) or self.BASE_URL
+        self.timeout = getattr(settings, 'WEATHER_HTTP_TIMEOUT', 10)
         if not self.api_key:
             print("[!] OPENWEATHER_API_KEY no configurada - usando datos simulados")
     
@@ -29,39 +47,43 @@ class WeatherService:
         Returns:
             dict: Datos del clima actual
         """
+        lat, lon = float(lat), float(lon)
         if not self.api_key:
             return self._get_simulated_current_weather(lat, lon)
         
         try:
-            url = f"{self.BASE_URL}/weather?lat={lat}&lon={lon}&appid={self.api_key}&units=metric&lang=es"
-            
-            req = urllib.request.Request(url)
-            with urllib.request.urlopen(req, timeout=10) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                
-                return {
-                    'temperature': round(data['main']['temp'], 1),
-                    'feels_like': round(data['main']['feels_like'], 1),
-                    'temp_min': round(data['main']['temp_min'], 1),
-                    'temp_max': round(data['main']['temp_max'], 1),
-                    'humidity': data['main']['humidity'],
-                    'pressure': data['main']['pressure'],
-                    'wind_speed': round(data['wind']['speed'] * 3.6, 1),  # m/s a km/h
-                    'wind_direction': data['wind'].get('deg', 0),
-                    'clouds': data['clouds']['all'],
-                    'description': data['weather'][0]['description'].capitalize(),
-                    'icon': data['weather'][0]['icon'],
-                    'sunrise': datetime.fromtimestamp(data['sys']['sunrise']).strftime('%H:%M'),
-                    'sunset': datetime.fromtimestamp(data['sys']['sunset']).strftime('%H:%M'),
-                    'location': data['name'],
-                    'country': data['sys']['country'],
-                    'timestamp': datetime.now().isoformat()
-                }
-        
+            return weather_cache.get(CURRENT, lat, lon, self._fetch_current_weather)
         except Exception as e:
             print(f"Error al obtener clima actual: {e}")
             return self._get_simulated_current_weather(lat, lon)
     
+    def _fetch_current_weather(self, lat, lon):
+        """Consulta el clima actual al servicio externo (lanza excepción si falla)"""
+        url = f"{self.base_url}/weather?lat={lat}&lon={lon}&appid={self.api_key}&units=metric&lang=es"
+        
+        req = urllib.request.Request(url)
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode('utf-8'))
+            
+            return {
+                'temperature': round(data['main']['temp'], 1),
+                'feels_like': round(data['main']['feels_like'], 1),
+                'temp_min': round(data['main']['temp_min'], 1),
+                'temp_max': round(data['main']['temp_max'], 1),
+                'humidity': data['main']['humidity'],
+                'pressure': data['main']['pressure'],
+                'wind_speed': round(data['wind']['speed'] * 3.6, 1),  # m/s a km/h
+                'wind_direction': data['wind'].get('deg', 0),
+                'clouds': data['clouds']['all'],
+                'description': data['weather'][0]['description'].capitalize(),
+                'icon': data['weather'][0]['icon'],
+                'sunrise': datetime.fromtimestamp(data['sys']['sunrise']).strftime('%H:%M'),
+                'sunset': datetime.fromtimestamp(data['sys']['sunset']).strftime('%H:%M'),
+                'location': data['name'],
+                'country': data['sys']['country'],
+                'timestamp': datetime.now().isoformat()
+            }
+    
     def get_forecast(self, lat, lon, days=5):
         """
         Obtiene el pronóstico del clima para los próximos días
@@ -74,60 +96,67 @@ class WeatherService:
         Returns:
             list: Lista de pronósticos por día
         """
+        lat, lon = float(lat), float(lon)
         if not self.api_key:
             return self._get_simulated_forecast(lat, lon, days)
         
         try:
-            url = f"{self.BASE_URL}/forecast?lat={lat}&lon={lon}&appid={self.api_key}&units=metric&lang=es"
-            
-            req = urllib.request.Request(url)
-            with urllib.request.urlopen(req, timeout=10) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                
-                # Agrupar por día
-                daily_forecast = {}
-                for item in data['list']:
-                    date = datetime.fromtimestamp(item['dt']).date()
-                    
-                    if date not in daily_forecast:
-                        daily_forecast[date] = {
-                            'date': date.isoformat(),
-                            'day_name': self._get_day_name(date),
-                            'temp_min': item['main']['temp_min'],
-                            'temp_max': item['main']['temp_max'],
-                            'humidity': item['main']['humidity'],
-                            'description': item['weather'][0]['description'].capitalize(),
-                            'icon': item['weather'][0]['icon'],
-                            'wind_speed': round(item['wind']['speed'] * 3.6, 1),
-                            'rain_probability': item.get('pop', 0) * 100,
-                            'clouds': item['clouds']['all']
-                        }
-                    else:
-                        # Actualizar min/max
-                        daily_forecast[date]['temp_min'] = min(
-                            daily_forecast[date]['temp_min'],
-                            item['main']['temp_min']
-                        )
-                        daily_forecast[date]['temp_max'] = max(
-                            daily_forecast[date]['temp_max'],
-                            item['main']['temp_max']
-                        )
-                
-                # Convertir a lista y limitar días
-                forecast_list = list(daily_forecast.values())[:days]
-                
-                # Redondear temperaturas
-                for day in forecast_list:
-                    day['temp_min'] = round(day['temp_min'], 1)
-                    day['temp_max'] = round(day['temp_max'], 1)
-                    day['rain_probability'] = round(day['rain_probability'])
-                
-                return forecast_list
-        
+            return weather_cache.get(FORECAST, lat, lon, self._fetch_forecast)[:days]
         except Exception as e:
             print(f"Error al obtener pronóstico: {e}")
             return self._get_simulated_forecast(lat, lon, days)
     
+    def _fetch_forecast(self, lat, lon):
+        """
+        Consulta el pronóstico al servicio externo, agrupado por día
+        (MAX_FORECAST_DAYS días). Lanza excepción si falla.
+        """
+        url = f"{self.base_url}/forecast?lat={lat}&lon={lon}&appid={self.api_key}&units=metric&lang=es"
+        
+        req = urllib.request.Request(url)
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode('utf-8'))
+            
+            # Agrupar por día
+            daily_forecast = {}
+            for item in data['list']:
+                date = datetime.fromtimestamp(item['dt']).date()
+                
+                if date not in daily_forecast:
+                    daily_forecast[date] = {
+                        'date': date.isoformat(),
+                        'day_name': self._get_day_name(date),
+                        'temp_min': item['main']['temp_min'],
+                        'temp_max': item['main']['temp_max'],
+                        'humidity': item['main']['humidity'],
+                        'description': item['weather'][0]['description'].capitalize(),
+                        'icon': item['weather'][0]['icon'],
+                        'wind_speed': round(item['wind']['speed'] * 3.6, 1),
+                        'rain_probability': item.get('pop', 0) * 100,
+                        'clouds': item['clouds']['all']
+                    }
+                else:
+                    # Actualizar min/max
+                    daily_forecast[date]['temp_min'] = min(
+                        daily_forecast[date]['temp_min'],
+                        item['main']['temp_min']
+                    )
+                    daily_forecast[date]['temp_max'] = max(
+                        daily_forecast[date]['temp_max'],
+                        item['main']['temp_max']
+                    )
+            
+            # Convertir a lista y limitar días
+            forecast_list = list(daily_forecast.values())[:self.MAX_FORECAST_DAYS]
+            
+            # Redondear temperaturas
+            for day in forecast_list:
+                day['temp_min'] = round(day['temp_min'], 1)
+                day['temp_max'] = round(day['temp_max'], 1)
+                day['rain_probability'] = round(day['rain_probability'])
+            
+            return forecast_list
+    
     def get_agricultural_data(self, lat, lon):
         """
         Obtiene datos específicos para agricultura